@@ -0,0 +1,64 @@
+"""
+Zoom-adaptive H3 grid overlay.
+
+Keeps the resolution of an adaptive 'h3grid' layer (`resolution=auto`) in sync with the map canvas scale,
+so that grid cells are drawn at roughly the target on-screen size at any zoom level.
+"""
+from qgis.PyQt.QtCore import QObject
+from qgis.core import QgsUnitTypes
+
+from ..processing.h3_adapter import get_h3api
+
+
+def resolution_for_pixel_size(metersPerPixel: float, cellSizePx: int) -> int:
+    """
+    Returns the finest H3 resolution whose average cell edge is at least `cellSizePx` pixels long on screen.
+    """
+    h3api = get_h3api()
+    for resolution in range(15, -1, -1):
+        if h3api.average_edge_length_km(resolution) * 1000 / metersPerPixel >= cellSizePx:
+            return resolution
+    return 0
+
+
+class AdaptiveGridController(QObject):
+    """
+    Updates the resolution of an adaptive grid layer whenever the map canvas scale changes.
+    """
+
+    def __init__(self, canvas, layer, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.layer = layer
+
+        self.canvas.scaleChanged.connect(self.update)
+        self.canvas.destinationCrsChanged.connect(self.update)
+        self.layer.willBeDeleted.connect(self.release)
+        self.update()
+
+    def update(self):
+        if self.layer is None:
+            return
+        provider = self.layer.dataProvider()
+        mapSettings = self.canvas.mapSettings()
+        metersPerPixel = mapSettings.mapUnitsPerPixel() * QgsUnitTypes.fromUnitToUnitFactor(
+            mapSettings.mapUnits(),
+            QgsUnitTypes.DistanceMeters
+        )
+        if metersPerPixel <= 0:
+            return
+
+        resolution = resolution_for_pixel_size(metersPerPixel, provider.cellSize)
+        if resolution != provider.resolution:
+            provider.setResolution(resolution)
+            self.layer.triggerRepaint()
+
+    def release(self):
+        """
+        Stops following the canvas, e.g. when the layer is removed or the plugin unloaded.
+        """
+        if self.layer is None:
+            return
+        self.canvas.scaleChanged.disconnect(self.update)
+        self.canvas.destinationCrsChanged.disconnect(self.update)
+        self.layer = None
@@ -0,0 +1,349 @@
+"""
+'h3grid' vector data provider.
+
+Generates H3 grid cells on the fly for the requested extent, instead of materializing them into a layer.
+Cells are generated per tile and the most recently used tiles are cached, so panning and zooming
+around the map shows the grid without writing anything to disk.
+
+Layer URI: `resolution=<0-15|auto>[&cellSize=<pixels>][&maxCells=<count>]`,
+e.g. `QgsVectorLayer('resolution=7', 'H3 grid', 'h3grid')`
+
+With `resolution=auto` the resolution follows the map scale. It is set by an `AdaptiveGridController`
+(see `overlay.py`) from the target on-screen cell size `cellSize`. Every request is capped at `maxCells`
+cells, falling back to coarser resolutions if the requested extent would hold more.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsAbstractFeatureIterator,
+    QgsAbstractFeatureSource,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCsException,
+    QgsDataProvider,
+    QgsFeature,
+    QgsFeatureIterator,
+    QgsFeatureRequest,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsMessageLog,
+    QgsRectangle,
+    QgsVectorDataProvider,
+    QgsWkbTypes,
+    Qgis,
+)
+
+from ..processing.engine import cell_to_geometry, estimate_cell_count, polyfill_rectangle, rectangle_area_km2
+from ..processing.h3_adapter import get_h3api
+
+# Number of tiles kept in the tile cache of each provider
+TILE_CACHE_SIZE = 64
+
+# Requests without a filter rectangle iterate the whole world. They are refused above this many cells.
+MAX_UNFILTERED_CELLS = 1000000
+
+# Defaults of the adaptive mode: target on-screen cell size in pixels, and cap on cells per request
+DEFAULT_CELL_SIZE_PX = 40
+DEFAULT_MAX_CELLS = 20000
+
+# Resolution of adaptive layers until the controller sets one
+DEFAULT_ADAPTIVE_RESOLUTION = 3
+
+WORLD_EXTENT = QgsRectangle(-180.0, -90.0, 180.0, 90.0)
+
+
+class H3GridTileCache:
+    """
+    Thread safe LRU cache of generated grid tiles.
+
+    Tiles are aligned to a regular WGS84 lat/lon grid whose tile size depends on the resolution, so that
+    each tile holds a few thousand cells. A cell belongs to the tile containing its centroid.
+    """
+
+    def __init__(self, maxSize=TILE_CACHE_SIZE):
+        self.maxSize = maxSize
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tileSize(resolution):
+        """
+        Returns the tile width and height in degrees for the given resolution.
+        """
+        tileSize = get_h3api().average_edge_length_km(resolution) * 60 / 111.32
+        return min(max(tileSize, 0.001), 45.0)
+
+    def tileKeys(self, rect, resolution):
+        """
+        Yields the keys of the tiles intersecting a WGS84 rectangle.
+        """
+        rect = rect.intersect(WORLD_EXTENT)
+        if rect.isEmpty():
+            return
+        tileSize = self.tileSize(resolution)
+        for tx in range(math.floor((rect.xMinimum() + 180.0) / tileSize), math.ceil((rect.xMaximum() + 180.0) / tileSize)):
+            for ty in range(math.floor((rect.yMinimum() + 90.0) / tileSize), math.ceil((rect.yMaximum() + 90.0) / tileSize)):
+                yield resolution, tx, ty
+
+    def tile(self, key):
+        """
+        Returns the list of (feature id, H3 index, geometry) tuples of a tile, generating it if not cached.
+        """
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None:
+                self._tiles.move_to_end(key)
+                return cached
+
+        resolution, tx, ty = key
+        tileSize = self.tileSize(resolution)
+        tileRect = QgsRectangle(
+            tx * tileSize - 180.0,
+            ty * tileSize - 90.0,
+            min((tx + 1) * tileSize - 180.0, 180.0),
+            min((ty + 1) * tileSize - 90.0, 90.0),
+        )
+        cell_to_int = get_h3api().cell_to_int
+        tile = [(cell_to_int(cell), cell, cell_to_geometry(cell)) for cell in polyfill_rectangle(tileRect, resolution)]
+
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.maxSize:
+                self._tiles.popitem(last=False)
+        return tile
+
+
+class H3GridFeatureIterator(QgsAbstractFeatureIterator):
+
+    def __init__(self, source, request):
+        super().__init__(request)
+        self._request = request if request is not None else QgsFeatureRequest()
+        self._source = source
+
+        self._transform = QgsCoordinateTransform()
+        if self._request.destinationCrs().isValid() and self._request.destinationCrs() != self._source.crs:
+            self._transform = QgsCoordinateTransform(
+                self._source.crs,
+                self._request.destinationCrs(),
+                self._request.transformContext()
+            )
+        try:
+            self._filterRect = self.filterRectToSourceCrs(self._transform)
+        except QgsCsException:
+            self._features = iter([])
+            return
+
+        self.rewind()
+
+    def _generateFeatures(self):
+        """
+        Generator of (feature id, H3 index, geometry) tuples matching the request.
+        """
+        resolution = self._source.resolution
+        self._resolution = resolution
+        filterType = self._request.filterType()
+
+        if filterType == QgsFeatureRequest.FilterFid:
+            fids = [self._request.filterFid()]
+        elif filterType == QgsFeatureRequest.FilterFids:
+            fids = self._request.filterFids()
+        else:
+            fids = None
+
+        if fids is not None:
+            h3api = get_h3api()
+            for fid in fids:
+                cell = h3api.int_to_cell(fid)
+                self._resolution = h3api.get_resolution(cell)
+                yield fid, cell, cell_to_geometry(cell)
+            return
+
+        if self._filterRect.isNull():
+            if get_h3api().num_cells(resolution) > MAX_UNFILTERED_CELLS:
+                QgsMessageLog.logMessage(
+                    f'H3 grid at resolution {resolution} is too large to iterate without an extent.',
+                    'H3 Toolkit',
+                    Qgis.Warning
+                )
+                return
+            rect = WORLD_EXTENT
+        else:
+            rect = self._filterRect
+
+        maxCells = self._source.maxCells
+        if maxCells > 0:
+            # Fall back to coarser resolutions if the requested extent would hold too many cells
+            areaKm2 = rectangle_area_km2(rect)
+            while resolution > 0 and estimate_cell_count(areaKm2, resolution) > maxCells:
+                resolution -= 1
+        self._resolution = resolution
+
+        cellCount = 0
+        exactIntersect = bool(self._request.flags() & QgsFeatureRequest.ExactIntersect)
+        rectGeometry = QgsGeometry.fromRect(rect)
+        # Cells near the rectangle border may belong to a tile outside of it, so grow the rectangle for tile lookup
+        margin = 2 * get_h3api().average_edge_length_km(resolution) / 111.32
+        for key in self._source.tileCache.tileKeys(rect.buffered(margin), resolution):
+            for fid, cell, geometry in self._source.tileCache.tile(key):
+                if exactIntersect:
+                    if not geometry.intersects(rectGeometry):
+                        continue
+                elif not geometry.boundingBox().intersects(rect):
+                    continue
+                yield fid, cell, geometry
+
+                # Hard cap on the number of cells per request
+                cellCount += 1
+                if 0 < maxCells <= cellCount:
+                    return
+
+    def fetchFeature(self, f):
+        for fid, cell, geometry in self._features:
+            f.setFields(self._source.fields)
+            f.setId(fid)
+            f.setAttributes([cell, self._resolution])
+            f.setValid(True)
+            if self._request.flags() & QgsFeatureRequest.NoGeometry:
+                f.clearGeometry()
+            else:
+                f.setGeometry(QgsGeometry(geometry))
+                self.geometryToDestinationCrs(f, self._transform)
+
+            if self._request.filterType() == QgsFeatureRequest.FilterExpression and not self._request.acceptFeature(f):
+                continue
+            return True
+
+        f.setValid(False)
+        return False
+
+    def __iter__(self):
+        self.rewind()
+        return self
+
+    def __next__(self):
+        feature = QgsFeature()
+        if not self.nextFeature(feature):
+            raise StopIteration
+        return feature
+
+    def rewind(self):
+        self._features = self._generateFeatures()
+        return True
+
+    def close(self):
+        self._features = iter([])
+        return True
+
+
+class H3GridFeatureSource(QgsAbstractFeatureSource):
+
+    def __init__(self, provider):
+        super().__init__()
+        self.resolution = provider.resolution
+        self.maxCells = provider.maxCells
+        self.fields = provider.fields()
+        self.crs = provider.crs()
+        self.tileCache = provider.tileCache
+
+    def getFeatures(self, request):
+        return QgsFeatureIterator(H3GridFeatureIterator(self, request))
+
+
+class H3GridProvider(QgsVectorDataProvider):
+
+    @classmethod
+    def providerKey(cls):
+        return 'h3grid'
+
+    @classmethod
+    def description(cls):
+        return 'H3 grid (generated on the fly)'
+
+    @classmethod
+    def createProvider(cls, uri, providerOptions, flags=QgsDataProvider.ReadFlags()):
+        return H3GridProvider(uri, providerOptions, flags)
+
+    def __init__(self, uri='', providerOptions=QgsDataProvider.ProviderOptions(), flags=QgsDataProvider.ReadFlags()):
+        super().__init__(uri)
+        self._uri = uri
+        self._isValid = True
+        self.resolution = 0
+        self.adaptive = False
+        self.cellSize = DEFAULT_CELL_SIZE_PX
+        self.maxCells = 0
+        self.tileCache = H3GridTileCache()
+
+        try:
+            params = dict(item.split('=', 1) for item in uri.split('&') if item)
+            if params.get('resolution') == 'auto':
+                self.adaptive = True
+                self.resolution = DEFAULT_ADAPTIVE_RESOLUTION
+                self.maxCells = DEFAULT_MAX_CELLS
+            else:
+                self.resolution = int(params.get('resolution', 0))
+            self.cellSize = int(params.get('cellSize', self.cellSize))
+            self.maxCells = int(params.get('maxCells', self.maxCells))
+        except ValueError:
+            self._isValid = False
+        if not 0 <= self.resolution <= 15:
+            self._isValid = False
+
+        self._fields = QgsFields()
+        self._fields.append(QgsField('index', QVariant.String, len=30, comment='H3 index'))
+        self._fields.append(QgsField('resolution', QVariant.Int, comment='H3 resolution'))
+
+    def featureSource(self):
+        return H3GridFeatureSource(self)
+
+    def setResolution(self, resolution):
+        """
+        Sets the resolution of the generated grid. Used by the controller of adaptive layers.
+        """
+        self.resolution = min(max(int(resolution), 0), 15)
+
+    def dataSourceUri(self, expandAuthConfig=True):
+        return self._uri
+
+    def storageType(self):
+        return 'H3 grid generated on the fly'
+
+    def getFeatures(self, request=QgsFeatureRequest()):
+        return QgsFeatureIterator(H3GridFeatureIterator(H3GridFeatureSource(self), request))
+
+    def wkbType(self):
+        return QgsWkbTypes.Polygon
+
+    def featureCount(self):
+        return get_h3api().num_cells(self.resolution)
+
+    def fields(self):
+        return self._fields
+
+    def capabilities(self):
+        return QgsVectorDataProvider.SelectAtId
+
+    def name(self):
+        return self.providerKey()
+
+    def extent(self):
+        return QgsRectangle(WORLD_EXTENT)
+
+    def updateExtents(self):
+        pass
+
+    def isValid(self):
+        return self._isValid
+
+    def crs(self):
+        return QgsCoordinateReferenceSystem('EPSG:4326')
+
+    def supportsSubsetString(self):
+        return False
+
+    def handlePostCloneOperations(self, source):
+        self.tileCache = source.tileCache
+        self.resolution = source.resolution
@@ -1,6 +1,17 @@
+from functools import lru_cache
 from importlib.util import find_spec
-from importlib.metadata import version
 
 
 IS_H3_PRESENT = bool(find_spec("h3"))
-H3_VERSION = version("h3") if IS_H3_PRESENT else None
+
+
+@lru_cache(maxsize=None)
+def get_h3_version():
+    """
+    Returns the installed h3 package version, or None if h3 is not installed.
+    Reading the package metadata is slow, so it is deferred until first needed and then cached.
+    """
+    if not IS_H3_PRESENT:
+        return None
+    from importlib.metadata import version
+    return version("h3")
@@ -0,0 +1,252 @@
+#-----------------------------------------------------------
+# Copyright (C) 2022 Aron Gergely
+#-----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#---------------------------------------------------------------------
+import os
+
+from qgis.core import (
+    Qgis,
+    QgsApplication,
+    QgsProject,
+    QgsProviderMetadata,
+    QgsProviderRegistry,
+    QgsVectorLayer,
+    QgsWkbTypes,
+)
+from qgis.PyQt.QtWidgets import QInputDialog, QMessageBox, QPushButton
+from qgis.PyQt.QtGui import QAction
+
+# Check if h3 dependency is installed, handle gracefully if not.
+# h3 itself is imported lazily, when an algorithm or grid layer first needs it, to keep it out of the QGIS startup
+# time. The processing and grid layer providers are imported when they are registered in initGui.
+from .h3_dependency_guard import IS_H3_PRESENT
+
+
+class H3Toolkit:
+    pluginName = 'H3 Toolkit'
+    pluginIconPath = os.path.join(os.path.dirname(__file__), 'h3_logo.svg')
+
+    def __init__(self, iface, is_h3lib_present=IS_H3_PRESENT):
+        self.iface = iface
+        self.provider = None
+        self.menuName = None
+        self.addGridLayerAction = None
+        self.addAdaptiveGridLayerAction = None
+        self.createGridInBackgroundAction = None
+        self.gridControllers = []
+        self.gridTasks = []
+        self.isH3LibPresent = is_h3lib_present
+
+    def initProcessing(self):
+        from .processing.provider import H3Provider
+
+        self.provider = H3Provider(self.pluginIconPath)
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
+    def initGridLayerProvider(self):
+        from .gridlayer.provider import H3GridProvider
+
+        # Providers can not be unregistered, so only register on first load of the plugin
+        registry = QgsProviderRegistry.instance()
+        if H3GridProvider.providerKey() not in registry.providerList():
+            metadata = QgsProviderMetadata(
+                H3GridProvider.providerKey(),
+                H3GridProvider.description(),
+                H3GridProvider.createProvider
+            )
+            registry.registerProvider(metadata)
+
+    def initGui(self):
+        if self.isH3LibPresent:
+            self.initProcessing()
+            self.initGridLayerProvider()
+        else:
+            # Handle gracefully if h3 is not installed
+            widget = self.iface.messageBar().createMessage(
+                f'{self.pluginName} plugin',
+                'H3 library not found. Click on "Help Me Install" for help'
+            )
+            button = QPushButton(widget)
+            button.setText('Help Me Install')
+            button.pressed.connect(self.installHelpWindow)
+            widget.layout().addWidget(button)
+            self.iface.messageBar().pushWidget(widget, level=Qgis.Warning, duration=60)
+
+        self.menuName = f'{self.pluginName} Plugin'
+
+        # add About window
+        self.aboutAction = QAction('About', self.iface.mainWindow())
+        self.iface.addPluginToMenu(f'{self.pluginName} Plugin', self.aboutAction)
+
+        # add grid layer action
+        if self.isH3LibPresent:
+            self.addGridLayerAction = QAction('Add H3 Grid Layer', self.iface.mainWindow())
+            self.iface.addPluginToMenu(f'{self.pluginName} Plugin', self.addGridLayerAction)
+            self.addGridLayerAction.triggered.connect(self.addGridLayer)
+
+            self.addAdaptiveGridLayerAction = QAction('Add Adaptive H3 Grid Layer', self.iface.mainWindow())
+            self.iface.addPluginToMenu(f'{self.pluginName} Plugin', self.addAdaptiveGridLayerAction)
+            self.addAdaptiveGridLayerAction.triggered.connect(self.addAdaptiveGridLayer)
+
+            self.createGridInBackgroundAction = QAction('Create H3 Grid in Background', self.iface.mainWindow())
+            self.iface.addPluginToMenu(f'{self.pluginName} Plugin', self.createGridInBackgroundAction)
+            self.createGridInBackgroundAction.triggered.connect(self.createGridInBackground)
+
+        # add install help window
+        self.installHelpAction = QAction('Install Help', self.iface.mainWindow())
+        self.iface.addPluginToMenu(f'{self.pluginName} Plugin', self.installHelpAction)
+
+        # connect signals
+        self.aboutAction.triggered.connect(self.aboutWindow)
+        self.installHelpAction.triggered.connect(self.installHelpWindow)
+
+    def unload(self):
+        QgsApplication.processingRegistry().removeProvider(self.provider)
+        self.iface.removePluginMenu(f'{self.pluginName} Plugin', self.aboutAction)
+        self.iface.removePluginMenu(f'{self.pluginName} Plugin', self.installHelpAction)
+        if self.addGridLayerAction is not None:
+            self.iface.removePluginMenu(f'{self.pluginName} Plugin', self.addGridLayerAction)
+            self.iface.removePluginMenu(f'{self.pluginName} Plugin', self.addAdaptiveGridLayerAction)
+            self.iface.removePluginMenu(f'{self.pluginName} Plugin', self.createGridInBackgroundAction)
+        for task in self.gridTasks:
+            task.cancel()
+        self.gridTasks = []
+        for controller in self.gridControllers:
+            controller.release()
+        self.gridControllers = []
+
+    def addGridLayer(self):
+        """
+        Adds a layer to the project, which generates the H3 grid on the fly for the visible map extent.
+        """
+        resolution, ok = QInputDialog.getInt(
+            self.iface.mainWindow(),
+            'Add H3 Grid Layer',
+            'Resolution (0=largest, 15=smallest):',
+            7,
+            0,
+            15
+        )
+        if not ok:
+            return
+        layer = QgsVectorLayer(f'resolution={resolution}', f'H3 grid (resolution {resolution})', 'h3grid')
+        if layer.isValid():
+            QgsProject.instance().addMapLayer(layer)
+
+    def addAdaptiveGridLayer(self):
+        """
+        Adds an H3 grid layer whose resolution follows the map scale, keeping cells at a readable size on screen.
+        """
+        from .gridlayer.overlay import AdaptiveGridController
+
+        cellSize, ok = QInputDialog.getInt(
+            self.iface.mainWindow(),
+            'Add Adaptive H3 Grid Layer',
+            'Target cell edge length on screen (pixels):',
+            40,
+            5,
+            500
+        )
+        if not ok:
+            return
+        layer = QgsVectorLayer(f'resolution=auto&cellSize={cellSize}', 'H3 grid (adaptive)', 'h3grid')
+        if layer.isValid():
+            self.gridControllers.append(AdaptiveGridController(self.iface.mapCanvas(), layer))
+            QgsProject.instance().addMapLayer(layer)
+
+    def createGridInBackground(self):
+        """
+        Creates the H3 grid inside the polygons of the active layer in a background task.
+        Cells are added to a memory layer as they are created.
+        """
+        from .processing.tasks import CreateGridTask
+
+        sourceLayer = self.iface.activeLayer()
+        if not isinstance(sourceLayer, QgsVectorLayer) or sourceLayer.geometryType() != QgsWkbTypes.PolygonGeometry:
+            self.iface.messageBar().pushWarning(self.pluginName, 'Select a polygon layer to create the H3 grid in.')
+            return
+
+        resolution, ok = QInputDialog.getInt(
+            self.iface.mainWindow(),
+            'Create H3 Grid in Background',
+            'Resolution (0=largest, 15=smallest):',
+            7,
+            0,
+            15
+        )
+        if not ok:
+            return
+
+        outputLayer = QgsVectorLayer(
+            'Polygon?crs=EPSG:4326&field=index:string(30)',
+            f'H3 grid of {sourceLayer.name()} (resolution {resolution}) (in progress)',
+            'memory'
+        )
+        QgsProject.instance().addMapLayer(outputLayer)
+
+        task = CreateGridTask(sourceLayer, outputLayer, resolution, self.iface.messageBar())
+        # keep a reference to the task until it completes
+        self.gridTasks.append(task)
+        task.taskCompleted.connect(lambda: self.releaseGridTask(task))
+        task.taskTerminated.connect(lambda: self.releaseGridTask(task))
+        QgsApplication.taskManager().addTask(task)
+
+    def releaseGridTask(self, task):
+        if task in self.gridTasks:
+            self.gridTasks.remove(task)
+
+    def aboutWindow(self):
+        windowTitle = f'About {self.pluginName} plugin'
+        if self.isH3LibPresent:
+            from .processing.utilities import getVersionH3Bindings
+            libversions = getVersionH3Bindings()
+        else:
+            libversions = {'c': 'not installed', 'python': 'not installed'}
+        aboutString = f'''
+            <h4>Developer</h4>
+            <p>
+              Aron Gergely</a>
+            </p>
+            <h4>H3 Library versions</h4>
+            <p>
+              C (core): {libversions['c']}<br>
+              Python bindings: {libversions['python']}
+            </p>
+            <hr/>
+            <p>
+              H3 Library © 2022 Uber Technologies, Inc. Licensed under Apache 2.0
+            </p>
+            <p>
+              <a href="https://h3geo.org/">https://h3geo.org/</a>
+            </p>
+            '''
+
+        QMessageBox.information(self.iface.mainWindow(), windowTitle, aboutString)
+
+    def installHelpWindow(self):
+        windowTitle = 'H3 Library Install Help'
+        helpString = '''
+            <p>
+              To start using the plugin you have to install the H3 Library for Python (<a href="https://h3geo.org/">https://h3geo.org/</a>) available as the PyPi package 'h3'. 
+              The plugin is tested with h3 version v4.2.2. However it supports all v4.x and v3.x versions of h3.  
+            </p>
+            <p>To install h3 in the Python environment of QGIS, try the following command within the <a href="https://docs.qgis.org/3.34/en/docs/user_manual/plugins/python_console.html">QGIS Python Console</a>:</p>
+            <pre>!python -m pip install 'h3&gt;=3.0.0'</pre>
+            <p> Alternatively you can try the (<a href="https://plugins.qgis.org/plugins/a00_qpip/">QPIP plugin</a>) to install it with a click of a button.<p>
+            <p>If the above does not work, please refer to the QGIS documentation on how to install Python packages, and the H3 documentation: <a href="https://h3geo.org/docs/installation">https://h3geo.org/docs/installation</a></p>
+            <p>
+              <b>WARNING: While h3 is a small package without other Python sub-dependencies, managing dependencies is your responsibility and comes at your own risk. We strive to make it easier, but this does not place any liability on us in case you break your environment. You are in charge, not the plugin. Please be careful and do your due diligence before attempting the above.</b>
+            </p>
+            <p>
+              Once the package install completed, please reload the plugin (or restart QGIS) to start using it.<br><br>
+              Enjoy!
+            </p>
+            '''
+
+        QMessageBox.information(self.iface.mainWindow(), windowTitle, helpString)
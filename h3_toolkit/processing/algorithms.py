@@ -1,9 +1,9 @@
-import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
 
-import h3
-from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.PyQt.QtCore import QCoreApplication, QDate, QDateTime, Qt, QTime, QVariant
 from qgis.core import (
-    QgsFeatureSink,
     QgsProcessing,
     QgsProcessingException,
     QgsProcessingAlgorithm,
@@ -11,8 +11,14 @@ from qgis.core import (
     QgsProcessingParameterFeatureSink,
     QgsProcessingParameterNumber,
     QgsProcessingParameterExtent,
-    QgsPointXY,
-    QgsGeometry,
+    QgsProcessingParameterField,
+    QgsProcessingParameterEnum,
+    QgsProcessingParameterString,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterFile,
+    QgsProcessingParameterDefinition,
+    QgsProcessingUtils,
+    QgsProcessingOutputNumber,
     QgsFeature,
     QgsField,
     QgsFields,
@@ -20,13 +26,283 @@ from qgis.core import (
     QgsCoordinateTransform,
     QgsWkbTypes,
     QgsFeatureRequest,
+    QgsFeatureSink,
     QgsCoordinateTransformContext,
     QgsVectorLayer,
     QgsProject,
+    QgsDistanceArea,
+    NULL,
 )
 from qgis import processing
 
-from .utilities import yield_small_singleparts
+from .attribution import CellOwnerAttributes, PolygonOwnerIndex
+from .cellstore import SpillingCellSet
+from .clipping import TileCache, clip_to_cells
+from .engine import (
+    COVERAGE_CENTER,
+    KERNEL_UNIFORM,
+    SORT_HILBERT,
+    SORT_NONE,
+    buffer_cells,
+    compact_cells,
+    count_coordinates,
+    count_points,
+    count_points_in_time_bins,
+    distance_to_k,
+    index_coordinates,
+    kernel_weights,
+    line_to_cells,
+    polyline_coordinates,
+    polyfill_geometries,
+    polyfill_owned_geometries,
+    sketch_points,
+    smooth_cells,
+    sort_cells,
+)
+from .h3_adapter import get_h3api
+from .lineworker import LINE_GRID_PATH
+from .polyfillcache import get_polyfill_cache
+from .progress import ProgressReporter
+from .sketches import top_attributes
+from .timebins import unpack_cell_time_bin
+from .estimate import WARN_CELL_COUNT, estimate_grid, geometries_area_km2, geometries_area_perimeter_km
+from .readers import ogr_point_source, read_point_coordinates
+from .utilities import yield_singleparts, yield_small_polygons, yield_small_singleparts
+from .writers import CellOutput, python_value
+
+# Options of the output order parameter, indexed by the engine's SORT_* constants
+SORT_ORDER_OPTIONS = ['None (fastest)', 'H3 index', 'Hilbert curve of cell centroids']
+
+SORT_ORDER_HELP = (
+    'Order in which grid cells are written. Spatially sorted output makes building the spatial index '
+    'of the output file, and later tiled reads, faster. Sorting by H3 index keeps cells sharing a parent together, '
+    'sorting by Hilbert curve keeps nearby cells together.'
+)
+
+# Help texts of the advanced polyfill parameters, shared with the extent wrapper algorithm
+MAX_CELLS_IN_MEMORY_HELP = (
+    'Out-of-core mode for grids larger than the available memory. Above this many cells, '
+    'cell indexes are spilled to temporary files as sorted runs, which are merged while writing the output. '
+    'Output cells are then written in H3 index order.'
+)
+
+MAX_ESTIMATED_CELLS_HELP = (
+    'Before creating the grid, its cell count is estimated from the input area and perimeter, '
+    'in an extra pass over the input features. '
+    'Processing is aborted if the estimate exceeds this limit, to avoid running out of memory. '
+    'With 0, the estimate is skipped.'
+)
+
+USE_CACHE_HELP = (
+    'Polyfill results are cached for the QGIS session, keyed by polygon, resolution and coverage. '
+    'Polygons which did not change since a previous run are not polyfilled again, '
+    'e.g. in models run repeatedly.'
+)
+
+CACHE_DIR_HELP = 'If given, polyfill results are also stored in this directory, to be reused across sessions.'
+
+
+def createSortOrderParameter(name, tr):
+    """
+    Returns the output order parameter shared by the grid creating algorithms.
+    """
+    sortOrderParam = QgsProcessingParameterEnum(
+        name,
+        tr('Output order'),
+        options=[tr(option) for option in SORT_ORDER_OPTIONS],
+        defaultValue=SORT_NONE
+    )
+    sortOrderParam.setFlags(sortOrderParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+    sortOrderParam.setHelp(SORT_ORDER_HELP)
+    return sortOrderParam
+
+
+def countPointSource(algorithm, parameters, inputName, context, pointSource, resolution, feedback, workers=0):
+    """
+    Indexes the points of an algorithm's point source parameter on the H3 grid and returns the number of
+    points per cell. File based layers are read in batches through OGR, any other source feature by feature.
+    With more than one worker, points are indexed on a pool of worker processes. If the worker processes
+    can not be started or die, the points are indexed in this process.
+    """
+    if workers > 1:
+        # multiprocessing and concurrent.futures are only imported when points are counted in parallel
+        from .parallel import BrokenProcessPool, ParallelPointCounter
+
+        def newCounter():
+            return ParallelPointCounter(workers, resolution)
+
+        try:
+            counts = _countPoints(algorithm, parameters, inputName, context, pointSource, resolution, feedback, newCounter)
+            if counts is not None:
+                return counts
+        except BrokenProcessPool as e:
+            feedback.pushWarning(f'Worker processes failed, indexing points in this process: {e}')
+
+    return _countPoints(algorithm, parameters, inputName, context, pointSource, resolution, feedback)
+
+
+def _countPoints(algorithm, parameters, inputName, context, pointSource, resolution, feedback, newCounter=None):
+    """
+    Counts the points of a point source per cell, see `countPointSource`. With `newCounter`, on the
+    parallel counter it returns; returns None if the counter can not be created.
+    """
+    sourceCrs = pointSource.sourceCrs()
+    counts = None
+
+    counter = None
+    if newCounter is not None:
+        try:
+            counter = newCounter()
+            feedback.pushInfo(f'Indexing points on {counter.workers} worker processes.')
+        except (RuntimeError, OSError) as e:
+            feedback.pushWarning(f'Worker processes not available, indexing points in this process: {e}')
+            return None
+
+    # Progress is reported per batch or chunk of points, not per point
+    progress = ProgressReporter(feedback, pointSource.featureCount())
+
+    try:
+        # File based layers: read coordinate columns in large batches through OGR's ArrowStream
+        ogrSource = ogr_point_source(parameters, inputName, algorithm.parameterAsVectorLayer(parameters, inputName, context))
+        if ogrSource is not None:
+            feedback.pushInfo('Reading point coordinates in batches.')
+            counts = dict()
+            batches = read_point_coordinates(*ogrSource, sourceCrs)
+            while True:
+                # Only reading errors fall back to the feature iterator. Worker failures (BrokenProcessPool,
+                # a RuntimeError too) are raised by counter.add, outside of this try, to the caller.
+                try:
+                    lngs, lats = next(batches)
+                except StopIteration:
+                    break
+                except RuntimeError as e:
+                    feedback.pushWarning(f'Batch reading failed, falling back to reading features one by one: {e}')
+                    counts = None
+                    progress = ProgressReporter(feedback, pointSource.featureCount())
+                    # drop the points already sent to the workers
+                    if counter is not None:
+                        counter.close()
+                        counter = newCounter()
+                    break
+
+                if counter is not None:
+                    counter.add(lngs, lats)
+                else:
+                    count_coordinates(lngs, lats, resolution, counts)
+                if not progress.advance(len(lngs)):
+                    break
+
+        # Any other source: iterate features
+        if counts is None:
+            transformer = QgsCoordinateTransform(
+                sourceCrs,
+                QgsCoordinateReferenceSystem('EPSG:4326'),
+                QgsProject.instance()
+            )
+            # Only point geometries are used, so skip fetching attributes
+            featureRequest = QgsFeatureRequest().setSubsetOfAttributes([])
+
+            points = (transformer.transform(f.geometry().asPoint()) for f in pointSource.getFeatures(featureRequest))
+            if counter is not None:
+                from .parallel import CHUNK_SIZE
+
+                while True:
+                    batch = list(islice(points, CHUNK_SIZE))
+                    if not batch:
+                        break
+                    counter.add([p.x() for p in batch], [p.y() for p in batch])
+                    if not progress.advance(len(batch)):
+                        break
+            else:
+                counts = count_points(progress.track(points), resolution)
+
+        # On cancel, keep the partial counts: the pending chunks are dropped by closing the worker pool
+        if counter is not None:
+            counts = counter.counts if feedback.isCanceled() else counter.result(feedback.isCanceled)
+    finally:
+        if counter is not None:
+            counter.close()
+
+    if not feedback.isCanceled():
+        progress.finish()
+    return counts
+
+
+# Help text of the resolution parameter, shared by all algorithms
+RESOLUTION_HELP = '''
+    The resolution level of the grid, as defined in the H3 standard.
+    <br>
+    <table>
+      <tr>
+        <th>Resolution<br>Level</th>
+        <th>Avg. Hexagon<br>Edge Length</th>
+      </tr>
+      <tr>
+        <td style="text-align: center">0</td>
+        <td style="text-align: center">1107.71 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">1</td>
+        <td style="text-align: center">418.68 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">2</td>
+        <td style="text-align: center">158.24 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">3</td>
+        <td style="text-align: center">59.81 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">4</td>
+        <td style="text-align: center">22.61 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">5</td>
+        <td style="text-align: center">8.54 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">6</td>
+        <td style="text-align: center">3.23 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">7</td>
+        <td style="text-align: center">1.22 km</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">8</td>
+        <td style="text-align: center">461.35 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">9</td>
+        <td style="text-align: center">174.38 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">10</td>
+        <td style="text-align: center">65.91 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">11</td>
+        <td style="text-align: center">24.91 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">12</td>
+        <td style="text-align: center">9.42 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">13</td>
+        <td style="text-align: center">3.56 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">14</td>
+        <td style="text-align: center">1.35 m</td>
+      </tr>
+      <tr>
+        <td style="text-align: center">15</td>
+        <td style="text-align: center">0.51 m</td>
+      </tr>
+    </table>
+    '''
 
 
 class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
@@ -34,15 +310,28 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
     Processing algorithm to create an H3 grid inside polygons.
     Takes vector layer and resolution as inputs.
     Evaluates H3 grid cells at given resolutions inside polygons of input layer.
-    Cells are considered to be 'inside' if their centroid is contained by a polygon.
-    Generates the grid cells as polygons with their H3 index in the attribute table.
+    Cells are considered to be 'inside' if their centroid is contained by a polygon, or depending on
+    the coverage mode, if they intersect a polygon or are fully contained by it.
+    Generates the grid cells as polygons with their H3 index in the attribute table, and optionally the
+    attributes of the source polygon each cell belongs to.
     Outputs result as a polygon vector layer.
     """
 
     INPUT = 'INPUT'
     RESOLUTION = 'RESOLUTION'
+    COVERAGE = 'COVERAGE'
+    COMPACT = 'COMPACT'
+    ATTRIBUTES = 'ATTRIBUTES'
+    MAX_CELLS_IN_MEMORY = 'MAX_CELLS_IN_MEMORY'
+    MAX_ESTIMATED_CELLS = 'MAX_ESTIMATED_CELLS'
+    SORT_ORDER = 'SORT_ORDER'
+    USE_CACHE = 'USE_CACHE'
+    CACHE_DIR = 'CACHE_DIR'
     OUTPUT = 'OUTPUT'
 
+    # Indexed by the engine's COVERAGE_* constants
+    COVERAGE_OPTIONS = ['Cell center inside polygon', 'Cell intersects polygon', 'Cell fully inside polygon']
+
     def tr(self, string):
         """
         Returns a translatable string with the self.tr() function.
@@ -70,7 +359,15 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
             '<b>Input:</b> Polygon layer (automatically transformed to WGS84 if needed)<br>'
             '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
             '<b>Output:</b> Polygon layer with H3 indexes as attributes<br><br>'
-            'Grid cells are considered <i>inside</i> a polygon if their centroid falls within it.<br><br>'
+            '<b>Coverage:</b> Grid cells are considered <i>inside</i> a polygon if their centroid falls within it '
+            '(default), if they intersect it, or if they are fully contained by it.<br>'
+            '<b>Compact:</b> Replaces complete sets of sibling cells by their parent cell, recursively. '
+            'The output then holds cells of mixed resolutions, with their resolution as attribute. '
+            'Greatly reduces the output size of large coverage areas.<br>'
+            '<b>Source attributes:</b> Fields of the input layer to copy to the grid cells (optional). Each cell '
+            'gets the attributes of the first input polygon it belongs to, without a separate spatial join.<br><br>'
+            '<b>Tip:</b> FlatGeobuf (.fgb) and GeoParquet (.parquet) outputs are written directly to file, '
+            'without building a QGIS feature per cell.<br><br>'
             '<b>Resolution Reference Table:</b><br>'
             '<table>'
             '  <tr><th>Level</th><th>Avg Edge Length</th></tr>'
@@ -116,86 +413,74 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
                 maxValue=15
             )
 
-        resolutionParam.setHelp(
-            '''
-            The resolution level of the grid, as defined in the H3 standard.
-            <br>
-            <table>
-              <tr>
-                <th>Resolution<br>Level</th>
-                <th>Avg. Hexagon<br>Edge Length</th>
-              </tr>
-              <tr>
-                <td style="text-align: center">0</td>
-                <td style="text-align: center">1107.71 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">1</td>
-                <td style="text-align: center">418.68 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">2</td>
-                <td style="text-align: center">158.24 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">3</td>
-                <td style="text-align: center">59.81 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">4</td>
-                <td style="text-align: center">22.61 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">5</td>
-                <td style="text-align: center">8.54 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">6</td>
-                <td style="text-align: center">3.23 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">7</td>
-                <td style="text-align: center">1.22 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">8</td>
-                <td style="text-align: center">461.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">9</td>
-                <td style="text-align: center">174.38 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">10</td>
-                <td style="text-align: center">65.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">11</td>
-                <td style="text-align: center">24.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">12</td>
-                <td style="text-align: center">9.42 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">13</td>
-                <td style="text-align: center">3.56 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">14</td>
-                <td style="text-align: center">1.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">15</td>
-                <td style="text-align: center">0.51 m</td>
-              </tr>
-            </table>
-            '''
+        resolutionParam.setHelp(RESOLUTION_HELP)
+
+        coverageParam = QgsProcessingParameterEnum(
+            self.COVERAGE,
+            self.tr('Coverage'),
+            options=[self.tr(option) for option in self.COVERAGE_OPTIONS],
+            defaultValue=COVERAGE_CENTER
+        )
+
+        compactParam = QgsProcessingParameterBoolean(
+            self.COMPACT,
+            self.tr('Compact cells (mixed resolutions)'),
+            defaultValue=False
+        )
+
+        attributesParam = QgsProcessingParameterField(
+            self.ATTRIBUTES,
+            self.tr('Source attributes to copy to the cells'),
+            parentLayerParameterName=self.INPUT,
+            allowMultiple=True,
+            optional=True
         )
+
+        maxCellsInMemoryParam = QgsProcessingParameterNumber(
+            self.MAX_CELLS_IN_MEMORY,
+            self.tr('Maximum grid cells kept in memory (0 = no limit)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            defaultValue=0
+        )
+        maxCellsInMemoryParam.setFlags(maxCellsInMemoryParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        maxCellsInMemoryParam.setHelp(MAX_CELLS_IN_MEMORY_HELP)
+        maxEstimatedCellsParam = QgsProcessingParameterNumber(
+            self.MAX_ESTIMATED_CELLS,
+            self.tr('Abort above this many estimated grid cells (0 = no limit)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            defaultValue=100000000
+        )
+        maxEstimatedCellsParam.setFlags(maxEstimatedCellsParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        maxEstimatedCellsParam.setHelp(MAX_ESTIMATED_CELLS_HELP)
+        useCacheParam = QgsProcessingParameterBoolean(
+            self.USE_CACHE,
+            self.tr('Reuse polyfill results of previous runs'),
+            defaultValue=True
+        )
+        useCacheParam.setFlags(useCacheParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        useCacheParam.setHelp(USE_CACHE_HELP)
+        cacheDirParam = QgsProcessingParameterFile(
+            self.CACHE_DIR,
+            self.tr('Polyfill cache directory'),
+            behavior=QgsProcessingParameterFile.Folder,
+            optional=True
+        )
+        cacheDirParam.setFlags(cacheDirParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        cacheDirParam.setHelp(CACHE_DIR_HELP)
         outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
 
         self.addParameter(inputParam)
         self.addParameter(resolutionParam)
+        self.addParameter(coverageParam)
+        self.addParameter(compactParam)
+        self.addParameter(attributesParam)
+        self.addParameter(maxCellsInMemoryParam)
+        self.addParameter(maxEstimatedCellsParam)
+        self.addParameter(createSortOrderParameter(self.SORT_ORDER, self.tr))
+        self.addParameter(useCacheParam)
+        self.addParameter(cacheDirParam)
         self.addParameter(outputParam)
 
     def processAlgorithm(self, parameters, context, feedback):
@@ -215,6 +500,54 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
             context
         )
 
+        coverage = self.parameterAsEnum(
+            parameters,
+            self.COVERAGE,
+            context
+        )
+
+        compact = self.parameterAsBool(
+            parameters,
+            self.COMPACT,
+            context
+        )
+
+        attributeFieldNames = self.parameterAsFields(
+            parameters,
+            self.ATTRIBUTES,
+            context
+        )
+
+        maxCellsInMemory = self.parameterAsInt(
+            parameters,
+            self.MAX_CELLS_IN_MEMORY,
+            context
+        )
+
+        maxEstimatedCells = self.parameterAsInt(
+            parameters,
+            self.MAX_ESTIMATED_CELLS,
+            context
+        )
+
+        sortOrder = self.parameterAsEnum(
+            parameters,
+            self.SORT_ORDER,
+            context
+        )
+
+        useCache = self.parameterAsBool(
+            parameters,
+            self.USE_CACHE,
+            context
+        )
+
+        cacheDir = self.parameterAsFile(
+            parameters,
+            self.CACHE_DIR,
+            context
+        )
+
         # validate source parameter
         if source is None:
             raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
@@ -235,75 +568,134 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
             comment='H3 index')
         fields = QgsFields()
         fields.append(indexField)
-
-        # create sink
-        (sink, dest_id) = self.parameterAsSink(
-            parameters,
-            self.OUTPUT,
-            context,
-            fields,
-            QgsWkbTypes.Polygon,
-            QgsCoordinateReferenceSystem('EPSG:4326')
-        )
-        # Raise error if sink not created
-        if sink is None:
-            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+        if compact:
+            fields.append(QgsField(
+                name='resolution',
+                type=QVariant.Int,
+                comment='H3 resolution'
+            ))
+
+        # Source attributes copied to the cells
+        attributeFieldIndexes = [source.fields().lookupField(name) for name in attributeFieldNames]
+        for name, fieldIndex in zip(attributeFieldNames, attributeFieldIndexes):
+            if fieldIndex < 0:
+                raise QgsProcessingException(f'Field not found: {name}')
+            if fields.lookupField(name) >= 0:
+                raise QgsProcessingException(f'Source field name conflicts with an output field: {name}')
+            fields.append(QgsField(source.fields().at(fieldIndex)))
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
 
         ##############
         # Processing #
         ##############
 
-        # If source is not in WGS84, set up the feature request filter to reproject source features on the fly
+        # If source is not in WGS84, set up the feature request filter to reproject source features on the fly.
+        # Only geometries and the copied source attributes are used, so skip fetching other attributes.
         featureRequestFilter = QgsFeatureRequest().setDestinationCrs(
             QgsCoordinateReferenceSystem('EPSG:4326'),
             QgsCoordinateTransformContext()
-        )
+        ).setSubsetOfAttributes(attributeFieldIndexes)
 
         # warn user if reprojection is necessary
         if source.sourceCrs() != featureRequestFilter.destinationCrs():
             feedback.pushWarning('Input source is not in WGS84 projection. On the fly reprojection will be used.')
 
+        # -------------------------------------------------------------------------
+        # Pre-flight check: estimate the size of the grid, unless there is no limit
+        # -------------------------------------------------------------------------
+        if maxEstimatedCells > 0:
+            # only the geometries are needed
+            estimateRequest = QgsFeatureRequest(featureRequestFilter).setSubsetOfAttributes([])
+            areaKm2, perimeterKm = geometries_area_perimeter_km(
+                f.geometry() for f in source.getFeatures(request=estimateRequest)
+            )
+            estimate = estimate_grid(areaKm2, resolution, perimeterKm, coverage)
+            feedback.pushInfo(f'Estimated grid size: {estimate.describe()}.')
+
+            suggestion = (
+                'Consider a coarser resolution, the out-of-core mode (see advanced parameters) '
+                'and a FlatGeobuf or GeoParquet output.'
+            )
+            if maxEstimatedCells < estimate.cellCount:
+                raise QgsProcessingException(
+                    f'The estimated {estimate.cellCount:,} grid cells exceed the limit of {maxEstimatedCells:,}. '
+                    f'{suggestion} The limit can be changed in the advanced parameters.'
+                )
+            if estimate.cellCount > WARN_CELL_COUNT:
+                feedback.pushWarning(f'Large grid. {suggestion}')
+
         # -------------------------------------------------------------
         # STEP 1: Find indexes of hexagons cells within source features
         # -------------------------------------------------------------
         feedback.pushInfo('Looking up grid cell indexes...')
 
-        hexIndexSet = set()
         # looping on geometries, yielding them as single-part, with any overly-large geoms split into two.
-        # The latter is to avoid h3.polyfill() inverting geom's domain along lon,
+        # The latter is to avoid the polyfill inverting geom's domain along lon,
         # when geom's length along lon > 180  (WGS84)
-        for geom in yield_small_singleparts(source.getFeatures(request=featureRequestFilter)):
-            """
-            polys = []
-            if geom.isMultipart():
-                for part in geom.asMultiPolygon():
-                    polypart = []
-                    for ring in part:
-                        polypart.append([(p.y(), p.x()) for p in ring])
-                    polys.append(h3.LatLngPoly(*polypart))
-                poly_obj = h3.LatLngMultiPoly(*polys)
+        # Out-of-core mode: spill cells beyond the memory limit to temporary files
+        if maxCellsInMemory > 0:
+            hexIndexSet = SpillingCellSet(maxCellsInMemory, QgsProcessingUtils.tempFolder())
+        else:
+            hexIndexSet = set()
+
+        cache = None
+        if useCache:
+            cache = get_polyfill_cache(cacheDir)
+            cache.resetStats()
+
+        # Attribution mode: in memory, each cell remembers the polygon it came from. Out-of-core or compacted,
+        # cells are attributed while writing, from a spatial index over the polygons.
+        ownerAttributes = []
+        owners = None
+        ownerIndex = None
+        if attributeFieldIndexes:
+            if maxCellsInMemory > 0 or compact:
+                ownerIndex = PolygonOwnerIndex(coverage)
+            else:
+                owners = dict()
+
+        try:
+            if attributeFieldIndexes:
+                polyfill_owned_geometries(
+                    self.yieldOwnedGeometries(
+                        source.getFeatures(request=featureRequestFilter),
+                        attributeFieldIndexes,
+                        ownerAttributes,
+                        ownerIndex
+                    ),
+                    resolution,
+                    feedback,
+                    hexIndexSet,
+                    coverage,
+                    owners,
+                    cache
+                )
             else:
-                for ring in geom.asPolygon():
-                    polys.append([(p.y(), p.x()) for p in ring])
-                poly_obj = h3.LatLngPoly(*polys)
-
-            newSet = h3.h3shape_to_cells(poly_obj, resolution)
-            """
-            polys = []
-            for ring in geom.asPolygon():
-                polys.append([(p.y(), p.x()) for p in ring])
-            poly_obj = h3.LatLngPoly(*polys)
-            newSet = h3.h3shape_to_cells(poly_obj, resolution)
-            hexIndexSet.update(newSet)
+                polyfill_geometries(
+                    yield_small_singleparts(source.getFeatures(request=featureRequestFilter)),
+                    resolution,
+                    feedback,
+                    hexIndexSet,
+                    coverage,
+                    cache=cache
+                )
 
-            # Stop if cancel button has been clicked
             if feedback.isCanceled():
                 feedback.pushInfo('Processing canceled.')
-                break
-        else:
+                return {self.OUTPUT: dest_id}
+
+            if cache is not None and cache.hits > 0:
+                feedback.pushInfo(f'Reused cached polyfill results of {cache.hits} of {cache.hits + cache.misses} polygons.')
+
             hexIndexSetLenth = len(hexIndexSet)
             if hexIndexSetLenth > 0:
-                feedback.pushInfo(f'{hexIndexSetLenth} grid cells to create.')
+                if isinstance(hexIndexSet, SpillingCellSet) and hexIndexSet.spilled:
+                    feedback.pushInfo(f'Up to {hexIndexSetLenth} grid cells to create, spilled to temporary files.')
+                else:
+                    feedback.pushInfo(f'{hexIndexSetLenth} grid cells to create.')
             else:
                 feedback.pushWarning(
                     '0 grid cells to create. '
@@ -312,51 +704,79 @@ class CreateH3GridInsidePolygonsProcessingAlgorithm(QgsProcessingAlgorithm):
                 feedback.pushWarning('Empty Output.')
                 return {self.OUTPUT: dest_id}
 
-        # -----------------------------------------
-        # STEP 2. Generate the grid cell geometries
-        # -----------------------------------------
-        feedback.pushInfo('Generating grid cells...')
-
-        # For the progress bar
-        progressPerHex = 100.0 / len(hexIndexSet) if len(hexIndexSet) > 0 else 0
-        currentProgress = 0
-        lastProgress = 0
-
-        # Set up template feature
-        feature = QgsFeature(fields)
-
-        for i, index in enumerate(hexIndexSet):
-            # create hex geometry
-            hexVertexCoords = h3.cell_to_boundary(index)
-            hexGeometry = QgsGeometry.fromPolygonXY([[QgsPointXY(lon, lat) for lat, lon in hexVertexCoords], ])
-
-            # create hex feature, add to sink
-            feature.setGeometry(hexGeometry)
-            feature.setAttribute('index', index)
-            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+            attributes = None
+            if compact:
+                feedback.pushInfo('Compacting grid cells...')
+                h3api = get_h3api()
+                if isinstance(hexIndexSet, SpillingCellSet):
+                    compacted = compact_cells(hexIndexSet.iterInts())
+                else:
+                    compacted = compact_cells(map(h3api.cell_to_int, hexIndexSet))
+                    # the full resolution cells are not needed anymore, free their memory
+                    hexIndexSet.clear()
+
+                compactedCells = [h3api.int_to_cell(value) for value in compacted]
+                attributes = {cell: [h3api.get_resolution(cell)] for cell in compactedCells}
+                feedback.pushInfo(f'Compacted to {len(compactedCells)} grid cells.')
+
+                hexIndexSetLenth = len(compactedCells)
+                cells = sort_cells(compactedCells, sortOrder) if sortOrder != SORT_NONE else compactedCells
+
+            # Spilled cell sets are already merged in H3 index order, and can not be sorted in memory
+            elif isinstance(hexIndexSet, SpillingCellSet) and hexIndexSet.spilled:
+                if sortOrder == SORT_HILBERT:
+                    feedback.pushWarning('Out-of-core mode: grid cells are written in H3 index order.')
+                cells = hexIndexSet
+            elif sortOrder != SORT_NONE:
+                feedback.pushInfo('Sorting grid cells...')
+                cells = sort_cells(hexIndexSet, sortOrder)
+            else:
+                cells = hexIndexSet
+
+            if attributeFieldIndexes:
+                attributes = CellOwnerAttributes(
+                    ownerAttributes,
+                    owners.get if owners is not None else ownerIndex.owner,
+                    len(attributeFieldIndexes),
+                    attributes
+                )
 
-            # check and report progress
-            currentProgress = int(i * progressPerHex)
-            if currentProgress != lastProgress:
-                lastProgress = currentProgress
-                feedback.setProgress(lastProgress)
+            # -----------------------------------------
+            # STEP 2. Generate the grid cell geometries
+            # -----------------------------------------
+            feedback.pushInfo('Generating grid cells...')
 
-            # Stop if cancel button has been clicked
-            if feedback.isCanceled():
+            if output.write(cells, hexIndexSetLenth, feedback, attributes):
+                feedback.pushInfo('Done.')
+            else:
                 feedback.pushInfo('Processing canceled.')
-                break
-        else:
-            feedback.pushInfo('Done.')
+        finally:
+            if isinstance(hexIndexSet, SpillingCellSet):
+                hexIndexSet.close()
 
         return {self.OUTPUT: dest_id}
 
+    def yieldOwnedGeometries(self, features, fieldIndexes, ownerAttributes, ownerIndex=None):
+        """
+        Generator function. Yields (feature ordinal, singlepart polygon) pairs of the features, splitting
+        overly large polygons like `yield_small_singleparts`. Collects the attributes of each feature in
+        `ownerAttributes`, as values the file writers accept (see `writers.python_value`), and adds each
+        part to `ownerIndex` if given.
+        """
+        for ordinal, f in enumerate(features):
+            ownerAttributes.append([python_value(f.attribute(i)) for i in fieldIndexes])
+            for geom in yield_small_polygons(yield_singleparts([f])):
+                if ownerIndex is not None:
+                    ownerIndex.addPart(ordinal, geom)
+                yield ordinal, geom
+
 
 class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
     """
     Processing algorithm to create an H3 grid inside an extent.
     Takes extent and resolution as inputs. Creates an in-memory polygon vector layer from the extent, then
-    calls `CreateH3GridInsidePolygonsProcessingAlgorithm` as child algorithm with the in-memory layer
-    and the resolution as inputs.
+    calls `CreateH3GridInsidePolygonsProcessingAlgorithm` as child algorithm with the in-memory layer,
+    the resolution and the coverage, compaction, memory, order and cache options as inputs.
 
     Outputs the child algorithm's output.
 
@@ -367,8 +787,18 @@ class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
 
     EXTENT = 'EXTENT'
     RESOLUTION = 'RESOLUTION'
+    COVERAGE = 'COVERAGE'
+    COMPACT = 'COMPACT'
+    MAX_CELLS_IN_MEMORY = 'MAX_CELLS_IN_MEMORY'
+    MAX_ESTIMATED_CELLS = 'MAX_ESTIMATED_CELLS'
+    SORT_ORDER = 'SORT_ORDER'
+    USE_CACHE = 'USE_CACHE'
+    CACHE_DIR = 'CACHE_DIR'
     OUTPUT = 'OUTPUT'
 
+    # Parameters passed through to the child algorithm, if given
+    CHILD_PARAMETERS = [COVERAGE, COMPACT, MAX_CELLS_IN_MEMORY, MAX_ESTIMATED_CELLS, SORT_ORDER, USE_CACHE, CACHE_DIR]
+
     def tr(self, string):
         """
         Returns a translatable string with the self.tr() function.
@@ -397,7 +827,8 @@ class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
             '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
             '<b>Output:</b> Polygon layer with H3 indexes as attributes<br><br>'
             'This tool internally creates a temporary polygon from the input extent and uses the same '
-            'processing logic as the <i>Create H3 Grid Inside Polygons</i> tool.<br><br>'
+            'processing logic as the <i>Create H3 Grid Inside Polygons</i> tool. Coverage, compaction and the '
+            'advanced options are passed on to it, see its help for details.<br><br>'
             'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.'
         )
         return self.tr(helpString)
@@ -416,86 +847,65 @@ class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
                 maxValue=15
             )
 
-        resolutionParam.setHelp(
-            '''
-            The resolution level of the grid, as defined in the H3 standard.
-            <br>
-            <table>
-              <tr>
-                <th>Resolution<br>Level</th>
-                <th>Avg. Hexagon<br>Edge Length</th>
-              </tr>
-              <tr>
-                <td style="text-align: center">0</td>
-                <td style="text-align: center">1107.71 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">1</td>
-                <td style="text-align: center">418.68 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">2</td>
-                <td style="text-align: center">158.24 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">3</td>
-                <td style="text-align: center">59.81 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">4</td>
-                <td style="text-align: center">22.61 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">5</td>
-                <td style="text-align: center">8.54 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">6</td>
-                <td style="text-align: center">3.23 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">7</td>
-                <td style="text-align: center">1.22 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">8</td>
-                <td style="text-align: center">461.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">9</td>
-                <td style="text-align: center">174.38 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">10</td>
-                <td style="text-align: center">65.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">11</td>
-                <td style="text-align: center">24.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">12</td>
-                <td style="text-align: center">9.42 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">13</td>
-                <td style="text-align: center">3.56 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">14</td>
-                <td style="text-align: center">1.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">15</td>
-                <td style="text-align: center">0.51 m</td>
-              </tr>
-            </table>
-            '''
+        resolutionParam.setHelp(RESOLUTION_HELP)
+
+        coverageParam = QgsProcessingParameterEnum(
+            self.COVERAGE,
+            self.tr('Coverage'),
+            options=[self.tr(option) for option in CreateH3GridInsidePolygonsProcessingAlgorithm.COVERAGE_OPTIONS],
+            defaultValue=COVERAGE_CENTER
+        )
+
+        compactParam = QgsProcessingParameterBoolean(
+            self.COMPACT,
+            self.tr('Compact cells (mixed resolutions)'),
+            defaultValue=False
+        )
+
+        maxCellsInMemoryParam = QgsProcessingParameterNumber(
+            self.MAX_CELLS_IN_MEMORY,
+            self.tr('Maximum grid cells kept in memory (0 = no limit)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            defaultValue=0
+        )
+        maxCellsInMemoryParam.setFlags(maxCellsInMemoryParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        maxCellsInMemoryParam.setHelp(MAX_CELLS_IN_MEMORY_HELP)
+        maxEstimatedCellsParam = QgsProcessingParameterNumber(
+            self.MAX_ESTIMATED_CELLS,
+            self.tr('Abort above this many estimated grid cells (0 = no limit)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            defaultValue=100000000
         )
+        maxEstimatedCellsParam.setFlags(maxEstimatedCellsParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        maxEstimatedCellsParam.setHelp(MAX_ESTIMATED_CELLS_HELP)
+        useCacheParam = QgsProcessingParameterBoolean(
+            self.USE_CACHE,
+            self.tr('Reuse polyfill results of previous runs'),
+            defaultValue=True
+        )
+        useCacheParam.setFlags(useCacheParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        useCacheParam.setHelp(USE_CACHE_HELP)
+        cacheDirParam = QgsProcessingParameterFile(
+            self.CACHE_DIR,
+            self.tr('Polyfill cache directory'),
+            behavior=QgsProcessingParameterFile.Folder,
+            optional=True
+        )
+        cacheDirParam.setFlags(cacheDirParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        cacheDirParam.setHelp(CACHE_DIR_HELP)
         outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
 
         self.addParameter(extentParam)
         self.addParameter(resolutionParam)
+        self.addParameter(coverageParam)
+        self.addParameter(compactParam)
+        self.addParameter(maxCellsInMemoryParam)
+        self.addParameter(maxEstimatedCellsParam)
+        self.addParameter(createSortOrderParameter(self.SORT_ORDER, self.tr))
+        self.addParameter(useCacheParam)
+        self.addParameter(cacheDirParam)
         self.addParameter(outputParam)
 
     def processAlgorithm(self, parameters, context, feedback):
@@ -530,13 +940,16 @@ class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
         inputLayer.dataProvider().addFeature(feature)
 
         # Run "Create H3 grid within polygons"  with the temp layer as input
+        childParameters = {
+            'INPUT': inputLayer,
+            'RESOLUTION': parameters['RESOLUTION'],
+            'OUTPUT': parameters['OUTPUT'],
+        }
+        # options left out use the child algorithm's defaults
+        childParameters.update({name: parameters[name] for name in self.CHILD_PARAMETERS if name in parameters})
         grid = processing.run(
             'h3:createh3gridinsidepolygons',
-            {
-                'INPUT': inputLayer,
-                'RESOLUTION': parameters['RESOLUTION'],
-                'OUTPUT': parameters['OUTPUT'],
-            },
+            childParameters,
             is_child_algorithm=True,
             context=context,
             feedback=feedback,
@@ -544,21 +957,19 @@ class CreateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
         return {self.OUTPUT: grid['OUTPUT']}
 
 
-class CountPointsOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
-    #TODO:
-    # - status bar
-    # - more feedback info to user
+class CreateH3GridAroundFeaturesProcessingAlgorithm(QgsProcessingAlgorithm):
     """
-    Count points to H3 grid processing algorithm.
-
-    Takes point vector layer as input.
-    Counts points falling within H3 grid cells at given resolution
-
-    Generates the grid cells as polygons with their H3 index and point counts in the attribute table.
-    Outputs result as a polygon vector layer.
+    Processing algorithm to create an H3 grid around points and lines.
+    Takes a point or line vector layer, a resolution and a distance as inputs.
+    Indexes each point, or the cells along each line, and expands them to their grid disk of
+    k = ceil(distance / (sqrt(3) * average edge length)), without buffering nor polyfilling geometries.
+    Outputs the deduplicated cells as a polygon vector layer.
     """
+
     INPUT = 'INPUT'
     RESOLUTION = 'RESOLUTION'
+    DISTANCE = 'DISTANCE'
+    SORT_ORDER = 'SORT_ORDER'
     OUTPUT = 'OUTPUT'
 
     def tr(self, string):
@@ -568,30 +979,34 @@ class CountPointsOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
         return QCoreApplication.translate('Processing', string)
 
     def createInstance(self):
-        return CountPointsOnH3GridProcessingAlgorithm()
+        return CreateH3GridAroundFeaturesProcessingAlgorithm()
 
     def name(self):
-        return 'countpointson3Grid'
+        return 'createh3gridaroundfeatures'
 
     def displayName(self):
-        return self.tr('Count points on H3 Grid')
+        return self.tr('Create H3 grid around points and lines')
 
-    # def group(self):
+    #def group(self):
     #    return self.tr('Grid Creation')
 
-    # def groupId(self):
+    #def groupId(self):
     #    return 'gridcreation'
 
     def shortHelpString(self):
         helpString = (
-            'Aggregates point features into H3 grid cells and counts points per cell.<br><br>'
-            '<b>Input:</b> Point layer (automatically transformed to WGS84 if needed)<br>'
+            'Creates the H3 grid cells within a distance of the input points or lines, e.g. catchments '
+            'around facilities. Much faster than buffering the features and creating the grid inside the buffers.<br><br>'
+            '<b>Input:</b> Point or line layer (automatically transformed to WGS84 if needed)<br>'
             '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
-            '<b>Output:</b> Polygon layer of H3 index geometry with point counts as attributes<br><br>'
-            'Grid cells are generated where points exist. Each cell shows total points within its boundaries.<br><br>'
-            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.<br><br>'
-            '<b>Note:</b> Input points are transformed to WGS84 (EPSG:4326). '
-            'Results may be inaccurate for features crossing CRS boundaries.'
+            '<b>Distance:</b> Distance around the features, in meters. It is converted to a number of cell rings '
+            'k around the cells of the features, rounded up: k = ceil(distance / (√3 × average edge length)). '
+            'A distance of 0 outputs the cells of the features only.<br>'
+            '<b>Output:</b> Polygon layer with H3 indexes as attributes, each cell once<br><br>'
+            'Lines are indexed at points half a cell edge apart along their segments.<br><br>'
+            '<b>Note:</b> Distances follow the grid, so the covered area is a hexagon-like shape rather than a circle, '
+            'and cell sizes vary slightly over the globe. '
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.'
         )
         return self.tr(helpString)
 
@@ -600,107 +1015,45 @@ class CountPointsOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
     #    return
 
     def initAlgorithm(self, config=None):
-        #extentParam = QgsProcessingParameterExtent(self.EXTENT, self.tr('Extent'))
-        pointlayerParam = QgsProcessingParameterFeatureSource(
+
+        inputParam = QgsProcessingParameterFeatureSource(
             self.INPUT,
-            self.tr('Input point layer'),
-            [QgsProcessing.TypeVectorPoint]
+            self.tr('Input layer'),
+            [QgsProcessing.TypeVectorPoint, QgsProcessing.TypeVectorLine]
         )
+
         resolutionParam = QgsProcessingParameterNumber(
-            self.RESOLUTION,
-            self.tr('Resolution'),
-            type=QgsProcessingParameterNumber.Integer,
+                self.RESOLUTION,
+                self.tr('Resolution'),
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=0,
+                maxValue=15
+            )
+
+        resolutionParam.setHelp(RESOLUTION_HELP)
+
+        distanceParam = QgsProcessingParameterNumber(
+            self.DISTANCE,
+            self.tr('Distance (meters)'),
+            type=QgsProcessingParameterNumber.Double,
             minValue=0,
-            maxValue=15
+            defaultValue=1000
         )
 
-        resolutionParam.setHelp(
-            '''
-            The resolution level of the grid, as defined in the H3 standard.
-            <br>
-            <table>
-              <tr>
-                <th>Resolution<br>Level</th>
-                <th>Avg. Hexagon<br>Edge Length</th>
-              </tr>
-              <tr>
-                <td style="text-align: center">0</td>
-                <td style="text-align: center">1107.71 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">1</td>
-                <td style="text-align: center">418.68 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">2</td>
-                <td style="text-align: center">158.24 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">3</td>
-                <td style="text-align: center">59.81 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">4</td>
-                <td style="text-align: center">22.61 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">5</td>
-                <td style="text-align: center">8.54 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">6</td>
-                <td style="text-align: center">3.23 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">7</td>
-                <td style="text-align: center">1.22 km</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">8</td>
-                <td style="text-align: center">461.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">9</td>
-                <td style="text-align: center">174.38 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">10</td>
-                <td style="text-align: center">65.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">11</td>
-                <td style="text-align: center">24.91 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">12</td>
-                <td style="text-align: center">9.42 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">13</td>
-                <td style="text-align: center">3.56 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">14</td>
-                <td style="text-align: center">1.35 m</td>
-              </tr>
-              <tr>
-                <td style="text-align: center">15</td>
-                <td style="text-align: center">0.51 m</td>
-              </tr>
-            </table>
-            '''
-        )
         outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
-        self.addParameter(pointlayerParam)
+
+        self.addParameter(inputParam)
         self.addParameter(resolutionParam)
+        self.addParameter(distanceParam)
+        self.addParameter(createSortOrderParameter(self.SORT_ORDER, self.tr))
         self.addParameter(outputParam)
 
     def processAlgorithm(self, parameters, context, feedback):
+
         ####################
         # Input Parameters #
         ####################
-
-        pointSource = self.parameterAsSource(
+        source = self.parameterAsSource(
             parameters,
             self.INPUT,
             context
@@ -712,74 +1065,1853 @@ class CountPointsOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
             context
         )
 
+        distance = self.parameterAsDouble(
+            parameters,
+            self.DISTANCE,
+            context
+        )
+
+        sortOrder = self.parameterAsEnum(
+            parameters,
+            self.SORT_ORDER,
+            context
+        )
+
+        # validate source parameter
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        # validate resolution parameter
+        if resolution < 0 or resolution > 15:
+            raise QgsProcessingException('Invalid input resolution')
+
+        if distance < 0:
+            raise QgsProcessingException('Invalid distance: must be positive or 0')
+
+        #############################
+        # Output parameters (sinks) #
+        #############################
+
         # Set up output layer fields
         indexField = QgsField(
             name='index',
             type=QVariant.String,
             len=30,
             comment='H3 index')
-        countField = QgsField(
-            name='count',
-            type=QVariant.Int,
-            comment='Point count'
-        )
         fields = QgsFields()
         fields.append(indexField)
-        fields.append(countField)
-
-        # create sink
-        (sink, dest_id) = self.parameterAsSink(
-            parameters,
-            self.OUTPUT,
-            context,
-            fields,
-            QgsWkbTypes.Polygon,
-            QgsCoordinateReferenceSystem('EPSG:4326')
-        )
-        # Raise error if sink not created
-        if sink is None:
-            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
 
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
 
         ##############
         # Processing #
         ##############
 
-        sourceCrs = pointSource.sourceCrs()
-        transformer = QgsCoordinateTransform(
-            sourceCrs,
+        # Reproject source features on the fly, only geometries are used
+        featureRequest = QgsFeatureRequest().setDestinationCrs(
             QgsCoordinateReferenceSystem('EPSG:4326'),
-            QgsProject.instance()
-        )
+            QgsCoordinateTransformContext()
+        ).setSubsetOfAttributes([])
+
+        # warn user if reprojection is necessary
+        if source.sourceCrs() != featureRequest.destinationCrs():
+            feedback.pushWarning('Input source is not in WGS84 projection. On the fly reprojection will be used.')
 
-        # -------------------------------
-        # STEP 1. Index points on H3 grid
-        # -------------------------------
-        h3Indexed = []
-        for f in pointSource.getFeatures():
-            point = f.geometry().asPoint()
-            point_wgs84 = transformer.transform(point)
-            idx = h3.latlng_to_cell(point_wgs84.y(), point_wgs84.x(), resolution)
-            h3Indexed.append(idx)
+        # --------------------------------------------
+        # STEP 1. Index the points or the line cells
+        # --------------------------------------------
+        feedback.pushInfo('Indexing features...')
+
+        progress = ProgressReporter(feedback, source.featureCount(), 'features')
+        featureCells = self.featureCells(progress.track(source.getFeatures(featureRequest)), resolution)
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+        progress.finish()
+
+        if len(featureCells) == 0:
+            feedback.pushWarning('Empty Output.')
+            return {self.OUTPUT: dest_id}
+
+        # -----------------------------------------------
+        # STEP 2. Expand the cells to their grid disks
+        # -----------------------------------------------
+        k = distance_to_k(distance, resolution)
+        feedback.pushInfo(f'Expanding {len(featureCells)} feature cells by {k} cell rings...')
+
+        # Upper bound: the disk of each cell holds 3k(k+1)+1 cells, before deduplication
+        maxCellCount = len(featureCells) * (3 * k * (k + 1) + 1)
+        if maxCellCount > WARN_CELL_COUNT:
+            feedback.pushWarning(
+                f'Up to {maxCellCount:,} grid cells. Consider a coarser resolution and a FlatGeobuf or GeoParquet output.'
+            )
 
-        # ----------------------------------
-        # Step 2. Count records per H3 index
-        # ----------------------------------
-        counts = dict()
-        for i in h3Indexed:
-            counts[i] = counts.get(i, 0) + 1
+        bufferedCells = buffer_cells(featureCells, k)
+        featureCells = None
+        feedback.pushInfo(f'{len(bufferedCells)} grid cells to create.')
 
-        # ----------------------------------------------
-        # Step 3. Generate h3 cell geometries and output
-        # ----------------------------------------------
-        # Set up template feature
-        feature = QgsFeature(fields)
-        for k, v in counts.items():
-            hexVertexCoords = h3.cell_to_boundary(k)
-            hexGeometry = QgsGeometry.fromPolygonXY([[QgsPointXY(lon, lat) for lat, lon in hexVertexCoords], ])
-            # create hex feature, add to sink
-            feature.setGeometry(hexGeometry)
-            feature.setAttributes([k, v])
-            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        # ------------------------------------------------
+        # STEP 3. Generate the grid cells and output them
+        # ------------------------------------------------
+        feedback.pushInfo('Generating grid cells...')
+
+        int_to_cell = get_h3api().int_to_cell
+        # the buffered cells are already in H3 index order
+        cells = map(int_to_cell, bufferedCells)
+        if sortOrder == SORT_HILBERT:
+            cells = sort_cells(cells, sortOrder)
+
+        if output.write(cells, len(bufferedCells), feedback):
+            feedback.pushInfo('Done.')
+        else:
+            feedback.pushInfo('Processing canceled.')
 
         return {self.OUTPUT: dest_id}
+
+    def featureCells(self, features, resolution):
+        """
+        Returns the cells of the WGS84 points, and the cells along the WGS84 lines, of the features.
+        """
+        latlng_to_cell = get_h3api().latlng_to_cell
+        cells = set()
+        for f in features:
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            if geom.type() == QgsWkbTypes.PointGeometry:
+                points = geom.asMultiPoint() if geom.isMultipart() else [geom.asPoint()]
+                cells.update(latlng_to_cell(point.y(), point.x(), resolution) for point in points)
+            elif geom.type() == QgsWkbTypes.LineGeometry:
+                for polyline in geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]:
+                    line_to_cells(polyline, resolution, cells)
+        return cells
+
+
+class CreateH3GridAlongLinesProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Processing algorithm to create an H3 grid along lines.
+    Takes a line vector layer and a resolution as inputs.
+    Traverses each line on the grid, joining its vertex cells with their grid path, or indexing points
+    densified along its segments. Counts the lines crossing each cell.
+    Outputs the cells as a polygon vector layer, without buffering nor polyfilling the lines.
+    """
+
+    INPUT = 'INPUT'
+    RESOLUTION = 'RESOLUTION'
+    TRAVERSAL = 'TRAVERSAL'
+    WORKERS = 'WORKERS'
+    SORT_ORDER = 'SORT_ORDER'
+    OUTPUT = 'OUTPUT'
+
+    # Indexed by the lineworker's LINE_* constants
+    TRAVERSAL_OPTIONS = ['Densify segments to the cell size', 'Grid paths along segments']
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return CreateH3GridAlongLinesProcessingAlgorithm()
+
+    def name(self):
+        return 'createh3gridalonglines'
+
+    def displayName(self):
+        return self.tr('Create H3 grid along lines')
+
+    #def group(self):
+    #    return self.tr('Grid Creation')
+
+    #def groupId(self):
+    #    return 'gridcreation'
+
+    def shortHelpString(self):
+        helpString = (
+            'Creates the H3 grid cells crossed by the input lines, e.g. roads or rivers, with the number of lines '
+            'crossing each cell. Much faster than buffering the lines and creating the grid inside the buffers.<br><br>'
+            '<b>Input:</b> Line layer (automatically transformed to WGS84 if needed)<br>'
+            '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
+            '<b>Output:</b> Polygon layer with H3 indexes and line counts as attributes<br><br>'
+            '<b>Traversal:</b><br>'
+            '<i>Grid paths along segments</i> (default): splits the segments into pieces of up to 16 cell edges, '
+            'and joins the cells of consecutive piece ends with the shortest connected path of cells between them. '
+            'About twice as fast as densifying. Paths follow the grid, so they may run one cell beside the line. '
+            'Pieces h3 can not compute a path for, e.g. near pentagons, are densified instead.<br>'
+            '<i>Densify segments to the cell size</i>: indexes points half a cell edge apart along the segments. '
+            'Follows the geometry closely, but may miss cells the lines only clip at a corner.<br><br>'
+            '<b>Worker processes:</b> Traverses the lines on a pool of worker processes, for layers of millions '
+            'of segments (see advanced parameters).<br><br>'
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+
+        inputParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input layer'),
+            [QgsProcessing.TypeVectorLine]
+        )
+
+        resolutionParam = QgsProcessingParameterNumber(
+                self.RESOLUTION,
+                self.tr('Resolution'),
+                type=QgsProcessingParameterNumber.Integer,
+                minValue=0,
+                maxValue=15
+            )
+
+        resolutionParam.setHelp(RESOLUTION_HELP)
+
+        traversalParam = QgsProcessingParameterEnum(
+            self.TRAVERSAL,
+            self.tr('Traversal'),
+            options=[self.tr(option) for option in self.TRAVERSAL_OPTIONS],
+            defaultValue=LINE_GRID_PATH
+        )
+
+        workersParam = QgsProcessingParameterNumber(
+            self.WORKERS,
+            self.tr('Worker processes for line traversal (0 = off)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=os.cpu_count() or 1,
+            defaultValue=0
+        )
+        workersParam.setFlags(workersParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        workersParam.setHelp(
+            'Traverses the lines on a pool of worker processes, for layers of millions of segments. '
+            'Vertices are passed to the workers in chunks through shared memory. '
+            'Starting the workers takes a few seconds, so small layers are faster without.'
+        )
+        outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
+
+        self.addParameter(inputParam)
+        self.addParameter(resolutionParam)
+        self.addParameter(traversalParam)
+        self.addParameter(workersParam)
+        self.addParameter(createSortOrderParameter(self.SORT_ORDER, self.tr))
+        self.addParameter(outputParam)
+
+    def processAlgorithm(self, parameters, context, feedback):
+
+        ####################
+        # Input Parameters #
+        ####################
+        source = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        resolution = self.parameterAsInt(
+            parameters,
+            self.RESOLUTION,
+            context
+        )
+
+        traversal = self.parameterAsEnum(
+            parameters,
+            self.TRAVERSAL,
+            context
+        )
+
+        workers = self.parameterAsInt(
+            parameters,
+            self.WORKERS,
+            context
+        )
+
+        sortOrder = self.parameterAsEnum(
+            parameters,
+            self.SORT_ORDER,
+            context
+        )
+
+        # validate source parameter
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        # validate resolution parameter
+        if resolution < 0 or resolution > 15:
+            raise QgsProcessingException('Invalid input resolution')
+
+        #############################
+        # Output parameters (sinks) #
+        #############################
+
+        # Set up output layer fields
+        indexField = QgsField(
+            name='index',
+            type=QVariant.String,
+            len=30,
+            comment='H3 index')
+        countField = QgsField(
+            name='count',
+            type=QVariant.Int,
+            comment='Number of lines crossing the cell'
+        )
+        fields = QgsFields()
+        fields.append(indexField)
+        fields.append(countField)
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
+
+        ##############
+        # Processing #
+        ##############
+
+        # Reproject source features on the fly, only geometries are used
+        featureRequest = QgsFeatureRequest().setDestinationCrs(
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsCoordinateTransformContext()
+        ).setSubsetOfAttributes([])
+
+        # warn user if reprojection is necessary
+        if source.sourceCrs() != featureRequest.destinationCrs():
+            feedback.pushWarning('Input source is not in WGS84 projection. On the fly reprojection will be used.')
+
+        # ----------------------------------------------------
+        # STEP 1. Traverse the lines, count lines per cell
+        # ----------------------------------------------------
+        feedback.pushInfo('Traversing lines on grid...')
+
+        counts = None
+        if workers > 1:
+            # multiprocessing and concurrent.futures are only imported when lines are traversed in parallel
+            from .parallel import BrokenProcessPool, ParallelLineCounter
+
+            counter = None
+            try:
+                stepKm = get_h3api().average_edge_length_km(resolution) / 2
+                counter = ParallelLineCounter(workers, resolution, traversal, stepKm)
+                feedback.pushInfo(f'Traversing lines on {workers} worker processes.')
+            except (RuntimeError, OSError) as e:
+                feedback.pushWarning(f'Worker processes not available, traversing lines in this process: {e}')
+
+            if counter is not None:
+                progress = ProgressReporter(feedback, source.featureCount(), 'features')
+                try:
+                    for polylines in self.yieldPolylines(progress.track(source.getFeatures(featureRequest))):
+                        counter.addFeature([polyline_coordinates(polyline) for polyline in polylines])
+                    counts = counter.counts if feedback.isCanceled() else counter.result(feedback.isCanceled)
+                except BrokenProcessPool as e:
+                    feedback.pushWarning(f'Worker processes failed, traversing lines in this process: {e}')
+                finally:
+                    counter.close()
+
+        if counts is None:
+            progress = ProgressReporter(feedback, source.featureCount(), 'features')
+            counts = dict()
+            for polylines in self.yieldPolylines(progress.track(source.getFeatures(featureRequest))):
+                # a line crossing a cell with several parts counts once
+                cells = set()
+                for polyline in polylines:
+                    line_to_cells(polyline, resolution, cells, traversal)
+                for cell in cells:
+                    counts[cell] = counts.get(cell, 0) + 1
+
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+        progress.finish()
+
+        if len(counts) == 0:
+            feedback.pushWarning('Empty Output.')
+            return {self.OUTPUT: dest_id}
+
+        # ------------------------------------------------
+        # STEP 2. Generate the grid cells and output them
+        # ------------------------------------------------
+        feedback.pushInfo(f'Generating {len(counts)} grid cells...')
+
+        cells = sort_cells(counts.keys(), sortOrder) if sortOrder != SORT_NONE else counts.keys()
+        attributes = {cell: [count] for cell, count in counts.items()}
+        if output.write(cells, len(counts), feedback, attributes):
+            feedback.pushInfo('Done.')
+        else:
+            feedback.pushInfo('Processing canceled.')
+
+        return {self.OUTPUT: dest_id}
+
+    def yieldPolylines(self, features):
+        """
+        Generator function. Yields the WGS84 polylines of each line feature, as a list of point lists.
+        """
+        for f in features:
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            yield geom.asMultiPolyline() if geom.isMultipart() else [geom.asPolyline()]
+
+
+class CountPointsOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Count points to H3 grid processing algorithm.
+
+    Takes point vector layer as input.
+    Counts points falling within H3 grid cells at given resolution.
+    With a study area polygon layer, outputs every cell of the study area, zero counts included.
+    With a datetime field, counts points per cell and time bin in a single pass (space-time cube).
+    Optionally estimates the number of distinct values of a field and the most frequent categories per cell,
+    with bounded memory sketches.
+
+    Generates the grid cells as polygons with their H3 index and point counts in the attribute table.
+    Outputs result as a polygon vector layer.
+    """
+    INPUT = 'INPUT'
+    RESOLUTION = 'RESOLUTION'
+    STUDY_AREA = 'STUDY_AREA'
+    DATETIME_FIELD = 'DATETIME_FIELD'
+    BIN_SIZE = 'BIN_SIZE'
+    TIME_LAYOUT = 'TIME_LAYOUT'
+    DISTINCT_FIELD = 'DISTINCT_FIELD'
+    CATEGORY_FIELD = 'CATEGORY_FIELD'
+    TOP_N = 'TOP_N'
+    SORT_ORDER = 'SORT_ORDER'
+    WORKERS = 'WORKERS'
+    OUTPUT = 'OUTPUT'
+
+    TIME_LAYOUT_OPTIONS = ['Long (one feature per cell and time bin)', 'Wide (one count field per time bin)']
+    TIME_LAYOUT_LONG = 0
+    TIME_LAYOUT_WIDE = 1
+
+    # Maximum number of count fields of the wide layout
+    MAX_WIDE_TIME_BINS = 1000
+
+    # Values tracked by the top categories sketch of a cell, per category output
+    TOP_CAPACITY_FACTOR = 8
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return CountPointsOnH3GridProcessingAlgorithm()
+
+    def name(self):
+        return 'countpointson3Grid'
+
+    def displayName(self):
+        return self.tr('Count points on H3 Grid')
+
+    # def group(self):
+    #    return self.tr('Grid Creation')
+
+    # def groupId(self):
+    #    return 'gridcreation'
+
+    def shortHelpString(self):
+        helpString = (
+            'Aggregates point features into H3 grid cells and counts points per cell.<br><br>'
+            '<b>Input:</b> Point layer (automatically transformed to WGS84 if needed)<br>'
+            '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
+            '<b>Output:</b> Polygon layer of H3 index geometry with point counts as attributes<br><br>'
+            '<b>Study area:</b> Polygon layer (optional). If given, all grid cells whose centroid is inside the '
+            'study area are output, cells without points with a count of 0. Points outside of the study area '
+            'are not counted<br><br>'
+            'Without a study area, grid cells are generated where points exist. '
+            'Each cell shows total points within its boundaries.<br><br>'
+            '<b>Datetime field:</b> Date or datetime field (optional). If given, points are counted per cell and '
+            'per time bin of the given size (minutes), aligned on UTC midnight, 1970-01-01. Points without a date '
+            'are not counted. In the <i>long</i> layout, each cell and time bin with points is a feature with its '
+            '<i>bin_start</i> (UTC) and <i>count</i>. In the <i>wide</i> layout, each cell is a feature with one '
+            'count field per time bin, from the first to the last bin with points<br><br>'
+            '<b>Distinct field:</b> Field whose number of distinct values per cell is estimated (optional), '
+            'e.g. device IDs for unique visitor maps. Exact up to 32 distinct values, ~3% error above. '
+            'Output in the <i>distinct</i> field<br>'
+            '<b>Category field:</b> Field whose most frequent values per cell are output (optional), in the '
+            '<i>top1</i>, <i>top1_n</i>, <i>top2</i>, ... fields. Counts are upper bounds for rare categories<br>'
+            'Memory per cell is bounded for both, regardless of the number of points. '
+            'Not available together with time bins.<br><br>'
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.<br><br>'
+            '<b>Note:</b> Input points are transformed to WGS84 (EPSG:4326). '
+            'Results may be inaccurate for features crossing CRS boundaries.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+        #extentParam = QgsProcessingParameterExtent(self.EXTENT, self.tr('Extent'))
+        pointlayerParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input point layer'),
+            [QgsProcessing.TypeVectorPoint]
+        )
+        resolutionParam = QgsProcessingParameterNumber(
+            self.RESOLUTION,
+            self.tr('Resolution'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=15
+        )
+
+        resolutionParam.setHelp(RESOLUTION_HELP)
+        studyAreaParam = QgsProcessingParameterFeatureSource(
+            self.STUDY_AREA,
+            self.tr('Study area (zero-filled cells)'),
+            [QgsProcessing.TypeVectorPolygon],
+            optional=True
+        )
+        dateTimeFieldParam = QgsProcessingParameterField(
+            self.DATETIME_FIELD,
+            self.tr('Datetime field (counts per time bin)'),
+            parentLayerParameterName=self.INPUT,
+            type=QgsProcessingParameterField.DateTime,
+            optional=True
+        )
+        binSizeParam = QgsProcessingParameterNumber(
+            self.BIN_SIZE,
+            self.tr('Time bin size (minutes)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=1,
+            defaultValue=60
+        )
+        timeLayoutParam = QgsProcessingParameterEnum(
+            self.TIME_LAYOUT,
+            self.tr('Time bin layout'),
+            options=[self.tr(option) for option in self.TIME_LAYOUT_OPTIONS],
+            defaultValue=self.TIME_LAYOUT_LONG
+        )
+        distinctFieldParam = QgsProcessingParameterField(
+            self.DISTINCT_FIELD,
+            self.tr('Distinct count field (approximate)'),
+            parentLayerParameterName=self.INPUT,
+            optional=True
+        )
+        categoryFieldParam = QgsProcessingParameterField(
+            self.CATEGORY_FIELD,
+            self.tr('Category field (most frequent values)'),
+            parentLayerParameterName=self.INPUT,
+            optional=True
+        )
+        topNParam = QgsProcessingParameterNumber(
+            self.TOP_N,
+            self.tr('Number of most frequent categories'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=1,
+            maxValue=20,
+            defaultValue=3
+        )
+        workersParam = QgsProcessingParameterNumber(
+            self.WORKERS,
+            self.tr('Worker processes for point indexing (0 = off)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=os.cpu_count() or 1,
+            defaultValue=0
+        )
+        workersParam.setFlags(workersParam.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
+        workersParam.setHelp(
+            'Indexes points on a pool of worker processes, for layers of millions of points. '
+            'Coordinates are passed to the workers in chunks through shared memory. '
+            'Starting the workers takes a few seconds, so small layers are faster without.'
+        )
+        outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
+        self.addParameter(pointlayerParam)
+        self.addParameter(resolutionParam)
+        self.addParameter(studyAreaParam)
+        self.addParameter(dateTimeFieldParam)
+        self.addParameter(binSizeParam)
+        self.addParameter(timeLayoutParam)
+        self.addParameter(distinctFieldParam)
+        self.addParameter(categoryFieldParam)
+        self.addParameter(topNParam)
+        self.addParameter(createSortOrderParameter(self.SORT_ORDER, self.tr))
+        self.addParameter(workersParam)
+        self.addParameter(outputParam)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        ####################
+        # Input Parameters #
+        ####################
+
+        pointSource = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        resolution = self.parameterAsInt(
+            parameters,
+            self.RESOLUTION,
+            context
+        )
+
+        studyAreaSource = self.parameterAsSource(
+            parameters,
+            self.STUDY_AREA,
+            context
+        )
+
+        sortOrder = self.parameterAsEnum(
+            parameters,
+            self.SORT_ORDER,
+            context
+        )
+
+        workers = self.parameterAsInt(
+            parameters,
+            self.WORKERS,
+            context
+        )
+
+        dateTimeFieldName = self.parameterAsString(
+            parameters,
+            self.DATETIME_FIELD,
+            context
+        )
+
+        distinctFieldName = self.parameterAsString(
+            parameters,
+            self.DISTINCT_FIELD,
+            context
+        )
+
+        categoryFieldName = self.parameterAsString(
+            parameters,
+            self.CATEGORY_FIELD,
+            context
+        )
+
+        topN = self.parameterAsInt(
+            parameters,
+            self.TOP_N,
+            context
+        )
+
+        distinctFieldIndex = pointSource.fields().lookupField(distinctFieldName) if distinctFieldName else -1
+        if distinctFieldName and distinctFieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {distinctFieldName}')
+
+        categoryFieldIndex = pointSource.fields().lookupField(categoryFieldName) if categoryFieldName else -1
+        if categoryFieldName and categoryFieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {categoryFieldName}')
+
+        useSketches = distinctFieldIndex >= 0 or categoryFieldIndex >= 0
+        if useSketches and dateTimeFieldName:
+            raise QgsProcessingException('Distinct counts and top categories are not available together with time bins')
+
+        # Time binned counts have their own output fields
+        if dateTimeFieldName:
+            return self.processTimeBins(parameters, context, feedback, pointSource, resolution, studyAreaSource, sortOrder, workers)
+
+        # Set up output layer fields
+        indexField = QgsField(
+            name='index',
+            type=QVariant.String,
+            len=30,
+            comment='H3 index')
+        countField = QgsField(
+            name='count',
+            type=QVariant.Int,
+            comment='Point count'
+        )
+        fields = QgsFields()
+        fields.append(indexField)
+        fields.append(countField)
+        if distinctFieldIndex >= 0:
+            fields.append(QgsField(
+                name='distinct',
+                type=QVariant.Int,
+                comment=f'Approximate number of distinct {distinctFieldName} values'
+            ))
+        if categoryFieldIndex >= 0:
+            for rank in range(1, topN + 1):
+                fields.append(QgsField(
+                    name=f'top{rank}',
+                    type=QVariant.String,
+                    comment=f'Most frequent {categoryFieldName} value #{rank}'
+                ))
+                fields.append(QgsField(
+                    name=f'top{rank}_n',
+                    type=QVariant.Int,
+                    comment=f'Point count of the most frequent {categoryFieldName} value #{rank}'
+                ))
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
+
+
+        ##############
+        # Processing #
+        ##############
+
+        # ---------------------------------------------------------
+        # STEP 1. Index points on H3 grid, count records per index
+        # ---------------------------------------------------------
+        distinctSketches = dict() if distinctFieldIndex >= 0 else None
+        topSketches = dict() if categoryFieldIndex >= 0 else None
+        if useSketches:
+            # Attributes are needed, so read features one by one
+            if workers > 1:
+                feedback.pushWarning('Worker processes are not used for distinct counts and top categories.')
+            transformer = QgsCoordinateTransform(
+                pointSource.sourceCrs(),
+                QgsCoordinateReferenceSystem('EPSG:4326'),
+                QgsProject.instance()
+            )
+            featureRequest = QgsFeatureRequest().setSubsetOfAttributes(
+                [i for i in (distinctFieldIndex, categoryFieldIndex) if i >= 0]
+            )
+            progress = ProgressReporter(feedback, pointSource.featureCount())
+            counts = sketch_points(
+                self.yieldSketchedPoints(
+                    progress.track(pointSource.getFeatures(featureRequest)),
+                    distinctFieldIndex,
+                    categoryFieldIndex,
+                    transformer
+                ),
+                resolution,
+                dict(),
+                distinctSketches,
+                topSketches,
+                self.TOP_CAPACITY_FACTOR * topN
+            )
+            if not feedback.isCanceled():
+                progress.finish()
+        else:
+            counts = countPointSource(self, parameters, self.INPUT, context, pointSource, resolution, feedback, workers)
+
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        # ---------------------------------------------------------------
+        # Optional step. Polyfill the study area, merge the point counts
+        # ---------------------------------------------------------------
+        if studyAreaSource is not None:
+            studyAreaCells = self.studyAreaCells(studyAreaSource, resolution, feedback)
+            if feedback.isCanceled():
+                feedback.pushInfo('Processing canceled.')
+                return {self.OUTPUT: dest_id}
+
+            outsideCount = sum(count for cell, count in counts.items() if cell not in studyAreaCells)
+            if outsideCount > 0:
+                feedback.pushInfo(f'{outsideCount} points outside of the study area are not counted.')
+            counts = {cell: counts.get(cell, 0) for cell in studyAreaCells}
+            feedback.pushInfo(f'{len(counts)} grid cells in the study area.')
+
+        # ----------------------------------------------
+        # Step 2. Generate h3 cell geometries and output
+        # ----------------------------------------------
+        cells = sort_cells(counts.keys(), sortOrder) if sortOrder != SORT_NONE else counts.keys()
+        if useSketches:
+            attributes = {
+                cell: [count] + self.sketchAttributes(cell, distinctSketches, topSketches, topN)
+                for cell, count in counts.items()
+            }
+        else:
+            attributes = {k: [v] for k, v in counts.items()}
+        output.write(cells, len(counts), feedback, attributes)
+
+        return {self.OUTPUT: dest_id}
+
+    def yieldSketchedPoints(self, features, distinctFieldIndex, categoryFieldIndex, transformer):
+        """
+        Generator function. Yields the WGS84 point, distinct value and category of each feature, with None for
+        missing fields or NULL values.
+        """
+        for f in features:
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            distinctValue = f.attribute(distinctFieldIndex) if distinctFieldIndex >= 0 else None
+            category = f.attribute(categoryFieldIndex) if categoryFieldIndex >= 0 else None
+            yield (
+                transformer.transform(geom.asPoint()),
+                None if distinctValue == NULL else distinctValue,
+                None if category == NULL else category
+            )
+
+    def sketchAttributes(self, cell, distinctSketches, topSketches, topN):
+        """
+        Returns the distinct count and top categories attribute values of a cell, zero or None for cells without
+        sketch. None rather than NULL, which the FlatGeobuf and GeoParquet writers do not take.
+        """
+        values = []
+        if distinctSketches is not None:
+            sketch = distinctSketches.get(cell)
+            values.append(sketch.count() if sketch is not None else 0)
+        if topSketches is not None:
+            values.extend(top_attributes(topSketches.get(cell), topN))
+        return values
+
+    def studyAreaCells(self, studyAreaSource, resolution, feedback):
+        """
+        Returns the set of grid cells whose centroid is inside the study area.
+        """
+        feedback.pushInfo('Looking up grid cells of the study area...')
+        featureRequest = QgsFeatureRequest().setDestinationCrs(
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsCoordinateTransformContext()
+        ).setSubsetOfAttributes([])
+        return polyfill_geometries(
+            yield_small_singleparts(studyAreaSource.getFeatures(featureRequest)),
+            resolution,
+            feedback
+        )
+
+    def processTimeBins(self, parameters, context, feedback, pointSource, resolution, studyAreaSource, sortOrder, workers):
+        """
+        Counts points per grid cell and time bin in a single pass over the point source,
+        and outputs the counts in long or wide layout.
+        """
+        dateTimeFieldName = self.parameterAsString(parameters, self.DATETIME_FIELD, context)
+        binSeconds = self.parameterAsInt(parameters, self.BIN_SIZE, context) * 60
+        timeLayout = self.parameterAsEnum(parameters, self.TIME_LAYOUT, context)
+
+        dateTimeFieldIndex = pointSource.fields().lookupField(dateTimeFieldName)
+        if dateTimeFieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {dateTimeFieldName}')
+        if binSeconds <= 0:
+            raise QgsProcessingException('Invalid time bin size')
+        if workers > 1:
+            feedback.pushWarning('Worker processes are not used for time binned counts.')
+
+        # Set up output layer fields. The count fields of the wide layout depend on the time bins found,
+        # they are added once the points are counted.
+        fields = QgsFields()
+        fields.append(QgsField(
+            name='index',
+            type=QVariant.String,
+            len=30,
+            comment='H3 index'
+        ))
+        if timeLayout != self.TIME_LAYOUT_WIDE:
+            fields.append(QgsField(
+                name='bin_start',
+                type=QVariant.DateTime,
+                comment='Start of the time bin (UTC)'
+            ))
+            fields.append(QgsField(
+                name='count',
+                type=QVariant.Int,
+                comment='Point count'
+            ))
+
+        # ---------------------------------------------------------------------
+        # STEP 1. Index points on H3 grid and time bins, count records per key
+        # ---------------------------------------------------------------------
+        feedback.pushInfo('Counting points per grid cell and time bin...')
+        transformer = QgsCoordinateTransform(
+            pointSource.sourceCrs(),
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsProject.instance()
+        )
+        # Only point geometries and the datetime field are used
+        featureRequest = QgsFeatureRequest().setSubsetOfAttributes([dateTimeFieldIndex])
+        progress = ProgressReporter(feedback, pointSource.featureCount())
+        counts = count_points_in_time_bins(
+            self.yieldTimedPoints(progress.track(pointSource.getFeatures(featureRequest)), dateTimeFieldIndex, transformer),
+            resolution,
+            binSeconds
+        )
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: self.emptyOutput(parameters, context, fields)}
+        progress.finish()
+
+        featureCount = pointSource.featureCount()
+        skipped = featureCount - sum(counts.values())
+        if featureCount >= 0 and skipped > 0:
+            feedback.pushInfo(f'{skipped} points without date or time are not counted.')
+
+        # Counts per cell, as time bin to count maps
+        h3api = get_h3api()
+        cellBins = dict()
+        for key, count in counts.items():
+            cellInt, timeBin = unpack_cell_time_bin(key)
+            cellBins.setdefault(cellInt, dict())[timeBin] = count
+        counts = None
+        cellBins = {h3api.int_to_cell(cellInt): bins for cellInt, bins in cellBins.items()}
+
+        if studyAreaSource is not None:
+            studyAreaCells = self.studyAreaCells(studyAreaSource, resolution, feedback)
+            if feedback.isCanceled():
+                feedback.pushInfo('Processing canceled.')
+                return {self.OUTPUT: self.emptyOutput(parameters, context, fields)}
+            outsideCount = sum(sum(bins.values()) for cell, bins in cellBins.items() if cell not in studyAreaCells)
+            if outsideCount > 0:
+                feedback.pushInfo(f'{outsideCount} points outside of the study area are not counted.')
+            cellBins = {cell: bins for cell, bins in cellBins.items() if cell in studyAreaCells}
+            # cells without points are only output in the wide layout
+            if timeLayout == self.TIME_LAYOUT_WIDE:
+                for cell in studyAreaCells:
+                    cellBins.setdefault(cell, dict())
+
+        timeBins = set()
+        for bins in cellBins.values():
+            timeBins.update(bins)
+        if len(timeBins) == 0:
+            feedback.pushWarning('Empty Output.')
+            return {self.OUTPUT: self.emptyOutput(parameters, context, fields)}
+        firstBin = min(timeBins)
+        lastBin = max(timeBins)
+
+        def binStart(timeBin):
+            # naive UTC datetime
+            return datetime(1970, 1, 1) + timedelta(seconds=timeBin * binSeconds)
+
+        feedback.pushInfo(f'{len(cellBins)} grid cells, time bins from {binStart(firstBin)} to {binStart(lastBin)} (UTC).')
+
+        # Add a count field per time bin of the wide layout
+        if timeLayout == self.TIME_LAYOUT_WIDE:
+            binCount = lastBin - firstBin + 1
+            if binCount > self.MAX_WIDE_TIME_BINS:
+                raise QgsProcessingException(
+                    f'{binCount} time bins exceed the maximum of {self.MAX_WIDE_TIME_BINS} count fields of the wide '
+                    'layout. Use a larger time bin size or the long layout.'
+                )
+            for timeBin in range(firstBin, lastBin + 1):
+                fields.append(QgsField(
+                    name=f'n_{binStart(timeBin):%Y%m%d_%H%M}',
+                    type=QVariant.Int,
+                    comment=f'Point count from {binStart(timeBin)} (UTC)'
+                ))
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
+
+        # ----------------------------------------------
+        # Step 2. Generate h3 cell geometries and output
+        # ----------------------------------------------
+        cells = sort_cells(cellBins.keys(), sortOrder) if sortOrder != SORT_NONE else list(cellBins.keys())
+
+        if timeLayout == self.TIME_LAYOUT_WIDE:
+            rows = (
+                (cell, [cellBins[cell].get(timeBin, 0) for timeBin in range(firstBin, lastBin + 1)])
+                for cell in cells
+            )
+            rowCount = len(cells)
+        else:
+            rows = (
+                (cell, [binStart(timeBin), cellBins[cell][timeBin]])
+                for cell in cells
+                for timeBin in sorted(cellBins[cell])
+            )
+            rowCount = sum(len(bins) for bins in cellBins.values())
+
+        if output.writeRows(rows, rowCount, feedback):
+            feedback.pushInfo('Done.')
+        else:
+            feedback.pushInfo('Processing canceled.')
+
+        return {self.OUTPUT: dest_id}
+
+    def emptyOutput(self, parameters, context, fields):
+        """
+        Creates the output without any cells and returns its destination, for runs ending before the time
+        bins are known.
+        """
+        return CellOutput(self, parameters, self.OUTPUT, context, fields).destination
+
+    def yieldTimedPoints(self, features, dateTimeFieldIndex, transformer):
+        """
+        Generator function. Yields the WGS84 point and timestamp (seconds since the epoch) of each feature
+        with a date or datetime.
+        """
+        for f in features:
+            value = f.attribute(dateTimeFieldIndex)
+            if isinstance(value, QDate):
+                value = QDateTime(value, QTime(0, 0), Qt.UTC)
+            if not isinstance(value, QDateTime) or not value.isValid():
+                continue
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            yield transformer.transform(geom.asPoint()), value.toMSecsSinceEpoch() / 1000
+
+
+class AggregateOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Aggregate lines or polygons on H3 grid processing algorithm.
+
+    Takes a line or polygon vector layer, an optional numeric field and a resolution as inputs.
+    Clips each feature against the boundaries of the H3 grid cells it intersects, and computes the share
+    of the feature's length (lines) or area (polygons) falling within each cell.
+    The field value of each feature is distributed among the cells proportionally to these shares.
+
+    Features are clipped tile by tile, a tile being a coarse parent cell, see `clipping`. Only the tiles along
+    a feature and inside it are visited, so the cost of the overlay scales with the size of each feature
+    rather than the size of its bounding box or of the grid.
+
+    Generates the grid cells as polygons with their H3 index, the weighted sum and the total measure in the
+    attribute table. Outputs result as a polygon vector layer.
+    """
+    INPUT = 'INPUT'
+    FIELD = 'FIELD'
+    RESOLUTION = 'RESOLUTION'
+    OUTPUT = 'OUTPUT'
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return AggregateOnH3GridProcessingAlgorithm()
+
+    def name(self):
+        return 'aggregateonh3grid'
+
+    def displayName(self):
+        return self.tr('Aggregate lines or polygons on H3 grid')
+
+    def shortHelpString(self):
+        helpString = (
+            'Distributes line or polygon features over H3 grid cells, weighted by length or area.<br><br>'
+            '<b>Input:</b> Line or polygon layer (automatically transformed to WGS84 if needed)<br>'
+            '<b>Field:</b> Numeric field to aggregate (optional). Without a field, each feature counts as 1<br>'
+            '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
+            '<b>Output:</b> Polygon layer of H3 cells with the following attributes:<br>'
+            '<i>sum</i>: sum of the field values, each weighted by the length or area share of the feature '
+            'falling within the cell<br>'
+            '<i>measure</i>: total length (m) or area (m²) of the features within the cell<br><br>'
+            'Lengths and areas are measured on the WGS84 ellipsoid.<br><br>'
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.<br><br>'
+            '<b>Note:</b> Input features are transformed to WGS84 (EPSG:4326). '
+            'Results may be inaccurate for features crossing CRS boundaries.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+        inputParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input line or polygon layer'),
+            [QgsProcessing.TypeVectorLine, QgsProcessing.TypeVectorPolygon]
+        )
+        fieldParam = QgsProcessingParameterField(
+            self.FIELD,
+            self.tr('Field to aggregate'),
+            parentLayerParameterName=self.INPUT,
+            type=QgsProcessingParameterField.Numeric,
+            optional=True
+        )
+        resolutionParam = QgsProcessingParameterNumber(
+            self.RESOLUTION,
+            self.tr('Resolution'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=15
+        )
+
+        resolutionParam.setHelp(RESOLUTION_HELP)
+        outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
+        self.addParameter(inputParam)
+        self.addParameter(fieldParam)
+        self.addParameter(resolutionParam)
+        self.addParameter(outputParam)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        ####################
+        # Input Parameters #
+        ####################
+        source = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        fieldName = self.parameterAsString(
+            parameters,
+            self.FIELD,
+            context
+        )
+
+        resolution = self.parameterAsInt(
+            parameters,
+            self.RESOLUTION,
+            context
+        )
+
+        # validate source parameter
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        # validate resolution parameter
+        if resolution < 0 or resolution > 15:
+            raise QgsProcessingException('Invalid input resolution')
+
+        fieldIndex = source.fields().lookupField(fieldName) if fieldName else -1
+        if fieldName and fieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {fieldName}')
+
+        isLine = QgsWkbTypes.geometryType(source.wkbType()) == QgsWkbTypes.LineGeometry
+
+        #############################
+        # Output parameters (sinks) #
+        #############################
+
+        # Set up output layer fields
+        indexField = QgsField(
+            name='index',
+            type=QVariant.String,
+            len=30,
+            comment='H3 index')
+        sumField = QgsField(
+            name='sum',
+            type=QVariant.Double,
+            comment='Sum of values weighted by length or area share'
+        )
+        measureField = QgsField(
+            name='measure',
+            type=QVariant.Double,
+            comment='Length (m) or area (m2) within cell'
+        )
+        fields = QgsFields()
+        fields.append(indexField)
+        fields.append(sumField)
+        fields.append(measureField)
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
+
+        ##############
+        # Processing #
+        ##############
+
+        # Reproject source features on the fly and only fetch the aggregated field, if any
+        featureRequest = QgsFeatureRequest().setDestinationCrs(
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsCoordinateTransformContext()
+        ).setSubsetOfAttributes([fieldIndex] if fieldIndex >= 0 else [])
+
+        # warn user if reprojection is necessary
+        if source.sourceCrs() != featureRequest.destinationCrs():
+            feedback.pushWarning('Input source is not in WGS84 projection. On the fly reprojection will be used.')
+
+        distanceArea = QgsDistanceArea()
+        distanceArea.setSourceCrs(QgsCoordinateReferenceSystem('EPSG:4326'), context.transformContext())
+        distanceArea.setEllipsoid('WGS84')
+        measure = distanceArea.measureLength if isLine else distanceArea.measureArea
+
+        # ------------------------------------------------
+        # STEP 1. Clip features against nearby grid cells
+        # ------------------------------------------------
+        feedback.pushInfo('Clipping features against grid cells...')
+
+        sums = dict()
+        measures = dict()
+        # Cell geometries of the recently clipped tiles
+        tileCache = TileCache(resolution)
+
+        # For the progress bar
+        featureCount = source.featureCount()
+        progressPerFeature = 100.0 / featureCount if featureCount > 0 else 0
+
+        for i, f in enumerate(source.getFeatures(featureRequest)):
+            # Stop if cancel button has been clicked
+            if feedback.isCanceled():
+                feedback.pushInfo('Processing canceled.')
+                return {self.OUTPUT: dest_id}
+
+            geom = f.geometry()
+            if geom.isEmpty():
+                continue
+
+            if fieldIndex >= 0:
+                value = f.attribute(fieldIndex)
+                if value is None or value == NULL:
+                    continue
+                value = float(value)
+            else:
+                value = 1.0
+
+            totalMeasure = measure(geom)
+            if totalMeasure <= 0:
+                continue
+
+            for cell, partMeasure in clip_to_cells(geom, totalMeasure, measure, tileCache):
+                sums[cell] = sums.get(cell, 0.0) + value * partMeasure / totalMeasure
+                measures[cell] = measures.get(cell, 0.0) + partMeasure
+
+            feedback.setProgress(int(i * progressPerFeature))
+
+        if len(sums) == 0:
+            feedback.pushWarning('Empty Output.')
+            return {self.OUTPUT: dest_id}
+
+        # --------------------------------------
+        # STEP 2. Output the intersecting cells
+        # --------------------------------------
+        feedback.pushInfo(f'Writing {len(sums)} grid cells...')
+
+        attributes = {cell: [cellSum, measures[cell]] for cell, cellSum in sums.items()}
+        if not output.write(sums.keys(), len(sums), feedback, attributes):
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        feedback.pushInfo('Done.')
+
+        return {self.OUTPUT: dest_id}
+
+
+class EstimateH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Processing algorithm to estimate the size of an H3 grid without creating it.
+
+    Takes a polygon layer or an extent, and a resolution as inputs.
+    Estimates the cell count from the covered area and the average H3 cell area at the resolution,
+    then derives the approximate output size and peak memory of creating the grid.
+    """
+    INPUT = 'INPUT'
+    EXTENT = 'EXTENT'
+    RESOLUTION = 'RESOLUTION'
+    CELL_COUNT = 'CELL_COUNT'
+    OUTPUT_SIZE_MB = 'OUTPUT_SIZE_MB'
+    PEAK_MEMORY_MB = 'PEAK_MEMORY_MB'
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return EstimateH3GridProcessingAlgorithm()
+
+    def name(self):
+        return 'estimateh3grid'
+
+    def displayName(self):
+        return self.tr('Estimate H3 grid size')
+
+    def shortHelpString(self):
+        helpString = (
+            'Estimates the size of an H3 grid before creating it, without generating any cells.<br><br>'
+            '<b>Input:</b> Polygon layer (optional)<br>'
+            '<b>Extent:</b> Geographic area to cover (optional, used if no input layer is given)<br>'
+            '<b>Resolution:</b> H3 grid density level (0=largest, 15=smallest)<br>'
+            '<b>Outputs:</b> estimated cell count, output size (MB) and peak memory (MB)<br><br>'
+            'The estimate is based on the covered area and the average cell area at the resolution. '
+            'Overlapping input polygons are counted multiple times.<br><br>'
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+        inputParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input layer'),
+            [QgsProcessing.TypeVectorPolygon],
+            optional=True
+        )
+        extentParam = QgsProcessingParameterExtent(self.EXTENT, self.tr('Extent'), optional=True)
+        resolutionParam = QgsProcessingParameterNumber(
+            self.RESOLUTION,
+            self.tr('Resolution'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=15
+        )
+        resolutionParam.setHelp(RESOLUTION_HELP)
+
+        self.addParameter(inputParam)
+        self.addParameter(extentParam)
+        self.addParameter(resolutionParam)
+        self.addOutput(QgsProcessingOutputNumber(self.CELL_COUNT, self.tr('Estimated cell count')))
+        self.addOutput(QgsProcessingOutputNumber(self.OUTPUT_SIZE_MB, self.tr('Estimated output size (MB)')))
+        self.addOutput(QgsProcessingOutputNumber(self.PEAK_MEMORY_MB, self.tr('Estimated peak memory (MB)')))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        ####################
+        # Input Parameters #
+        ####################
+        source = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        resolution = self.parameterAsInt(
+            parameters,
+            self.RESOLUTION,
+            context
+        )
+
+        # validate resolution parameter
+        if resolution < 0 or resolution > 15:
+            raise QgsProcessingException('Invalid input resolution')
+
+        ##############
+        # Processing #
+        ##############
+        if source is not None:
+            featureRequest = QgsFeatureRequest().setDestinationCrs(
+                QgsCoordinateReferenceSystem('EPSG:4326'),
+                QgsCoordinateTransformContext()
+            ).setSubsetOfAttributes([])
+            areaKm2 = geometries_area_km2(f.geometry() for f in source.getFeatures(featureRequest))
+        elif parameters.get(self.EXTENT):
+            extent = self.parameterAsExtentGeometry(
+                parameters,
+                self.EXTENT,
+                context,
+                QgsCoordinateReferenceSystem('EPSG:4326')
+            )
+            areaKm2 = geometries_area_km2([extent])
+        else:
+            raise QgsProcessingException('Either an input layer or an extent is required')
+
+        estimate = estimate_grid(areaKm2, resolution)
+        feedback.pushInfo(f'Area: {areaKm2:,.1f} km2')
+        feedback.pushInfo(f'Estimated grid size: {estimate.describe()}.')
+        if estimate.cellCount > WARN_CELL_COUNT:
+            feedback.pushWarning(
+                'Large grid. Consider a coarser resolution, the out-of-core mode of '
+                '"Create H3 grid inside polygons" and a FlatGeobuf or GeoParquet output.'
+            )
+
+        return {
+            self.CELL_COUNT: estimate.cellCount,
+            self.OUTPUT_SIZE_MB: estimate.outputSizeBytes / 1024 ** 2,
+            self.PEAK_MEMORY_MB: estimate.peakMemoryBytes / 1024 ** 2,
+        }
+
+
+class SmoothOnH3GridProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Neighborhood (k-ring) smoothing on H3 grid processing algorithm.
+
+    Takes an H3 count layer, i.e. a layer with an H3 index field and an optional value field, or a point layer
+    which is counted on the grid first. Computes the kernel weighted sum of the values of all cells within grid
+    distance k of each cell, with the kernel weights precomputed per grid distance.
+
+    Generates the grid cells as polygons with their H3 index, input value, smoothed value and density in the
+    attribute table. Outputs result as a polygon vector layer.
+    """
+    INPUT = 'INPUT'
+    INDEX_FIELD = 'INDEX_FIELD'
+    VALUE_FIELD = 'VALUE_FIELD'
+    RESOLUTION = 'RESOLUTION'
+    K = 'K'
+    KERNEL = 'KERNEL'
+    OUTPUT = 'OUTPUT'
+
+    # Indexed by the engine's KERNEL_* constants
+    KERNEL_OPTIONS = ['Uniform', 'Linear', 'Gaussian']
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return SmoothOnH3GridProcessingAlgorithm()
+
+    def name(self):
+        return 'smoothonh3grid'
+
+    def displayName(self):
+        return self.tr('Smooth values on H3 grid (k-ring)')
+
+    def shortHelpString(self):
+        helpString = (
+            'Computes kernel smoothed values over the neighborhood of H3 cells, e.g. for heatmaps.<br><br>'
+            '<b>Input:</b> H3 count layer, e.g. the output of <i>Count points on H3 Grid</i>, '
+            'or a point layer (automatically transformed to WGS84 if needed)<br>'
+            '<b>H3 index field:</b> Field holding the H3 index of each cell. Leave empty to count the points of '
+            'a point layer<br>'
+            '<b>Value field:</b> Numeric field to smooth (optional). Without a field, each feature counts as 1<br>'
+            '<b>Resolution:</b> H3 grid density level the points are counted at. '
+            'Not used with an H3 index field, where the resolution of the indexes applies<br>'
+            '<b>Radius (k):</b> Grid distance of the neighborhood. k=1 includes the 6 adjacent cells<br>'
+            '<b>Kernel:</b> Weight of a neighbor by its grid distance d: <i>Uniform</i> (1), '
+            '<i>Linear</i> (1 - d / (k + 1)), <i>Gaussian</i> (standard deviation of k / 2)<br>'
+            '<b>Output:</b> Polygon layer of H3 cells with the following attributes:<br>'
+            '<i>value</i>: input value of the cell (0 for cells only reached by smoothing)<br>'
+            '<i>smoothed</i>: kernel weighted sum of the values within distance k<br>'
+            '<i>density</i>: smoothed value divided by the total kernel weight, i.e. weighted mean per cell<br><br>'
+            'The output covers all cells within distance k of an input cell.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+        inputParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input H3 count layer or point layer'),
+            [QgsProcessing.TypeVectorPoint, QgsProcessing.TypeVectorPolygon]
+        )
+        indexFieldParam = QgsProcessingParameterField(
+            self.INDEX_FIELD,
+            self.tr('H3 index field'),
+            parentLayerParameterName=self.INPUT,
+            type=QgsProcessingParameterField.String,
+            optional=True
+        )
+        valueFieldParam = QgsProcessingParameterField(
+            self.VALUE_FIELD,
+            self.tr('Value field'),
+            parentLayerParameterName=self.INPUT,
+            type=QgsProcessingParameterField.Numeric,
+            optional=True
+        )
+        resolutionParam = QgsProcessingParameterNumber(
+            self.RESOLUTION,
+            self.tr('Resolution (point layer input)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=0,
+            maxValue=15,
+            optional=True
+        )
+        resolutionParam.setHelp(RESOLUTION_HELP)
+        kParam = QgsProcessingParameterNumber(
+            self.K,
+            self.tr('Radius (k)'),
+            type=QgsProcessingParameterNumber.Integer,
+            minValue=1,
+            maxValue=50,
+            defaultValue=1
+        )
+        kernelParam = QgsProcessingParameterEnum(
+            self.KERNEL,
+            self.tr('Kernel'),
+            options=[self.tr(option) for option in self.KERNEL_OPTIONS],
+            defaultValue=KERNEL_UNIFORM
+        )
+        outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
+
+        self.addParameter(inputParam)
+        self.addParameter(indexFieldParam)
+        self.addParameter(valueFieldParam)
+        self.addParameter(resolutionParam)
+        self.addParameter(kParam)
+        self.addParameter(kernelParam)
+        self.addParameter(outputParam)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        ####################
+        # Input Parameters #
+        ####################
+        source = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        indexFieldName = self.parameterAsString(
+            parameters,
+            self.INDEX_FIELD,
+            context
+        )
+
+        valueFieldName = self.parameterAsString(
+            parameters,
+            self.VALUE_FIELD,
+            context
+        )
+
+        k = self.parameterAsInt(
+            parameters,
+            self.K,
+            context
+        )
+
+        kernel = self.parameterAsEnum(
+            parameters,
+            self.KERNEL,
+            context
+        )
+
+        # validate source parameter
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        if k < 1:
+            raise QgsProcessingException('Invalid radius, k must be at least 1')
+
+        indexFieldIndex = source.fields().lookupField(indexFieldName) if indexFieldName else -1
+        if indexFieldName and indexFieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {indexFieldName}')
+
+        valueFieldIndex = source.fields().lookupField(valueFieldName) if valueFieldName else -1
+        if valueFieldName and valueFieldIndex < 0:
+            raise QgsProcessingException(f'Field not found: {valueFieldName}')
+
+        if indexFieldIndex < 0:
+            if QgsWkbTypes.geometryType(source.wkbType()) != QgsWkbTypes.PointGeometry:
+                raise QgsProcessingException('An H3 index field is required for non-point input layers')
+            if parameters.get(self.RESOLUTION) is None:
+                raise QgsProcessingException('A resolution is required to count the points of a point layer')
+            if valueFieldIndex >= 0:
+                feedback.pushWarning('The value field is only used with an H3 index field, points are counted.')
+
+        #############################
+        # Output parameters (sinks) #
+        #############################
+
+        # Set up output layer fields
+        indexField = QgsField(
+            name='index',
+            type=QVariant.String,
+            len=30,
+            comment='H3 index')
+        valueField = QgsField(
+            name='value',
+            type=QVariant.Double,
+            comment='Input value'
+        )
+        smoothedField = QgsField(
+            name='smoothed',
+            type=QVariant.Double,
+            comment='Kernel weighted sum of values within distance k'
+        )
+        densityField = QgsField(
+            name='density',
+            type=QVariant.Double,
+            comment='Smoothed value divided by the total kernel weight'
+        )
+        fields = QgsFields()
+        fields.append(indexField)
+        fields.append(valueField)
+        fields.append(smoothedField)
+        fields.append(densityField)
+
+        # create sink, or direct file output for FlatGeobuf / GeoParquet destinations
+        output = CellOutput(self, parameters, self.OUTPUT, context, fields)
+        dest_id = output.destination
+
+        ##############
+        # Processing #
+        ##############
+
+        # ------------------------------------
+        # STEP 1. Read or compute cell values
+        # ------------------------------------
+        if indexFieldIndex >= 0:
+            feedback.pushInfo('Reading cell values...')
+            values = self.readCellValues(source, indexFieldIndex, valueFieldIndex, feedback)
+        else:
+            feedback.pushInfo('Counting points on grid...')
+            resolution = self.parameterAsInt(parameters, self.RESOLUTION, context)
+            values = countPointSource(self, parameters, self.INPUT, context, source, resolution, feedback)
+
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        if len(values) == 0:
+            feedback.pushWarning('Empty Output.')
+            return {self.OUTPUT: dest_id}
+
+        # ------------------------------------------------
+        # STEP 2. Scatter weighted values to neighborhoods
+        # ------------------------------------------------
+        feedback.pushInfo(f'Smoothing {len(values)} cells with radius {k}...')
+
+        weights = kernel_weights(k, kernel)
+        # Total weight of a full disk: ring d holds 6 * d cells, except the center
+        totalWeight = weights[0] + sum(weight * 6 * d for d, weight in enumerate(weights) if d > 0)
+
+        smoothed = smooth_cells(values, k, weights, feedback)
+        if feedback.isCanceled():
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        # -----------------------------------
+        # STEP 3. Output the smoothed cells
+        # -----------------------------------
+        feedback.pushInfo(f'Writing {len(smoothed)} grid cells...')
+
+        attributes = {
+            cell: [float(values.get(cell, 0.0)), cellSum, cellSum / totalWeight]
+            for cell, cellSum in smoothed.items()
+        }
+        if not output.write(smoothed.keys(), len(smoothed), feedback, attributes):
+            feedback.pushInfo('Processing canceled.')
+            return {self.OUTPUT: dest_id}
+
+        feedback.pushInfo('Done.')
+
+        return {self.OUTPUT: dest_id}
+
+    def readCellValues(self, source, indexFieldIndex, valueFieldIndex, feedback):
+        """
+        Returns the sum of the values per H3 index of a count layer. Features without a valid index are skipped.
+        Raises an exception if the indexes are of different resolutions.
+        """
+        h3api = get_h3api()
+        featureRequest = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes(
+            [i for i in (indexFieldIndex, valueFieldIndex) if i >= 0]
+        )
+
+        values = dict()
+        resolution = None
+        skipped = 0
+        for f in source.getFeatures(featureRequest):
+            if feedback.isCanceled():
+                break
+
+            cell = f.attribute(indexFieldIndex)
+            if cell is None or cell == NULL or not h3api.is_valid_cell(str(cell)):
+                skipped += 1
+                continue
+            cell = str(cell)
+
+            if valueFieldIndex >= 0:
+                value = f.attribute(valueFieldIndex)
+                if value is None or value == NULL:
+                    continue
+                value = float(value)
+            else:
+                value = 1.0
+
+            cellResolution = h3api.get_resolution(cell)
+            if resolution is None:
+                resolution = cellResolution
+            elif cellResolution != resolution:
+                raise QgsProcessingException(
+                    f'H3 indexes of different resolutions found ({resolution} and {cellResolution})'
+                )
+
+            values[cell] = values.get(cell, 0.0) + value
+
+        if skipped > 0:
+            feedback.pushWarning(f'{skipped} features without a valid H3 index were skipped.')
+        return values
+
+
+class AddH3IndexFieldProcessingAlgorithm(QgsProcessingAlgorithm):
+    """
+    Processing algorithm to add H3 index fields to the features of a layer.
+
+    Takes a vector layer and one or more resolutions as inputs.
+    Looks up the H3 cell of each feature's point (the point on surface for lines and polygons) at the finest
+    resolution, and derives the cells at the coarser resolutions as its parents.
+    Outputs a copy of the input layer, with an H3 index field per resolution, written in batches.
+    """
+    INPUT = 'INPUT'
+    RESOLUTIONS = 'RESOLUTIONS'
+    FIELD_PREFIX = 'FIELD_PREFIX'
+    OUTPUT = 'OUTPUT'
+
+    # Number of features indexed and written per batch
+    BATCH_SIZE = 10000
+
+    def tr(self, string):
+        """
+        Returns a translatable string with the self.tr() function.
+        """
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return AddH3IndexFieldProcessingAlgorithm()
+
+    def name(self):
+        return 'addh3indexfield'
+
+    def displayName(self):
+        return self.tr('Add H3 index field')
+
+    def shortHelpString(self):
+        helpString = (
+            'Adds the H3 index of each feature as a field, at one or more resolutions, e.g. to join the layer '
+            'with tables indexed on H3.<br><br>'
+            '<b>Input:</b> Vector layer. Points are indexed by their location, lines and polygons by their point '
+            'on surface. Multipoints are indexed by their centroid<br>'
+            '<b>Resolutions:</b> H3 grid density levels to add an index field for (0=largest, 15=smallest)<br>'
+            '<b>Field prefix:</b> Prefix of the index field names, followed by the resolution, e.g. <i>h3_r9</i><br>'
+            '<b>Output:</b> Copy of the input layer with the H3 index fields appended<br><br>'
+            'Features without geometry get empty index fields.<br><br>'
+            'See resolution reference table in <i>Create H3 Grid Inside Polygons</i> help for detailed cell sizes.'
+        )
+        return self.tr(helpString)
+
+    # TODO set up help button url
+    # def helpUrl(self):
+    #    return
+
+    def initAlgorithm(self, config=None):
+        inputParam = QgsProcessingParameterFeatureSource(
+            self.INPUT,
+            self.tr('Input layer'),
+            [QgsProcessing.TypeVectorAnyGeometry]
+        )
+        resolutionsParam = QgsProcessingParameterEnum(
+            self.RESOLUTIONS,
+            self.tr('Resolutions'),
+            options=[str(resolution) for resolution in range(16)],
+            allowMultiple=True,
+            defaultValue=[9]
+        )
+        resolutionsParam.setHelp(RESOLUTION_HELP)
+        fieldPrefixParam = QgsProcessingParameterString(
+            self.FIELD_PREFIX,
+            self.tr('Field prefix'),
+            defaultValue='h3_r'
+        )
+        outputParam = QgsProcessingParameterFeatureSink(self.OUTPUT, self.tr('Output layer'))
+
+        self.addParameter(inputParam)
+        self.addParameter(resolutionsParam)
+        self.addParameter(fieldPrefixParam)
+        self.addParameter(outputParam)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        ####################
+        # Input Parameters #
+        ####################
+        source = self.parameterAsSource(
+            parameters,
+            self.INPUT,
+            context
+        )
+
+        resolutions = sorted(self.parameterAsEnums(
+            parameters,
+            self.RESOLUTIONS,
+            context
+        ))
+
+        fieldPrefix = self.parameterAsString(
+            parameters,
+            self.FIELD_PREFIX,
+            context
+        )
+
+        # validate source parameter
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        # validate resolutions parameter
+        if len(resolutions) == 0:
+            raise QgsProcessingException('At least one resolution is required')
+
+        #############################
+        # Output parameters (sinks) #
+        #############################
+
+        # Set up output layer fields: input fields, then one index field per resolution
+        fields = QgsFields(source.fields())
+        for resolution in resolutions:
+            fieldName = f'{fieldPrefix}{resolution}'
+            if fields.lookupField(fieldName) >= 0:
+                raise QgsProcessingException(f'Field already exists in the input layer: {fieldName}')
+            fields.append(QgsField(
+                name=fieldName,
+                type=QVariant.String,
+                len=16,
+                comment=f'H3 index at resolution {resolution}'
+            ))
+
+        (sink, dest_id) = self.parameterAsSink(
+            parameters,
+            self.OUTPUT,
+            context,
+            fields,
+            source.wkbType(),
+            source.sourceCrs()
+        )
+        # Raise error if sink not created
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        ##############
+        # Processing #
+        ##############
+
+        transformer = QgsCoordinateTransform(
+            source.sourceCrs(),
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            context.transformContext()
+        )
+        isPoint = QgsWkbTypes.geometryType(source.wkbType()) == QgsWkbTypes.PointGeometry
+        emptyIndexes = [NULL] * len(resolutions)
+
+        # For the progress bar
+        featureCount = source.featureCount()
+        progressPerFeature = 100.0 / featureCount if featureCount > 0 else 0
+
+        feedback.pushInfo(f'Indexing features at resolutions {", ".join(map(str, resolutions))}...')
+
+        batch = []
+        written = 0
+        for f in source.getFeatures():
+            batch.append(f)
+            if len(batch) >= self.BATCH_SIZE:
+                self.writeBatch(sink, fields, batch, resolutions, transformer, isPoint, emptyIndexes)
+                written += len(batch)
+                batch = []
+                feedback.setProgress(int(written * progressPerFeature))
+
+                # Stop if cancel button has been clicked
+                if feedback.isCanceled():
+                    feedback.pushInfo('Processing canceled.')
+                    return {self.OUTPUT: dest_id}
+
+        if batch:
+            self.writeBatch(sink, fields, batch, resolutions, transformer, isPoint, emptyIndexes)
+
+        feedback.pushInfo('Done.')
+
+        return {self.OUTPUT: dest_id}
+
+    def writeBatch(self, sink, fields, batch, resolutions, transformer, isPoint, emptyIndexes):
+        """
+        Indexes a batch of features on the H3 grid and adds them to the sink, with their index fields.
+        """
+        # Transform the points of the whole batch first, then index them in one go
+        positions = []
+        lngs = []
+        lats = []
+        for i, f in enumerate(batch):
+            geom = f.geometry()
+            if geom.isNull() or geom.isEmpty():
+                continue
+            if isPoint:
+                point = geom.asPoint() if not geom.isMultipart() else geom.centroid().asPoint()
+            else:
+                point = geom.pointOnSurface().asPoint()
+            point = transformer.transform(point)
+            positions.append(i)
+            lngs.append(point.x())
+            lats.append(point.y())
+
+        indexes = [emptyIndexes] * len(batch)
+        for i, cells in zip(positions, index_coordinates(lngs, lats, resolutions)):
+            indexes[i] = list(cells)
+
+        features = []
+        for f, cells in zip(batch, indexes):
+            feature = QgsFeature(fields)
+            feature.setGeometry(f.geometry())
+            feature.setAttributes(f.attributes() + cells)
+            features.append(feature)
+        sink.addFeatures(features, QgsFeatureSink.FastInsert)
@@ -0,0 +1,88 @@
+"""
+Attribution of H3 cells to the source polygons they were created from.
+
+While polyfilling, each cell can simply remember the first polygon it came from. When the cells do not fit
+in memory, or were compacted to coarser resolutions, the owner of a cell is looked up instead in a spatial
+index over the source polygon parts, one cell at a time while writing the output.
+"""
+from typing import Callable, Dict, List, Optional
+
+from qgis.core import (
+    QgsGeometry,
+    QgsPointXY,
+    QgsRectangle,
+    QgsSpatialIndex,
+)
+
+from .engine import COVERAGE_INTERSECTS, cell_to_geometry
+from .h3_adapter import get_h3api
+
+
+class PolygonOwnerIndex:
+    """
+    Spatial index over singlepart WGS84 polygons, each belonging to an owner (e.g. the ordinal of its feature).
+
+    A cell belongs to the first added polygon containing its centroid, or intersecting it
+    with the COVERAGE_INTERSECTS coverage mode.
+    """
+
+    def __init__(self, coverage: int):
+        self.coverage = coverage
+        self.index = QgsSpatialIndex()
+        self.parts = []
+        self.engines = dict()
+
+    def addPart(self, owner: int, geom: QgsGeometry):
+        partId = len(self.parts)
+        self.parts.append((owner, geom))
+        self.index.addFeature(partId, geom.boundingBox())
+
+    def _engine(self, partId):
+        # Geometry engines are prepared on first use, for the repeated tests of nearby cells
+        engine = self.engines.get(partId)
+        if engine is None:
+            engine = QgsGeometry.createGeometryEngine(self.parts[partId][1].constGet())
+            engine.prepareGeometry()
+            self.engines[partId] = engine
+        return engine
+
+    def owner(self, cell: str) -> Optional[int]:
+        """
+        Returns the owner of the polygon a cell belongs to, or None if no polygon matches.
+        """
+        if self.coverage == COVERAGE_INTERSECTS:
+            testGeom = cell_to_geometry(cell)
+            rect = testGeom.boundingBox()
+        else:
+            lat, lng = get_h3api().cell_to_latlng(cell)
+            testGeom = QgsGeometry.fromPointXY(QgsPointXY(lng, lat))
+            rect = QgsRectangle(lng, lat, lng, lat)
+
+        # Part ids follow the order the polygons were added in, so the first matching polygon wins
+        for partId in sorted(self.index.intersects(rect)):
+            if self._engine(partId).intersects(testGeom.constGet()):
+                return self.parts[partId][0]
+        return None
+
+
+class CellOwnerAttributes:
+    """
+    Read-only mapping of cells to the attribute values of their owner, for `CellOutput.write()`.
+
+    `ownerOf` returns the owner of a cell, e.g. `dict.get` of an owner map or `PolygonOwnerIndex.owner`.
+    If `leading` is given, its values for each cell are placed before the owner's attributes.
+    Cells without owner get None attributes.
+    """
+
+    def __init__(self, ownerAttributes: List[list], ownerOf: Callable[[str], Optional[int]], fieldCount: int, leading: Dict[str, list] = None):
+        self.ownerAttributes = ownerAttributes
+        self.ownerOf = ownerOf
+        self.nulls = [None] * fieldCount
+        self.leading = leading
+
+    def __getitem__(self, cell: str) -> list:
+        owner = self.ownerOf(cell)
+        values = self.nulls if owner is None else self.ownerAttributes[owner]
+        if self.leading is not None:
+            return self.leading[cell] + values
+        return values
@@ -0,0 +1,129 @@
+"""
+Out-of-core deduplicated set of H3 cells.
+
+Keeps at most a configured number of cells in memory. Beyond that, the in-memory cells are spilled to a
+temporary file as a sorted run of uint64 H3 indexes. Iterating the set k-way merges the memory-mapped runs,
+dropping duplicates on the fly, so grids larger than the available RAM can be streamed to the output.
+At most `MAX_MERGE_RUNS` runs are open at once: beyond that, runs are first merged into larger runs in passes.
+"""
+import heapq
+import mmap
+import os
+import tempfile
+from array import array
+from typing import Iterable, Iterator
+
+from .h3_adapter import get_h3api
+
+# Maximum number of runs merged at once, each holding a file descriptor and a memory map
+MAX_MERGE_RUNS = 64
+
+# Number of cells buffered before writing to a run file while merging runs
+WRITE_BUFFER_CELLS = 65536
+
+
+def _unique(values: Iterable[int]) -> Iterator[int]:
+    """
+    Yields the values of a sorted iterable, dropping duplicates.
+    """
+    previous = None
+    for value in values:
+        if value != previous:
+            previous = value
+            yield value
+
+
+class SpillingCellSet:
+    """
+    Set of H3 cells which spills sorted runs of uint64 indexes to temporary files above `maxCellsInMemory` cells.
+
+    Supports `update()` and iteration like a regular set. Iteration yields each cell once, in ascending index
+    order. `len()` is exact as long as nothing was spilled, and an upper bound afterwards, as duplicates across
+    runs are only dropped while iterating. Call `close()` to remove the temporary files.
+    """
+
+    def __init__(self, maxCellsInMemory: int, tempDir: str = None):
+        self.maxCellsInMemory = maxCellsInMemory
+        self.tempDir = tempDir
+        self._cells = set()
+        self._runPaths = []
+        self._runCellCount = 0
+
+    @property
+    def spilled(self) -> bool:
+        return len(self._runPaths) > 0
+
+    def update(self, cells: Iterable[str]):
+        cell_to_int = get_h3api().cell_to_int
+        self._cells.update(cell_to_int(cell) for cell in cells)
+        if len(self._cells) >= self.maxCellsInMemory:
+            self._spill()
+
+    def _spill(self):
+        run = array('Q', sorted(self._cells))
+        fd, path = tempfile.mkstemp(prefix='h3_cells_', suffix='.bin', dir=self.tempDir)
+        with os.fdopen(fd, 'wb') as f:
+            run.tofile(f)
+        self._runPaths.append(path)
+        self._runCellCount += len(run)
+        self._cells = set()
+
+    def __len__(self) -> int:
+        return self._runCellCount + len(self._cells)
+
+    def _iterRun(self, path) -> Iterator[int]:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm).cast('Q')
+                try:
+                    yield from view
+                finally:
+                    view.release()
+
+    def _mergeRuns(self, paths) -> str:
+        """
+        Merges runs into a new deduplicated run, removes them and returns the path of the new run.
+        """
+        fd, mergedPath = tempfile.mkstemp(prefix='h3_cells_', suffix='.bin', dir=self.tempDir)
+        buffer = array('Q')
+        with os.fdopen(fd, 'wb') as f:
+            for value in _unique(heapq.merge(*(self._iterRun(path) for path in paths if os.path.getsize(path) > 0))):
+                buffer.append(value)
+                if len(buffer) >= WRITE_BUFFER_CELLS:
+                    buffer.tofile(f)
+                    buffer = array('Q')
+            buffer.tofile(f)
+
+        for path in paths:
+            self._runCellCount -= os.path.getsize(path) // 8
+            os.remove(path)
+        self._runCellCount += os.path.getsize(mergedPath) // 8
+        return mergedPath
+
+    def iterInts(self) -> Iterator[int]:
+        """
+        Yields each cell once as uint64 H3 index, in ascending order.
+        """
+        # Merge the oldest runs first, so each pass merges runs of similar sizes
+        while len(self._runPaths) > MAX_MERGE_RUNS:
+            merged = self._mergeRuns(self._runPaths[:MAX_MERGE_RUNS])
+            self._runPaths = self._runPaths[MAX_MERGE_RUNS:] + [merged]
+
+        runs = [self._iterRun(path) for path in self._runPaths if os.path.getsize(path) > 0]
+        runs.append(iter(sorted(self._cells)))
+        yield from _unique(heapq.merge(*runs))
+
+    def __iter__(self) -> Iterator[str]:
+        int_to_cell = get_h3api().int_to_cell
+        for value in self.iterInts():
+            yield int_to_cell(value)
+
+    def close(self):
+        for path in self._runPaths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._runPaths = []
+        self._runCellCount = 0
+        self._cells = set()
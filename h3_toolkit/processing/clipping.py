@@ -0,0 +1,148 @@
+"""
+Clipping of lines and polygons against H3 grid cells, for length and area weighted aggregation.
+
+Features are clipped tile by tile, a tile being a coarse parent cell `TILE_RESOLUTION_STEPS` levels above the
+grid resolution. Only the tiles along a feature's boundary, and inside it for polygons, are visited, so the
+cost scales with the size of the feature rather than the size of its bounding box. Tiles not intersecting a
+feature are skipped with a single test. Within a tile, a spatial index of the cell bounding boxes limits the
+exact tests to the cells near the feature, and cells fully inside a polygon get their whole area without
+computing an intersection. Child cell geometries are kept per tile, for a bounded number of recent tiles.
+"""
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Set, Tuple
+
+from qgis.core import QgsGeometry, QgsRectangle, QgsSpatialIndex, QgsWkbTypes
+
+from .engine import boundary_cells, cell_to_geometry
+from .h3_adapter import get_h3api
+
+# Resolution levels between the tiles and the grid cells: up to 7^3 = 343 cells per tile
+TILE_RESOLUTION_STEPS = 3
+
+# Number of tiles whose cell geometries are kept in memory, about 350 cells each
+MAX_CACHED_TILES = 256
+
+
+def tile_resolution(resolution: int) -> int:
+    return max(resolution - TILE_RESOLUTION_STEPS, 0)
+
+
+def tiles_for_geometry(geom: QgsGeometry, tileResolution: int) -> Set[str]:
+    """
+    Returns the tiles which may hold cells intersecting a WGS84 line or polygon geometry: the tiles along its
+    lines or rings, grown by one ring, and the tiles whose centroid is inside its polygons.
+    """
+    tiles = boundary_cells(geom, tileResolution)
+    if geom.type() == QgsWkbTypes.PolygonGeometry:
+        polygon_to_cells = get_h3api().polygon_to_cells
+        for part in geom.asGeometryCollection() if geom.isMultipart() else [geom]:
+            tiles.update(polygon_to_cells(part, tileResolution))
+    return tiles
+
+
+class Tile:
+    """
+    The cells of a tile at the grid resolution, with their geometries, and the extent of all of them.
+    Children cells may stick out of their parent cell's boundary, so the extent is that of the children.
+    The spatial index of the cell bounding boxes is keyed by the position of the cells.
+    """
+    __slots__ = ('cells', 'geometries', 'extent', 'index', 'measures')
+
+    def __init__(self, tile: str, resolution: int):
+        self.cells = get_h3api().cell_to_children(tile, resolution)
+        self.geometries = [cell_to_geometry(cell) for cell in self.cells]
+        extent = QgsRectangle(self.geometries[0].boundingBox())
+        for cellGeom in self.geometries[1:]:
+            extent.combineExtentWith(cellGeom.boundingBox())
+        self.extent = QgsGeometry.fromRect(extent)
+        # built on first use, tiles entirely inside or outside of features do not need it
+        self.index = None
+        # full cell areas, measured on first use
+        self.measures = None
+
+    def cellsIntersecting(self, rect: QgsRectangle) -> List[int]:
+        """
+        Returns the positions of the cells whose bounding box intersects a rectangle, in cell order.
+        """
+        if self.index is None:
+            self.index = QgsSpatialIndex()
+            for i, cellGeom in enumerate(self.geometries):
+                self.index.addFeature(i, cellGeom.boundingBox())
+        return sorted(self.index.intersects(rect))
+
+    def cellMeasures(self, measure: Callable[[QgsGeometry], float]) -> List[float]:
+        if self.measures is None:
+            self.measures = [measure(cellGeom) for cellGeom in self.geometries]
+        return self.measures
+
+
+class TileCache:
+    """
+    Least recently used tiles of a grid resolution, holding at most `maxTiles` tiles.
+    """
+
+    def __init__(self, resolution: int, maxTiles: int = MAX_CACHED_TILES):
+        self.resolution = resolution
+        self.maxTiles = maxTiles
+        self._tiles = OrderedDict()
+
+    def get(self, tile: str) -> Tile:
+        entry = self._tiles.get(tile)
+        if entry is not None:
+            self._tiles.move_to_end(tile)
+            return entry
+        entry = Tile(tile, self.resolution)
+        self._tiles[tile] = entry
+        if len(self._tiles) > self.maxTiles:
+            self._tiles.popitem(last=False)
+        return entry
+
+
+def clip_to_cells(
+        geom: QgsGeometry,
+        totalMeasure: float,
+        measure: Callable[[QgsGeometry], float],
+        tileCache: TileCache) -> Iterator[Tuple[str, float]]:
+    """
+    Yields each cell intersecting a WGS84 line or polygon geometry, with the length or area of the geometry
+    within the cell, as given by `measure`. `totalMeasure` is the measure of the whole geometry.
+    """
+    h3api = get_h3api()
+    resolution = tileCache.resolution
+    isPolygon = geom.type() == QgsWkbTypes.PolygonGeometry
+
+    # Features within a single cell, e.g. short road segments, are not clipped at all
+    bbox = geom.boundingBox()
+    center = bbox.center()
+    centerCell = h3api.latlng_to_cell(center.y(), center.x(), resolution)
+    if cell_to_geometry(centerCell).contains(geom):
+        yield centerCell, totalMeasure
+        return
+
+    # Prepared geometry makes the repeated tests against the tiles and cells cheap
+    geomEngine = QgsGeometry.createGeometryEngine(geom.constGet())
+    geomEngine.prepareGeometry()
+
+    # Tiles hold disjoint sets of cells, so each cell is yielded once
+    for tileCell in tiles_for_geometry(geom, tile_resolution(resolution)):
+        tile = tileCache.get(tileCell)
+        if not geomEngine.intersects(tile.extent.constGet()):
+            continue
+
+        # Tiles inside a polygon: all their cells are fully inside too
+        if isPolygon and geomEngine.contains(tile.extent.constGet()):
+            yield from zip(tile.cells, tile.cellMeasures(measure))
+            continue
+
+        # Only cells whose bounding box intersects the feature's get the exact tests
+        for i in tile.cellsIntersecting(bbox):
+            cell = tile.cells[i]
+            cellGeom = tile.geometries[i]
+            if not geomEngine.intersects(cellGeom.constGet()):
+                continue
+            if isPolygon and geomEngine.contains(cellGeom.constGet()):
+                yield cell, tile.cellMeasures(measure)[i]
+                continue
+            partMeasure = measure(geom.intersection(cellGeom))
+            if partMeasure > 0:
+                yield cell, partMeasure
@@ -0,0 +1,582 @@
+"""
+Hot paths shared by the processing algorithms: polyfill, cell boundary building, point indexing and
+sink writing. All calls to the h3 library go through the version specific adapter in `h3_adapter`.
+"""
+import math
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from qgis.core import (
+    QgsFeature,
+    QgsFeatureSink,
+    QgsFields,
+    QgsGeometry,
+    QgsPointXY,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsRectangle,
+)
+
+from .h3_adapter import get_h3api
+from .lineworker import LINE_DENSIFY, coordinates_to_cells
+from .polyfillcache import PolyfillCache, polyfill_cache_key
+from .sketches import HyperLogLog, SpaceSaving
+from .timebins import pack_cell_time_bin
+
+# Output orders of grid cells
+SORT_NONE = 0
+SORT_H3_INDEX = 1
+SORT_HILBERT = 2
+
+# Bits per axis of the grid the cell centroids are snapped to for Hilbert ordering
+HILBERT_ORDER = 16
+
+# Polygon coverage modes: cells whose center is inside, which intersect, or which are fully inside a polygon
+COVERAGE_CENTER = 0
+COVERAGE_INTERSECTS = 1
+COVERAGE_CONTAINED = 2
+
+# Containment mode of h3's experimental polyfill for each coverage mode
+COVERAGE_CONTAINMENT = {
+    COVERAGE_CENTER: 'center',
+    COVERAGE_INTERSECTS: 'overlap',
+    COVERAGE_CONTAINED: 'full',
+}
+
+# Smoothing kernels, weighting neighbor cells by their grid distance
+KERNEL_UNIFORM = 0
+KERNEL_LINEAR = 1
+KERNEL_GAUSSIAN = 2
+
+
+def cell_to_geometry(cell: str) -> QgsGeometry:
+    """
+    Returns the boundary of an H3 cell as a WGS84 polygon geometry.
+    """
+    hexVertexCoords = get_h3api().cell_to_boundary(cell)
+    return QgsGeometry.fromPolygonXY([[QgsPointXY(lon, lat) for lat, lon in hexVertexCoords], ])
+
+
+def boundary_cells(geom: QgsGeometry, resolution: int) -> Set[str]:
+    """
+    Returns a thin set of H3 cells containing every cell crossed by the boundary of a WGS84 polygon,
+    or by a WGS84 line.
+
+    The rings or lines are densified to a quarter of the average cell edge length, each vertex is indexed,
+    and the cells found are grown by one ring to catch cells the boundary only clips at a corner.
+    """
+    h3api = get_h3api()
+    spacing = h3api.average_edge_length_km(resolution) / 111.32 / 4
+    vertexCells = {h3api.latlng_to_cell(v.y(), v.x(), resolution) for v in geom.densifyByDistance(spacing).vertices()}
+
+    cells = set()
+    for cell in vertexCells:
+        cells.update(h3api.grid_disk(cell, 1))
+    return cells
+
+
+def polygon_to_cells_coverage(geom: QgsGeometry, resolution: int, coverage: int) -> Set[str]:
+    """
+    Returns the set of H3 cells covering a singlepart WGS84 polygon with the given COVERAGE_* mode.
+
+    Uses the containment modes of h3's experimental polyfill when available. Otherwise, cells whose center is
+    inside the polygon and which are not near its boundary are inside the polygon as a whole; only the thin
+    set of boundary cells is tested precisely, against a prepared geometry.
+    """
+    h3api = get_h3api()
+    if coverage == COVERAGE_CENTER:
+        return h3api.polygon_to_cells(geom, resolution)
+
+    cells = h3api.polygon_to_cells_experimental(geom, resolution, COVERAGE_CONTAINMENT[coverage])
+    if cells is not None:
+        return cells
+
+    edgeCells = boundary_cells(geom, resolution)
+    cells = h3api.polygon_to_cells(geom, resolution) - edgeCells
+
+    # Prepared geometry makes the repeated tests against the boundary cells cheap
+    geomEngine = QgsGeometry.createGeometryEngine(geom.constGet())
+    geomEngine.prepareGeometry()
+    test = geomEngine.intersects if coverage == COVERAGE_INTERSECTS else geomEngine.contains
+    cells.update(cell for cell in edgeCells if test(cell_to_geometry(cell).constGet()))
+    return cells
+
+
+def polygon_to_cells_cached(geom: QgsGeometry, resolution: int, coverage: int, cache: PolyfillCache = None) -> Set[str]:
+    """
+    Like `polygon_to_cells_coverage`, reusing the result of a previous polyfill of the same polygon, resolution
+    and coverage mode from `cache` if given. New results are added to the cache.
+    """
+    if cache is None:
+        return polygon_to_cells_coverage(geom, resolution, coverage)
+
+    h3api = get_h3api()
+    key = polyfill_cache_key(geom, resolution, coverage)
+    cachedCells = cache.get(key)
+    if cachedCells is not None:
+        return set(map(h3api.int_to_cell, cachedCells))
+
+    cells = polygon_to_cells_coverage(geom, resolution, coverage)
+    # results too large for the cache are not converted at all
+    if cache.accepts(len(cells)):
+        cache.put(key, array('Q', map(h3api.cell_to_int, cells)))
+    return cells
+
+
+def polyfill_geometries(
+        geometries: Iterable[QgsGeometry],
+        resolution: int,
+        feedback: QgsProcessingFeedback,
+        hexIndexSet=None,
+        coverage: int = COVERAGE_CENTER,
+        cache: PolyfillCache = None) -> Set[str]:
+    """
+    Returns the set of H3 cells covering any of the given singlepart WGS84 polygons. By default, cells
+    whose centroid is inside a polygon, see `polygon_to_cells_coverage` for the other coverage modes.
+    Stops early if the user cancels; the cells found until then are returned.
+
+    The cells are added to `hexIndexSet` if given, which can be any set-like object with an `update()` method,
+    e.g. a `SpillingCellSet`. Polyfill results are reused from and added to `cache` if given.
+    """
+    hexIndexSet = set() if hexIndexSet is None else hexIndexSet
+    for geom in geometries:
+        hexIndexSet.update(polygon_to_cells_cached(geom, resolution, coverage, cache))
+
+        # Stop if cancel button has been clicked
+        if feedback.isCanceled():
+            break
+    return hexIndexSet
+
+
+def polyfill_owned_geometries(
+        ownedGeometries: Iterable[Tuple[int, QgsGeometry]],
+        resolution: int,
+        feedback: QgsProcessingFeedback,
+        hexIndexSet=None,
+        coverage: int = COVERAGE_CENTER,
+        owners: Dict[str, int] = None,
+        cache: PolyfillCache = None) -> Set[str]:
+    """
+    Like `polyfill_geometries`, for (owner, singlepart WGS84 polygon) pairs. If `owners` is given, it records
+    the owner of the first polygon each cell came from.
+    """
+    hexIndexSet = set() if hexIndexSet is None else hexIndexSet
+    for owner, geom in ownedGeometries:
+        cells = polygon_to_cells_cached(geom, resolution, coverage, cache)
+        hexIndexSet.update(cells)
+        if owners is not None:
+            for cell in cells:
+                owners.setdefault(cell, owner)
+
+        # Stop if cancel button has been clicked
+        if feedback.isCanceled():
+            break
+    return hexIndexSet
+
+
+def polyfill_rectangle(rect: QgsRectangle, resolution: int) -> Set[str]:
+    """
+    Returns the set of H3 cells whose centroid is inside the given WGS84 rectangle.
+    The rectangle is clamped to the WGS84 bounds.
+    """
+    xMin = max(rect.xMinimum(), -180.0)
+    xMax = min(rect.xMaximum(), 180.0)
+    yMin = max(rect.yMinimum(), -90.0)
+    yMax = min(rect.yMaximum(), 90.0)
+    if xMin >= xMax or yMin >= yMax:
+        return set()
+
+    # split rectangles wider than 180 degrees, to avoid the polyfill inverting them along x
+    if xMax - xMin > 180:
+        xMid = xMin + (xMax - xMin) / 2
+        rects = [QgsRectangle(xMin, yMin, xMid, yMax), QgsRectangle(xMid, yMin, xMax, yMax)]
+    else:
+        rects = [QgsRectangle(xMin, yMin, xMax, yMax)]
+
+    h3api = get_h3api()
+    cells = set()
+    for r in rects:
+        cells.update(h3api.ring_to_cells(QgsGeometry.fromRect(r).asPolygon()[0], resolution))
+    return cells
+
+
+def rectangle_area_km2(rect: QgsRectangle) -> float:
+    """
+    Returns the area of a WGS84 rectangle in square kilometers, on a spherical earth.
+    """
+    earthRadiusKm = 6371.0088
+    xMin = max(rect.xMinimum(), -180.0)
+    xMax = min(rect.xMaximum(), 180.0)
+    yMin = max(rect.yMinimum(), -90.0)
+    yMax = min(rect.yMaximum(), 90.0)
+    if xMin >= xMax or yMin >= yMax:
+        return 0.0
+    return (
+        earthRadiusKm ** 2
+        * math.radians(xMax - xMin)
+        * abs(math.sin(math.radians(yMax)) - math.sin(math.radians(yMin)))
+    )
+
+
+def estimate_cell_count(areaKm2: float, resolution: int, perimeterKm: float = 0.0, coverage: int = COVERAGE_CENTER) -> int:
+    """
+    Returns the expected number of H3 cells covering an area, based on the average cell area at the resolution.
+
+    With the perimeter of the area, the estimate accounts for the cells crossing its boundary for the
+    COVERAGE_INTERSECTS and COVERAGE_CONTAINED modes. A line crosses 4 / (pi * sqrt(3)) hexagons per edge length
+    (Buffon), and half of the crossed cells are already counted by the area.
+    """
+    h3api = get_h3api()
+    cellCount = areaKm2 / h3api.average_area_km2(resolution)
+    if perimeterKm > 0 and coverage != COVERAGE_CENTER:
+        boundaryCells = 2 * perimeterKm / (math.pi * math.sqrt(3) * h3api.average_edge_length_km(resolution))
+        cellCount += boundaryCells if coverage == COVERAGE_INTERSECTS else -boundaryCells
+    return max(math.ceil(cellCount), 0)
+
+
+def count_points(points: Iterator[QgsPointXY], resolution: int, counts: Dict[str, int] = None) -> Dict[str, int]:
+    """
+    Indexes WGS84 points on the H3 grid and returns the number of points per cell.
+    If `counts` is given, the points are added to it.
+    """
+    latlng_to_cell = get_h3api().latlng_to_cell
+    counts = dict() if counts is None else counts
+    for point in points:
+        idx = latlng_to_cell(point.y(), point.x(), resolution)
+        counts[idx] = counts.get(idx, 0) + 1
+    return counts
+
+
+def count_coordinates(lngs: Sequence[float], lats: Sequence[float], resolution: int, counts: Dict[str, int] = None) -> Dict[str, int]:
+    """
+    Indexes WGS84 coordinate columns on the H3 grid and returns the number of points per cell.
+    If `counts` is given, the points are added to it.
+    """
+    latlng_to_cell = get_h3api().latlng_to_cell
+    counts = dict() if counts is None else counts
+    for lng, lat in zip(lngs, lats):
+        idx = latlng_to_cell(lat, lng, resolution)
+        counts[idx] = counts.get(idx, 0) + 1
+    return counts
+
+
+def sketch_points(
+        points: Iterator[Tuple[QgsPointXY, object, object]],
+        resolution: int,
+        counts: Dict[str, int],
+        distinctSketches: Dict[str, HyperLogLog] = None,
+        topSketches: Dict[str, SpaceSaving] = None,
+        topCapacity: int = 32) -> Dict[str, int]:
+    """
+    Indexes WGS84 points with a distinct value and a category on the H3 grid, and returns the number of
+    points per cell. Values which are None are skipped.
+
+    If `distinctSketches` is given, the distinct values of each cell are added to a HyperLogLog sketch.
+    If `topSketches` is given, the categories of each cell are added to a Space-Saving sketch of `topCapacity`.
+    The memory per cell is bounded in both cases.
+    """
+    latlng_to_cell = get_h3api().latlng_to_cell
+    for point, distinctValue, category in points:
+        idx = latlng_to_cell(point.y(), point.x(), resolution)
+        counts[idx] = counts.get(idx, 0) + 1
+
+        if distinctSketches is not None and distinctValue is not None:
+            sketch = distinctSketches.get(idx)
+            if sketch is None:
+                sketch = distinctSketches[idx] = HyperLogLog()
+            sketch.add(distinctValue)
+
+        if topSketches is not None and category is not None:
+            sketch = topSketches.get(idx)
+            if sketch is None:
+                sketch = topSketches[idx] = SpaceSaving(topCapacity)
+            sketch.add(category)
+    return counts
+
+
+def count_points_in_time_bins(
+        points: Iterator[Tuple[QgsPointXY, float]],
+        resolution: int,
+        binSeconds: float,
+        counts: Dict[int, int] = None) -> Dict[int, int]:
+    """
+    Indexes WGS84 points with a timestamp (seconds since the epoch) on the H3 grid and on time bins of
+    `binSeconds`, and returns the number of points per (cell, time bin).
+    If `counts` is given, the points are added to it.
+
+    Each key packs the uint64 H3 index and the time bin number into a single integer, see
+    `timebins.unpack_cell_time_bin`. Raises QgsProcessingException for timestamps whose time bin can not be
+    packed.
+    """
+    h3api = get_h3api()
+    latlng_to_cell = h3api.latlng_to_cell
+    cell_to_int = h3api.cell_to_int
+    counts = dict() if counts is None else counts
+    for point, seconds in points:
+        cellInt = cell_to_int(latlng_to_cell(point.y(), point.x(), resolution))
+        try:
+            key = pack_cell_time_bin(cellInt, int(seconds // binSeconds))
+        except ValueError as e:
+            raise QgsProcessingException(f'Timestamp {seconds} s can not be binned: {e}')
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def index_coordinates(lngs: Sequence[float], lats: Sequence[float], resolutions: Sequence[int]) -> List[Tuple[str, ...]]:
+    """
+    Returns the H3 cells of WGS84 coordinate columns at several resolutions, as one tuple per point,
+    in the order of `resolutions`.
+
+    Only the finest resolution is computed from the coordinates, the coarser cells are derived as its parents.
+    """
+    h3api = get_h3api()
+    latlng_to_cell = h3api.latlng_to_cell
+    cell_to_parent = h3api.cell_to_parent
+    finest = max(resolutions)
+
+    indexes = []
+    for lng, lat in zip(lngs, lats):
+        cell = latlng_to_cell(lat, lng, finest)
+        indexes.append(tuple(cell if r == finest else cell_to_parent(cell, r) for r in resolutions))
+    return indexes
+
+
+def polyline_coordinates(polyline: Sequence[QgsPointXY]) -> List[float]:
+    """
+    Returns the flat (longitude, latitude) coordinates of a WGS84 polyline.
+    """
+    return [value for point in polyline for value in (point.x(), point.y())]
+
+
+def line_to_cells(polyline: Sequence[QgsPointXY], resolution: int, cells: Set[str] = None, traversal: int = LINE_DENSIFY) -> Set[str]:
+    """
+    Returns the H3 cells along a WGS84 polyline, traversed with a LINE_* method, see
+    `lineworker.coordinates_to_cells`. Densified segments are sampled every half average cell edge.
+    If `cells` is given, the cells are added to it.
+    """
+    h3api = get_h3api()
+    cells = set() if cells is None else cells
+    coordinates_to_cells(
+        polyline_coordinates(polyline),
+        resolution,
+        traversal,
+        h3api.average_edge_length_km(resolution) / 2,
+        h3api.latlng_to_cell,
+        h3api.grid_path_cells,
+        cells
+    )
+    return cells
+
+
+def distance_to_k(distanceM: float, resolution: int) -> int:
+    """
+    Returns the grid distance k whose disk reaches about `distanceM` meters around a cell: the distance divided
+    by the spacing of neighbouring cell centers (sqrt(3) average edge lengths), rounded up.
+    """
+    edgeM = get_h3api().average_edge_length_km(resolution) * 1000
+    return math.ceil(distanceM / (math.sqrt(3) * edgeM))
+
+
+def buffer_cells(cells: Iterable[str], k: int) -> array:
+    """
+    Returns the cells within grid distance k of any of the cells, as a sorted uint64 array of unique H3 indexes.
+    """
+    h3api = get_h3api()
+    grid_disk = h3api.grid_disk
+    cell_to_int = h3api.cell_to_int
+    buffered = set()
+    for cell in set(cells):
+        buffered.update(map(cell_to_int, grid_disk(cell, k)))
+    return array('Q', sorted(buffered))
+
+
+def compact_cells(cells: Iterable[int]) -> array:
+    """
+    Returns the compacted set of unique, same resolution uint64 H3 indexes, as a uint64 array of mixed
+    resolution indexes. Cells whose children are all in the set are replaced by their parent, recursively.
+
+    The indexes are held in a flat uint64 array throughout, so tens of millions of cells can be compacted
+    without a Python object per cell.
+    """
+    return get_h3api().compact_cells_int(array('Q', cells))
+
+
+def hilbert_distance(x: int, y: int, order: int = HILBERT_ORDER) -> int:
+    """
+    Returns the distance along the Hilbert curve of the integer point (x, y) on a 2^order x 2^order grid.
+    """
+    d = 0
+    s = 1 << (order - 1)
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def sort_cells(cells: Iterable[str], sortOrder: int) -> list:
+    """
+    Returns the cells as a list in the given order, for spatially coherent output files.
+
+    SORT_H3_INDEX sorts on the 64 bit integer H3 index, which keeps cells sharing a parent together.
+    SORT_HILBERT sorts on the Hilbert curve distance of the cell centroids, snapped to a 2^16 x 2^16 lon/lat grid.
+    """
+    h3api = get_h3api()
+    if sortOrder == SORT_H3_INDEX:
+        int_to_cell = h3api.int_to_cell
+        return [int_to_cell(value) for value in sorted(map(h3api.cell_to_int, cells))]
+
+    if sortOrder == SORT_HILBERT:
+        cell_to_latlng = h3api.cell_to_latlng
+        scale = (1 << HILBERT_ORDER) - 1
+
+        def hilbertKey(cell):
+            lat, lng = cell_to_latlng(cell)
+            return hilbert_distance(int((lng + 180.0) / 360.0 * scale), int((lat + 90.0) / 180.0 * scale))
+
+        return sorted(cells, key=hilbertKey)
+
+    return list(cells)
+
+
+def kernel_weights(k: int, kernel: int) -> List[float]:
+    """
+    Returns the weight of each grid distance 0..k of a smoothing kernel of radius k.
+
+    KERNEL_UNIFORM weights all cells of the disk equally, KERNEL_LINEAR decreases linearly to 1 / (k + 1)
+    at distance k, KERNEL_GAUSSIAN follows a normal curve whose standard deviation is half the radius.
+    """
+    if kernel == KERNEL_LINEAR:
+        return [1.0 - d / (k + 1) for d in range(k + 1)]
+    if kernel == KERNEL_GAUSSIAN:
+        sigma = max(k / 2.0, 0.5)
+        return [math.exp(-d * d / (2 * sigma * sigma)) for d in range(k + 1)]
+    return [1.0] * (k + 1)
+
+
+def grid_rings(cell: str, k: int, h3api=None) -> List[Set[str]]:
+    """
+    Returns the cells at each grid distance 0..k of a cell, as a list of k + 1 sets.
+
+    The disk of radius k is split into rings by the grid distance of each of its cells. Where h3 can not
+    compute a grid distance, around pentagons, the rings are built by growing the disk one step at a time.
+    """
+    if h3api is None:
+        h3api = get_h3api()
+    rings = [set() for _ in range(k + 1)]
+    for neighbor in h3api.grid_disk(cell, k):
+        distance = h3api.grid_distance(cell, neighbor)
+        if distance is None or distance > k:
+            return _grown_grid_rings(cell, k, h3api.grid_disk)
+        rings[distance].add(neighbor)
+    return rings
+
+
+def _grown_grid_rings(cell: str, k: int, grid_disk) -> List[Set[str]]:
+    rings = [{cell}]
+    seen = {cell}
+    for _ in range(k):
+        ring = set()
+        for c in rings[-1]:
+            ring.update(grid_disk(c, 1))
+        ring -= seen
+        seen |= ring
+        rings.append(ring)
+    return rings
+
+
+def smooth_cells(values: Dict[str, float], k: int, weights: Sequence[float], feedback: QgsProcessingFeedback) -> Dict[str, float]:
+    """
+    Returns the kernel weighted sum of the values of the cells within grid distance k of each cell.
+
+    The value of each cell is scattered to its neighbors, weighted by `weights[distance]`, so the cost is
+    proportional to the number of input cells times the size of the disk. The result covers every cell within
+    distance k of an input cell. Stops early if the user cancels; the partial sums are returned.
+    """
+    h3api = get_h3api()
+    smoothed = dict()
+    progressPerCell = 100.0 / len(values) if len(values) > 0 else 0
+
+    for i, (cell, value) in enumerate(values.items()):
+        for weight, ring in zip(weights, grid_rings(cell, k, h3api)):
+            weightedValue = weight * value
+            for neighbor in ring:
+                smoothed[neighbor] = smoothed.get(neighbor, 0.0) + weightedValue
+
+        if i % 1000 == 0:
+            feedback.setProgress(int(i * progressPerCell))
+            # Stop if cancel button has been clicked
+            if feedback.isCanceled():
+                break
+    return smoothed
+
+
+def cell_rows(cells: Iterable[str], attributes: Dict[str, list] = None) -> Iterator[Tuple[str, list]]:
+    """
+    Yields (cell, attribute values) rows of the cells, with the values of `attributes[cell]` if given.
+    """
+    if attributes is None:
+        for cell in cells:
+            yield cell, []
+    else:
+        for cell in cells:
+            yield cell, attributes[cell]
+
+
+def write_cells(
+        sink: QgsFeatureSink,
+        fields: QgsFields,
+        cells: Iterable[str],
+        cellCount: int,
+        feedback: QgsProcessingFeedback,
+        attributes: Dict[str, list] = None) -> bool:
+    """
+    Generates the geometry of each cell and adds it to the sink as a feature.
+
+    The first field of `fields` receives the H3 index. If `attributes` is given, it maps each cell to the
+    values of the remaining fields. Reports progress based on `cellCount`.
+    Returns False if the user canceled, True otherwise.
+    """
+    return write_rows(sink, fields, cell_rows(cells, attributes), cellCount, feedback)
+
+
+def write_rows(
+        sink: QgsFeatureSink,
+        fields: QgsFields,
+        rows: Iterable[Tuple[str, list]],
+        rowCount: int,
+        feedback: QgsProcessingFeedback) -> bool:
+    """
+    Like `write_cells`, for (cell, attribute values) rows, where a cell may appear in several rows.
+    """
+    # For the progress bar
+    progressPerHex = 100.0 / rowCount if rowCount > 0 else 0
+    currentProgress = 0
+    lastProgress = 0
+
+    # Set up template feature
+    feature = QgsFeature(fields)
+
+    for i, (index, values) in enumerate(rows):
+        # create hex feature, add to sink
+        feature.setGeometry(cell_to_geometry(index))
+        feature.setAttributes([index] + values)
+        sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+        # check and report progress
+        currentProgress = int(i * progressPerHex)
+        if currentProgress != lastProgress:
+            lastProgress = currentProgress
+            feedback.setProgress(lastProgress)
+
+        # Stop if cancel button has been clicked
+        if feedback.isCanceled():
+            return False
+    return True
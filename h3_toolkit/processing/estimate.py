@@ -0,0 +1,74 @@
+"""
+Fast estimates of the size of an H3 grid, computed from the covered area and the average H3 cell area,
+without generating any cells.
+"""
+from typing import Iterable, NamedTuple, Tuple
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsDistanceArea,
+    QgsGeometry,
+)
+
+from .engine import COVERAGE_CENTER, estimate_cell_count
+
+# Approximate output size of one cell: hexagon polygon and H3 index attribute, spatial index included
+OUTPUT_BYTES_PER_CELL = 200
+
+# Approximate peak memory of one cell during grid creation: H3 index string held in a Python set
+MEMORY_BYTES_PER_CELL = 150
+
+# Above this many cells, grid creation warns the user
+WARN_CELL_COUNT = 10000000
+
+
+class GridEstimate(NamedTuple):
+    cellCount: int
+    outputSizeBytes: int
+    peakMemoryBytes: int
+
+    def describe(self) -> str:
+        return (
+            f'~{self.cellCount:,} grid cells, '
+            f'~{self.outputSizeBytes / 1024 ** 2:,.0f} MB output, '
+            f'~{self.peakMemoryBytes / 1024 ** 2:,.0f} MB peak memory'
+        )
+
+
+def estimate_grid(areaKm2: float, resolution: int, perimeterKm: float = 0.0, coverage: int = COVERAGE_CENTER) -> GridEstimate:
+    """
+    Returns the estimated cell count, output size and peak memory of a grid covering an area at a resolution.
+    See `estimate_cell_count` for the perimeter and coverage mode.
+    """
+    cellCount = estimate_cell_count(areaKm2, resolution, perimeterKm, coverage)
+    return GridEstimate(cellCount, cellCount * OUTPUT_BYTES_PER_CELL, cellCount * MEMORY_BYTES_PER_CELL)
+
+
+def _wgs84_distance_area() -> QgsDistanceArea:
+    distanceArea = QgsDistanceArea()
+    distanceArea.setSourceCrs(QgsCoordinateReferenceSystem('EPSG:4326'), QgsCoordinateTransformContext())
+    distanceArea.setEllipsoid('WGS84')
+    return distanceArea
+
+
+def geometries_area_km2(geometries: Iterable[QgsGeometry]) -> float:
+    """
+    Returns the total ellipsoidal area of WGS84 geometries in square kilometers. Overlaps are counted multiple times.
+    """
+    distanceArea = _wgs84_distance_area()
+    return sum(distanceArea.measureArea(geom) for geom in geometries) / 1e6
+
+
+def geometries_area_perimeter_km(geometries: Iterable[QgsGeometry]) -> Tuple[float, float]:
+    """
+    Returns the total ellipsoidal area in square kilometers and perimeter in kilometers of WGS84 polygons.
+    Overlaps are counted multiple times.
+    """
+    distanceArea = _wgs84_distance_area()
+    areaKm2 = 0.0
+    perimeterKm = 0.0
+    for geom in geometries:
+        areaKm2 += distanceArea.measureArea(geom) / 1e6
+        perimeterKm += distanceArea.measurePerimeter(geom) / 1e3
+    return areaKm2, perimeterKm
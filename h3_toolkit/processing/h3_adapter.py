@@ -0,0 +1,276 @@
+"""
+Thin adapters over the h3 library's v4.x and v3.x Python APIs.
+
+The processing engine and algorithms only call h3 through the adapter selected here, so they work with
+both major versions of the library without duplicating any code.
+
+Importing h3 is deferred until `get_h3api()` is first called, i.e. until an algorithm first runs,
+to keep it out of the QGIS startup time.
+"""
+import json
+from array import array
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
+
+from ..h3_dependency_guard import get_h3_version
+
+if TYPE_CHECKING:
+    from qgis.core import QgsGeometry
+
+# The h3 module, imported by get_h3api()
+h3 = None
+_h3api = None
+
+
+class H3V4Adapter:
+    """
+    Adapter for the h3 v4.x API.
+    """
+
+    @staticmethod
+    def polygon_to_cells(geom: 'QgsGeometry', resolution: int) -> Set[str]:
+        """
+        Returns the cells whose centroid is inside a singlepart WGS84 polygon geometry, holes included.
+        """
+        rings = [[(p.y(), p.x()) for p in ring] for ring in geom.asPolygon()]
+        return set(h3.h3shape_to_cells(h3.LatLngPoly(*rings), resolution))
+
+    @staticmethod
+    def ring_to_cells(ring, resolution: int) -> Set[str]:
+        """
+        Returns the cells whose centroid is inside the polygon described by a WGS84 exterior ring.
+        """
+        return set(h3.h3shape_to_cells(h3.LatLngPoly([(p.y(), p.x()) for p in ring]), resolution))
+
+    @staticmethod
+    def polygon_to_cells_experimental(geom: 'QgsGeometry', resolution: int, contain: str) -> Optional[Set[str]]:
+        """
+        Returns the cells covering a singlepart WGS84 polygon geometry with the given containment mode
+        ('center', 'overlap' or 'full'), or None if the installed h3 version does not support containment modes.
+        """
+        if not hasattr(h3, 'h3shape_to_cells_experimental'):
+            return None
+        rings = [[(p.y(), p.x()) for p in ring] for ring in geom.asPolygon()]
+        return set(h3.h3shape_to_cells_experimental(h3.LatLngPoly(*rings), resolution, contain=contain))
+
+    @staticmethod
+    def cell_to_boundary(cell: str) -> Tuple[Tuple[float, float], ...]:
+        return h3.cell_to_boundary(cell)
+
+    @staticmethod
+    def latlng_to_cell(lat: float, lng: float, resolution: int) -> str:
+        return h3.latlng_to_cell(lat, lng, resolution)
+
+    @staticmethod
+    def cell_to_latlng(cell: str) -> Tuple[float, float]:
+        return h3.cell_to_latlng(cell)
+
+    @staticmethod
+    def grid_disk(cell: str, k: int) -> Set[str]:
+        return set(h3.grid_disk(cell, k))
+
+    @staticmethod
+    def grid_distance(start: str, end: str) -> Optional[int]:
+        """
+        Returns the grid distance between two cells,
+        or None if h3 can not compute it, e.g. across pentagon distortion.
+        """
+        try:
+            return h3.grid_distance(start, end)
+        except h3.H3BaseException:
+            return None
+
+    @staticmethod
+    def grid_path_cells(start: str, end: str) -> Optional[List[str]]:
+        """
+        Returns the cells of the grid path between two cells, both included,
+        or None if h3 can not compute it, e.g. across pentagon distortion.
+        """
+        try:
+            return h3.grid_path_cells(start, end)
+        except h3.H3BaseException:
+            return None
+
+    @staticmethod
+    def cell_to_parent(cell: str, resolution: int) -> str:
+        return h3.cell_to_parent(cell, resolution)
+
+    @staticmethod
+    def cell_to_children(cell: str, resolution: int) -> List[str]:
+        return list(h3.cell_to_children(cell, resolution))
+
+    @staticmethod
+    def compact_cells_int(cells: array) -> array:
+        """
+        Returns the compacted set of a uint64 array of unique H3 indexes, as a uint64 array.
+        """
+        from h3.api import memview_int
+
+        return array('Q', memview_int.compact_cells(memoryview(cells)))
+
+    @staticmethod
+    def is_valid_cell(cell: str) -> bool:
+        return h3.is_valid_cell(cell)
+
+    @staticmethod
+    def average_edge_length_km(resolution: int) -> float:
+        return h3.average_hexagon_edge_length(resolution, unit='km')
+
+    @staticmethod
+    def average_area_km2(resolution: int) -> float:
+        return h3.average_hexagon_area(resolution, unit='km^2')
+
+    @staticmethod
+    def num_cells(resolution: int) -> int:
+        return h3.get_num_cells(resolution)
+
+    @staticmethod
+    def cell_to_int(cell: str) -> int:
+        return h3.str_to_int(cell)
+
+    @staticmethod
+    def int_to_cell(value: int) -> str:
+        return h3.int_to_str(value)
+
+    @staticmethod
+    def get_resolution(cell: str) -> int:
+        return h3.get_resolution(cell)
+
+    @staticmethod
+    def versions() -> dict:
+        return h3.versions()
+
+
+class H3V3Adapter:
+    """
+    Adapter for the h3 v3.x API.
+    """
+
+    @staticmethod
+    def polygon_to_cells(geom: 'QgsGeometry', resolution: int) -> Set[str]:
+        """
+        Returns the cells whose centroid is inside a singlepart WGS84 polygon geometry, holes included.
+        """
+        geoJsonDict = json.loads(geom.asJson())
+        return set(h3.polyfill(geoJsonDict, resolution, geo_json_conformant=True))
+
+    @staticmethod
+    def ring_to_cells(ring, resolution: int) -> Set[str]:
+        """
+        Returns the cells whose centroid is inside the polygon described by a WGS84 exterior ring.
+        """
+        geoJsonDict = {'type': 'Polygon', 'coordinates': [[(p.x(), p.y()) for p in ring]]}
+        return set(h3.polyfill(geoJsonDict, resolution, geo_json_conformant=True))
+
+    @staticmethod
+    def polygon_to_cells_experimental(geom: 'QgsGeometry', resolution: int, contain: str) -> Optional[Set[str]]:
+        """
+        Containment modes are not available in h3 v3, always returns None.
+        """
+        return None
+
+    @staticmethod
+    def cell_to_boundary(cell: str) -> Tuple[Tuple[float, float], ...]:
+        return h3.h3_to_geo_boundary(cell)
+
+    @staticmethod
+    def latlng_to_cell(lat: float, lng: float, resolution: int) -> str:
+        return h3.geo_to_h3(lat, lng, resolution)
+
+    @staticmethod
+    def cell_to_latlng(cell: str) -> Tuple[float, float]:
+        return h3.h3_to_geo(cell)
+
+    @staticmethod
+    def grid_disk(cell: str, k: int) -> Set[str]:
+        return set(h3.k_ring(cell, k))
+
+    @staticmethod
+    def grid_distance(start: str, end: str) -> Optional[int]:
+        """
+        Returns the grid distance between two cells,
+        or None if h3 can not compute it, e.g. across pentagon distortion.
+        """
+        try:
+            distance = h3.h3_distance(start, end)
+        except ValueError:
+            return None
+        # older v3 releases return -1 instead of raising
+        return distance if distance >= 0 else None
+
+    @staticmethod
+    def grid_path_cells(start: str, end: str) -> Optional[List[str]]:
+        """
+        Returns the cells of the grid path between two cells, both included,
+        or None if h3 can not compute it, e.g. across pentagon distortion.
+        """
+        try:
+            return h3.h3_line(start, end)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def cell_to_parent(cell: str, resolution: int) -> str:
+        return h3.h3_to_parent(cell, resolution)
+
+    @staticmethod
+    def cell_to_children(cell: str, resolution: int) -> List[str]:
+        return list(h3.h3_to_children(cell, resolution))
+
+    @staticmethod
+    def compact_cells_int(cells: array) -> array:
+        """
+        Returns the compacted set of a uint64 array of unique H3 indexes, as a uint64 array.
+        """
+        from h3.api import memview_int
+
+        return array('Q', memview_int.compact(memoryview(cells)))
+
+    @staticmethod
+    def is_valid_cell(cell: str) -> bool:
+        return h3.h3_is_valid(cell)
+
+    @staticmethod
+    def average_edge_length_km(resolution: int) -> float:
+        return h3.edge_length(resolution, unit='km')
+
+    @staticmethod
+    def average_area_km2(resolution: int) -> float:
+        return h3.hex_area(resolution, unit='km^2')
+
+    @staticmethod
+    def num_cells(resolution: int) -> int:
+        return h3.num_hexagons(resolution)
+
+    @staticmethod
+    def cell_to_int(cell: str) -> int:
+        return h3.string_to_h3(cell)
+
+    @staticmethod
+    def int_to_cell(value: int) -> str:
+        return h3.h3_to_string(value)
+
+    @staticmethod
+    def get_resolution(cell: str) -> int:
+        return h3.h3_get_resolution(cell)
+
+    @staticmethod
+    def versions() -> dict:
+        return h3.versions()
+
+
+def get_h3api():
+    """
+    Imports h3 on first call and returns the adapter matching its major version.
+    """
+    global h3, _h3api
+    if _h3api is None:
+        import h3
+
+        h3Version = get_h3_version()
+        if h3Version.startswith('4'):
+            _h3api = H3V4Adapter
+        elif h3Version.startswith('3'):
+            _h3api = H3V3Adapter
+        else:
+            raise RuntimeError(f'Unsupported H3 lib version: \'{h3Version}\'. Supported versions: v4.x or v3.x')
+    return _h3api
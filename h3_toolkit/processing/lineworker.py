@@ -0,0 +1,173 @@
+"""
+Line traversal on the H3 grid, shared by the processing engine and the worker processes of the parallel
+line indexing.
+
+Only imports the standard library and h3, to keep the start up of the worker processes cheap; as for
+`pointworker`, its parent packages do not import QGIS. Lines are passed around as flat (longitude, latitude) coordinate sequences; the worker side reads them from shared
+memory blocks written by `parallel.ParallelLineCounter`.
+"""
+import math
+from typing import Callable, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+# Line traversal methods
+LINE_DENSIFY = 0
+LINE_GRID_PATH = 1
+
+# Longest piece of a segment joined by a single grid path, in densify steps of half an edge length. Grid paths
+# are straight in the local coordinates of an icosahedron face, and drift from long lines, by up to 3 cells
+# over 2 degrees at resolution 9. Over 16 edge lengths they stay within a cell of the densified line.
+GRID_PATH_MAX_STEPS = 32
+
+
+def haversine_km(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """
+    Returns the great circle distance between two WGS84 coordinates in kilometers, on a spherical earth.
+    """
+    earthRadiusKm = 6371.0088
+    dLat = math.radians(lat2 - lat1)
+    dLng = math.radians(lng2 - lng1)
+    a = math.sin(dLat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dLng / 2) ** 2
+    return 2 * earthRadiusKm * math.asin(min(math.sqrt(a), 1.0))
+
+
+def segment_points(lng1: float, lat1: float, lng2: float, lat2: float, stepKm: float) -> Iterator[Tuple[float, float]]:
+    """
+    Yields the (longitude, latitude) of points at most `stepKm` apart along a segment, its end point excluded.
+    """
+    # segments crossing the antimeridian go the short way round
+    if lng2 - lng1 > 180:
+        lng2 -= 360
+    elif lng1 - lng2 > 180:
+        lng2 += 360
+    steps = max(math.ceil(haversine_km(lng1, lat1, lng2, lat2) / stepKm), 1)
+    for i in range(steps):
+        t = i / steps
+        lng = lng1 + t * (lng2 - lng1)
+        if lng > 180:
+            lng -= 360
+        elif lng < -180:
+            lng += 360
+        yield lng, lat1 + t * (lat2 - lat1)
+
+
+def densify_segment(
+        lng1: float,
+        lat1: float,
+        lng2: float,
+        lat2: float,
+        resolution: int,
+        stepKm: float,
+        latlng_to_cell: Callable,
+        cells: Set[str]):
+    """
+    Adds the cells of points at most `stepKm` apart along a segment to `cells`, its end point excluded.
+    """
+    for lng, lat in segment_points(lng1, lat1, lng2, lat2, stepKm):
+        cells.add(latlng_to_cell(lat, lng, resolution))
+
+
+def coordinates_to_cells(
+        coords: Sequence[float],
+        resolution: int,
+        traversal: int,
+        stepKm: float,
+        latlng_to_cell: Callable,
+        grid_path_cells: Callable[[str, str], Optional[list]],
+        cells: Set[str]):
+    """
+    Adds the cells along a WGS84 polyline, given as flat (longitude, latitude) coordinates, to `cells`.
+
+    LINE_DENSIFY indexes the vertices and points `stepKm` apart along each segment; cells only clipped at
+    a corner by the line may be missed. LINE_GRID_PATH splits the segments into pieces of at most
+    `GRID_PATH_MAX_STEPS` steps and joins the cells of consecutive piece ends with their grid path, a
+    connected line of cells, which is much cheaper for long segments. The path may run a cell beside the
+    densified line. Pieces whose grid path h3 can not compute (`grid_path_cells` returns None), e.g. across
+    pentagons, are densified instead.
+    """
+    pointCount = len(coords) // 2
+    if pointCount == 0:
+        return
+
+    if traversal == LINE_GRID_PATH:
+        pieceKm = GRID_PATH_MAX_STEPS * stepKm
+        previous = latlng_to_cell(coords[1], coords[0], resolution)
+        cells.add(previous)
+        for i in range(2, 2 * pointCount, 2):
+            points = list(segment_points(coords[i - 2], coords[i - 1], coords[i], coords[i + 1], pieceKm))
+            points.append((coords[i], coords[i + 1]))
+            for (lng1, lat1), (lng2, lat2) in zip(points, points[1:]):
+                cell = latlng_to_cell(lat2, lng2, resolution)
+                if cell != previous:
+                    path = grid_path_cells(previous, cell)
+                    if path is None:
+                        densify_segment(lng1, lat1, lng2, lat2, resolution, stepKm, latlng_to_cell, cells)
+                    else:
+                        cells.update(path)
+                cells.add(cell)
+                previous = cell
+        return
+
+    for i in range(0, 2 * pointCount - 2, 2):
+        densify_segment(coords[i], coords[i + 1], coords[i + 2], coords[i + 3], resolution, stepKm, latlng_to_cell, cells)
+    cells.add(latlng_to_cell(coords[-1], coords[-2], resolution))
+
+
+def h3_line_functions():
+    """
+    Returns the `latlng_to_cell` and `grid_path_cells` functions of the installed h3 version, the latter
+    returning None where h3 can not compute the grid path.
+    """
+    import h3
+
+    # h3 v4 and v3 API
+    if hasattr(h3, 'grid_path_cells'):
+        latlng_to_cell, path_cells, pathError = h3.latlng_to_cell, h3.grid_path_cells, h3.H3BaseException
+    else:
+        latlng_to_cell, path_cells, pathError = h3.geo_to_h3, h3.h3_line, ValueError
+
+    def grid_path_cells(start, end):
+        try:
+            return path_cells(start, end)
+        except pathError:
+            return None
+
+    return latlng_to_cell, grid_path_cells
+
+
+def count_shared_lines(
+        shmName: str,
+        pointCount: int,
+        partStarts: Sequence[int],
+        featureStarts: Sequence[int],
+        resolution: int,
+        traversal: int,
+        stepKm: float) -> Dict[str, int]:
+    """
+    Indexes the lines of a shared memory block on the H3 grid and returns the number of features per cell.
+
+    Parts start at the point indexes of `partStarts`, features at the part indexes of `featureStarts`.
+    A feature crossing a cell with several parts counts once.
+    """
+    from multiprocessing import shared_memory
+
+    latlng_to_cell, grid_path_cells = h3_line_functions()
+    partEnds = list(partStarts[1:]) + [pointCount]
+    featureEnds = list(featureStarts[1:]) + [len(partStarts)]
+
+    counts = dict()
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        coords = shm.buf.cast('d')
+        try:
+            for featureStart, featureEnd in zip(featureStarts, featureEnds):
+                cells = set()
+                for part in range(featureStart, featureEnd):
+                    partCoords = coords[2 * partStarts[part]:2 * partEnds[part]].tolist()
+                    coordinates_to_cells(partCoords, resolution, traversal, stepKm, latlng_to_cell, grid_path_cells, cells)
+                for cell in cells:
+                    counts[cell] = counts.get(cell, 0) + 1
+        finally:
+            coords.release()
+    finally:
+        shm.close()
+    return counts
@@ -0,0 +1,216 @@
+"""
+Parallel point and line indexing on a process pool.
+
+Indexing points with h3 is bound by the per-point Python call overhead and holds the GIL, so threads do not
+help. `ParallelPointCounter` buffers WGS84 coordinates into chunks, copies each chunk into a shared memory
+block and has worker processes (see `pointworker`) count the points per cell. Only the shared memory block
+name goes through the pipe to the workers; only the partial counts come back. `ParallelLineCounter` does
+the same for line vertices (see `lineworker`), with the offsets of the line parts and features.
+"""
+import os
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+from typing import Callable, Dict, Optional, Sequence
+
+from .lineworker import count_shared_lines
+from .pointworker import count_shared_coordinates
+
+# Points per task. Indexing a point takes about a microsecond, so a chunk keeps a worker busy for a few
+# hundred milliseconds, against a few milliseconds of task dispatch and result transfer: well below 5%.
+CHUNK_SIZE = 262144
+
+
+def python_executable() -> Optional[str]:
+    """
+    Returns the Python interpreter to start worker processes with, or None if it can not be found.
+
+    Inside QGIS, `sys.executable` may be the QGIS application itself (Windows, macOS), which must not be
+    started as a worker.
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for candidate in ('pythonw.exe', 'python.exe', os.path.join('bin', 'python3')):
+        path = os.path.join(sys.exec_prefix, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _merge_counts(counts: Dict[str, int], partialCounts: Dict[str, int]):
+    for idx, count in partialCounts.items():
+        counts[idx] = counts.get(idx, 0) + count
+
+
+class _ParallelCounter(ABC):
+    """
+    Base of the parallel counters: a process pool counting chunks of WGS84 coordinates per H3 cell, each chunk
+    passed in a shared memory block. Subclasses buffer the coordinates and submit full chunks with `_submit()`,
+    and submit the remainder in `_flush()`.
+
+    If a worker process dies, e.g. killed by the system, adding coordinates or `result()` raise
+    `BrokenProcessPool`; the counts are then incomplete.
+    """
+    # Interval between two checks of the cancel callback while waiting for the workers, in seconds
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, workers: int, counts: Dict[str, int] = None):
+        self.counts = dict() if counts is None else counts
+        self.workers = workers
+        self.maxPending = 2 * workers
+        self._pending = dict()
+
+        context = get_context('spawn')
+        executable = python_executable()
+        if executable is None:
+            raise RuntimeError('Python interpreter for worker processes not found')
+        context.set_executable(executable)
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _submit(self, coords: array, function, *args):
+        """
+        Copies the coordinates into a shared memory block and submits `function(shmName, *args)` to the pool.
+        """
+        while len(self._pending) >= self.maxPending:
+            self._collect(wait(self._pending, return_when=FIRST_COMPLETED).done)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(coords.itemsize * len(coords), 1))
+        shm.buf[:len(coords) * coords.itemsize] = coords.tobytes()
+        try:
+            future = self._executor.submit(function, shm.name, *args)
+        except (BrokenProcessPool, OSError) as e:
+            shm.close()
+            shm.unlink()
+            # a dead worker may also surface as a closed pipe while the pool replaces it
+            raise BrokenProcessPool(str(e)) from e
+        self._pending[future] = shm
+
+    def _collect(self, futures):
+        for future in futures:
+            shm = self._pending.pop(future)
+            try:
+                _merge_counts(self.counts, future.result())
+            finally:
+                shm.close()
+                shm.unlink()
+
+    @abstractmethod
+    def _flush(self):
+        """
+        Submits the buffered coordinates which do not fill a chunk.
+        """
+
+    def result(self, isCanceled: Callable[[], bool] = None) -> Dict[str, int]:
+        """
+        Waits for all chunks to be counted and returns the counts per cell.
+        If `isCanceled` returns True while waiting, returns the partial counts of the chunks done so far.
+        """
+        self._flush()
+        while self._pending:
+            self._collect(wait(self._pending, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED).done)
+            if isCanceled is not None and isCanceled():
+                break
+        return self.counts
+
+    def close(self):
+        """
+        Shuts the worker processes down and releases the shared memory of unfinished chunks.
+        """
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        for shm in self._pending.values():
+            shm.close()
+            shm.unlink()
+        self._pending = dict()
+
+
+class ParallelPointCounter(_ParallelCounter):
+    """
+    Counts WGS84 points per H3 cell on a pool of worker processes.
+
+    Add coordinates with `add()`, then call `result()` to get the counts per cell. At most two chunks per
+    worker are in flight at any time, which bounds the memory held in shared memory blocks.
+    Use as a context manager, or call `close()`, to shut the pool down and release the shared memory.
+    Closing before `result()` cancels the chunks not started yet and waits only for the running ones.
+    """
+
+    def __init__(self, workers: int, resolution: int, counts: Dict[str, int] = None):
+        super().__init__(workers, counts)
+        self.resolution = resolution
+        self._buffer = array('d')
+
+    def add(self, lngs: Sequence[float], lats: Sequence[float]):
+        """
+        Adds a batch of WGS84 coordinates, submitting full chunks to the workers.
+        """
+        for lng, lat in zip(lngs, lats):
+            self._buffer.append(lng)
+            self._buffer.append(lat)
+        while len(self._buffer) >= 2 * CHUNK_SIZE:
+            self._submitPoints(self._buffer[:2 * CHUNK_SIZE])
+            del self._buffer[:2 * CHUNK_SIZE]
+
+    def _submitPoints(self, coords: array):
+        self._submit(coords, count_shared_coordinates, len(coords) // 2, self.resolution)
+
+    def _flush(self):
+        if len(self._buffer) > 0:
+            self._submitPoints(self._buffer)
+            self._buffer = array('d')
+
+
+class ParallelLineCounter(_ParallelCounter):
+    """
+    Counts WGS84 line features per H3 cell they cross, on a pool of worker processes.
+
+    Add features with `addFeature()`, then call `result()` to get the number of features per cell. Features
+    are never split across chunks, so chunks hold at least `CHUNK_SIZE` vertices, or a single large feature.
+    See `lineworker.coordinates_to_cells` for the traversal methods and `stepKm`.
+    """
+
+    def __init__(self, workers: int, resolution: int, traversal: int, stepKm: float, counts: Dict[str, int] = None):
+        super().__init__(workers, counts)
+        self.resolution = resolution
+        self.traversal = traversal
+        self.stepKm = stepKm
+        self._resetBuffer()
+
+    def _resetBuffer(self):
+        self._buffer = array('d')
+        self._partStarts = array('q')
+        self._featureStarts = array('q')
+
+    def addFeature(self, parts: Sequence[Sequence[float]]):
+        """
+        Adds a line feature, given as the flat (longitude, latitude) coordinates of each of its parts.
+        """
+        self._featureStarts.append(len(self._partStarts))
+        for coords in parts:
+            self._partStarts.append(len(self._buffer) // 2)
+            self._buffer.extend(coords)
+        if len(self._buffer) >= 2 * CHUNK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if len(self._featureStarts) > 0:
+            self._submit(
+                self._buffer,
+                count_shared_lines,
+                len(self._buffer) // 2,
+                self._partStarts,
+                self._featureStarts,
+                self.resolution,
+                self.traversal,
+                self.stepKm
+            )
+            self._resetBuffer()
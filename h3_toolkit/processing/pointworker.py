@@ -0,0 +1,33 @@
+"""
+Worker side of the parallel point indexing, run in child processes.
+
+Only imports the standard library and h3, to keep the start up of the worker processes cheap. The
+`h3_toolkit` and `h3_toolkit.processing` packages do not import QGIS, so neither does unpickling the worker
+function in a child process. Coordinates are read from shared memory blocks written by `parallel.ParallelPointCounter`, as interleaved
+(longitude, latitude) doubles.
+"""
+from multiprocessing import shared_memory
+
+
+def count_shared_coordinates(shmName: str, pointCount: int, resolution: int) -> dict:
+    """
+    Indexes the points of a shared memory block on the H3 grid and returns the number of points per cell.
+    """
+    import h3
+
+    # h3 v4 and v3 API
+    latlng_to_cell = h3.latlng_to_cell if hasattr(h3, 'latlng_to_cell') else h3.geo_to_h3
+
+    counts = dict()
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        coords = shm.buf.cast('d')
+        try:
+            for i in range(0, 2 * pointCount, 2):
+                idx = latlng_to_cell(coords[i + 1], coords[i], resolution)
+                counts[idx] = counts.get(idx, 0) + 1
+        finally:
+            coords.release()
+    finally:
+        shm.close()
+    return counts
@@ -0,0 +1,133 @@
+"""
+Cache of polyfill results, for workflows polyfilling the same polygons at the same resolution repeatedly,
+e.g. parameter sweeps in the model builder.
+
+Results are keyed by a hash of the polygon's WKB, the resolution and the coverage mode, and stored as compact
+uint64 arrays of H3 indexes. The in-memory cache evicts the least recently used results beyond a total number
+of cells. Optionally, results are also stored in a directory on disk, to be reused across QGIS sessions.
+"""
+import hashlib
+import os
+from array import array
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
+
+from ..h3_dependency_guard import get_h3_version
+
+if TYPE_CHECKING:
+    from qgis.core import QgsGeometry
+
+# Maximum number of cells held in memory by each shared cache (8 bytes each)
+MAX_CACHED_CELLS = 4000000
+
+
+def polyfill_cache_key(geom: 'QgsGeometry', resolution: int, coverage: int) -> str:
+    """
+    Returns the cache key of the polyfill of a polygon at a resolution with a coverage mode.
+    The h3 version is part of the key, as polyfill results may change between versions.
+    """
+    digest = hashlib.sha1(bytes(geom.asWkb()))
+    digest.update(f'|{resolution}|{coverage}|{get_h3_version()}'.encode())
+    return digest.hexdigest()
+
+
+class PolyfillCache:
+    """
+    LRU cache of polyfill results as uint64 arrays, holding at most `maxCells` cells in memory,
+    and storing results in `cacheDir` too if given. Counts hits and misses for reporting.
+    """
+
+    def __init__(self, maxCells: int = MAX_CACHED_CELLS, cacheDir: str = None):
+        self.maxCells = maxCells
+        self.cacheDir = cacheDir
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._cellCount = 0
+        self._lock = Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cacheDir, f'{key}.h3cells')
+
+    def get(self, key: str) -> Optional[array]:
+        with self._lock:
+            cells = self._results.get(key)
+            if cells is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cells
+
+        if self.cacheDir is not None and os.path.isfile(self._path(key)):
+            cells = array('Q')
+            with open(self._path(key), 'rb') as f:
+                cells.frombytes(f.read())
+            self._remember(key, cells)
+            with self._lock:
+                self.hits += 1
+            return cells
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def accepts(self, cellCount: int) -> bool:
+        """
+        Returns whether a result of `cellCount` cells would be cached, in memory or on disk. Callers check
+        this before building the array of a result.
+        """
+        return cellCount <= self.maxCells or self.cacheDir is not None
+
+    def put(self, key: str, cells: array):
+        if not self.accepts(len(cells)):
+            return
+        self._remember(key, cells)
+        if self.cacheDir is not None:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            # write to a temporary file first, so concurrent readers never see a partial result
+            tempPath = f'{self._path(key)}.{os.getpid()}.tmp'
+            with open(tempPath, 'wb') as f:
+                cells.tofile(f)
+            os.replace(tempPath, self._path(key))
+
+    def _remember(self, key, cells):
+        # results larger than the whole cache are not kept in memory
+        if len(cells) > self.maxCells:
+            return
+        with self._lock:
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._cellCount -= len(previous)
+            self._results[key] = cells
+            self._cellCount += len(cells)
+            while self._cellCount > self.maxCells:
+                _, evicted = self._results.popitem(last=False)
+                self._cellCount -= len(evicted)
+
+    def resetStats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._cellCount = 0
+
+
+# Caches shared by all algorithm runs of the QGIS session, by cache directory (None: in memory only)
+_sharedCaches = dict()
+_sharedCachesLock = Lock()
+
+
+def get_polyfill_cache(cacheDir: str = None) -> PolyfillCache:
+    """
+    Returns the polyfill cache shared by the session, storing results on disk in `cacheDir` if given.
+    Each cache directory has its own cache, so concurrent runs with different directories do not interfere.
+    """
+    cacheDir = os.path.abspath(cacheDir) if cacheDir else None
+    with _sharedCachesLock:
+        cache = _sharedCaches.get(cacheDir)
+        if cache is None:
+            cache = _sharedCaches[cacheDir] = PolyfillCache(cacheDir=cacheDir)
+        return cache
@@ -0,0 +1,82 @@
+"""
+Cheap progress and throughput reporting for long running loops.
+"""
+import time
+from typing import Iterable, Iterator
+
+from qgis.core import QgsProcessingFeedback
+
+# Minimum interval between two progress updates, in seconds
+REPORT_INTERVAL = 0.5
+
+# Number of items between two checks of the clock and of the cancel button, when tracking an iterable
+TRACK_STEP = 1000
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+
+class ProgressReporter:
+    """
+    Reports the progress, throughput and estimated remaining time of a loop over `total` items to a feedback.
+
+    Call `advance()` after each chunk of items, or wrap an iterable with `track()`. The progress bar and text
+    are updated at most every `REPORT_INTERVAL` seconds, whatever the chunk size. Both return whether to
+    continue, i.e. False once the user canceled. `total` can be negative or 0 if unknown.
+    """
+
+    def __init__(self, feedback: QgsProcessingFeedback, total: int, unit: str = 'points'):
+        self.feedback = feedback
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.start = time.monotonic()
+        self.lastReport = self.start
+
+    def advance(self, count: int) -> bool:
+        self.done += count
+        now = time.monotonic()
+        if now - self.lastReport >= REPORT_INTERVAL:
+            self.lastReport = now
+            self._report()
+        return not self.feedback.isCanceled()
+
+    def track(self, iterable: Iterable, step: int = TRACK_STEP) -> Iterator:
+        """
+        Generator function. Yields the items of the iterable, advancing every `step` items.
+        Stops early if the user cancels.
+        """
+        pending = 0
+        for item in iterable:
+            yield item
+            pending += 1
+            if pending == step:
+                pending = 0
+                if not self.advance(step):
+                    return
+        self.advance(pending)
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def _report(self):
+        rate = self.rate()
+        text = f'{self.done:,} {self.unit}, {rate:,.0f} {self.unit}/s'
+        if self.total > 0:
+            self.feedback.setProgress(min(100.0 * self.done / self.total, 100.0))
+            if rate > 0:
+                text += f', ETA {format_duration(max(self.total - self.done, 0) / rate)}'
+        self.feedback.setProgressText(text)
+
+    def finish(self):
+        """
+        Logs the total number of items and the throughput.
+        """
+        elapsed = time.monotonic() - self.start
+        self.feedback.pushInfo(
+            f'{self.done:,} {self.unit} in {format_duration(elapsed)} ({self.rate():,.0f} {self.unit}/s).'
+        )
@@ -3,11 +3,6 @@ import os
 from qgis.core import QgsProcessingProvider
 from qgis.PyQt.QtGui import QIcon
 
-from .algorithms import (
-    CreateH3GridProcessingAlgorithm,
-    CreateH3GridInsidePolygonsProcessingAlgorithm,
-    CountPointsOnH3GridProcessingAlgorithm
-)
 
 class H3Provider(QgsProcessingProvider):
     def __init__(self, iconPath, *args, **kwargs):
@@ -15,9 +10,30 @@ class H3Provider(QgsProcessingProvider):
         self.iconPath = iconPath
 
     def loadAlgorithms(self, *args, **kwargs):
+        # QGIS loads the algorithms when the provider is registered, at plugin start up. The algorithm modules
+        # only import QGIS and light helpers there; h3, multiprocessing, numpy, pyarrow and the OGR Arrow reader
+        # are imported when an algorithm first runs.
+        from .algorithms import (
+            CreateH3GridProcessingAlgorithm,
+            CreateH3GridInsidePolygonsProcessingAlgorithm,
+            CreateH3GridAroundFeaturesProcessingAlgorithm,
+            CreateH3GridAlongLinesProcessingAlgorithm,
+            CountPointsOnH3GridProcessingAlgorithm,
+            AggregateOnH3GridProcessingAlgorithm,
+            EstimateH3GridProcessingAlgorithm,
+            SmoothOnH3GridProcessingAlgorithm,
+            AddH3IndexFieldProcessingAlgorithm
+        )
+
         self.addAlgorithm(CreateH3GridProcessingAlgorithm())
         self.addAlgorithm(CreateH3GridInsidePolygonsProcessingAlgorithm())
+        self.addAlgorithm(CreateH3GridAroundFeaturesProcessingAlgorithm())
+        self.addAlgorithm(CreateH3GridAlongLinesProcessingAlgorithm())
         self.addAlgorithm(CountPointsOnH3GridProcessingAlgorithm())
+        self.addAlgorithm(AggregateOnH3GridProcessingAlgorithm())
+        self.addAlgorithm(EstimateH3GridProcessingAlgorithm())
+        self.addAlgorithm(SmoothOnH3GridProcessingAlgorithm())
+        self.addAlgorithm(AddH3IndexFieldProcessingAlgorithm())
 
     def id(self, *args, **kwargs):
         return 'h3'
@@ -0,0 +1,158 @@
+"""
+Columnar ingestion of point coordinates from file based layers.
+
+For layers read by the OGR provider (GeoPackage, GeoParquet, FlatGeobuf, ...), point coordinates are read in
+large record batches through OGR's ArrowStream interface into NumPy arrays, instead of iterating QgsFeature
+objects in Python. Requires GDAL >= 3.6 with NumPy support. Callers fall back to QGIS's feature iterator when
+`ogr_point_source()` returns None.
+"""
+from importlib.util import find_spec
+from typing import Iterator, Optional, Tuple
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsProcessingFeatureSourceDefinition,
+    QgsProviderRegistry,
+    QgsVectorLayer,
+)
+
+# Maximum number of features per record batch
+ARROW_BATCH_SIZE = 262144
+
+# Little endian 2D point WKB: byte order (1), geometry type (1), x, y
+POINT_WKB_SIZE = 21
+
+
+def ogr_point_source(parameters, inputName: str, layer: QgsVectorLayer) -> Optional[Tuple[str, str, Optional[int]]]:
+    """
+    Returns the (path, layer name, layer index) of the OGR dataset behind an input point layer, if its features
+    can be read directly with `read_point_coordinates()`. The layer name is empty and the index None when the
+    URI does not give them. Returns None if the features can not be read directly, e.g. for non-OGR layers,
+    filtered layers, layers with unsaved edits, selected-features-only inputs or missing GDAL / NumPy support.
+    """
+    if layer is None or layer.providerType() != 'ogr' or layer.subsetString():
+        return None
+    # the file on disk does not hold the edits of the edit buffer
+    if layer.isEditable() or layer.isModified():
+        return None
+
+    definition = parameters.get(inputName)
+    if isinstance(definition, QgsProcessingFeatureSourceDefinition):
+        if definition.selectedFeaturesOnly or definition.featureLimit != -1:
+            return None
+        if getattr(definition, 'filterExpression', ''):
+            return None
+
+    if find_spec('numpy') is None:
+        return None
+    try:
+        from osgeo import ogr
+    except ImportError:
+        return None
+    if not hasattr(ogr.Layer, 'GetArrowStreamAsNumPy'):
+        return None
+
+    uriParts = QgsProviderRegistry.instance().decodeUri('ogr', layer.source())
+    if uriParts.get('subset') or not uriParts.get('path'):
+        return None
+    layerId = uriParts.get('layerId')
+    return uriParts['path'], uriParts.get('layerName') or '', int(layerId) if layerId is not None else None
+
+
+def _decode_points(wkbs):
+    """
+    Returns the x and y coordinates of a batch of point WKB geometries, as NumPy arrays.
+    """
+    import numpy as np
+    from osgeo import ogr
+
+    wkbs = [wkb for wkb in wkbs if wkb is not None]
+    if not wkbs:
+        return np.empty(0), np.empty(0)
+
+    # Fast path: all geometries are little endian 2D points, decode them in one go without per-feature objects
+    if all(len(wkb) == POINT_WKB_SIZE for wkb in wkbs):
+        records = np.frombuffer(
+            b''.join(wkbs),
+            dtype=np.dtype([('byteOrder', 'u1'), ('type', '<u4'), ('x', '<f8'), ('y', '<f8')])
+        )
+        if np.all(records['byteOrder'] == 1) and np.all(records['type'] == 1):
+            return records['x'], records['y']
+
+    # Any other point flavour (big endian, Z/M, multipoint): decode through OGR
+    xs = []
+    ys = []
+    for wkb in wkbs:
+        geom = ogr.CreateGeometryFromWkb(bytes(wkb))
+        for x, y, *_ in geom.GetPoints() or []:
+            xs.append(x)
+            ys.append(y)
+        for i in range(geom.GetGeometryCount()):
+            x, y, *_ = geom.GetGeometryRef(i).GetPoint()
+            xs.append(x)
+            ys.append(y)
+    return np.asarray(xs), np.asarray(ys)
+
+
+def read_point_coordinates(
+        path: str,
+        layerName: str,
+        layerId: Optional[int],
+        sourceCrs: QgsCoordinateReferenceSystem) -> Iterator[Tuple[list, list]]:
+    """
+    Yields batches of WGS84 (longitudes, latitudes) of the points of an OGR layer, given by name, else by index,
+    else the first layer, like the OGR provider does.
+
+    Only the geometry column is read; all attribute columns are ignored.
+    Points not in WGS84 are transformed per batch with OGR.
+    Raises RuntimeError if the layer can not be read in batches, for callers to fall back to QGIS's feature
+    iterator.
+    """
+    import numpy as np
+    from osgeo import ogr, osr
+
+    dataSource = ogr.Open(path)
+    if dataSource is None:
+        raise RuntimeError(f'Could not open {path}')
+    if layerName:
+        layer = dataSource.GetLayerByName(layerName)
+    else:
+        layer = dataSource.GetLayer(layerId if layerId is not None else 0)
+    if layer is None:
+        raise RuntimeError(f'Could not open layer {layerName or layerId} of {path}')
+
+    layerDefn = layer.GetLayerDefn()
+    layer.SetIgnoredFields([layerDefn.GetFieldDefn(i).GetName() for i in range(layerDefn.GetFieldCount())])
+    geometryColumn = layer.GetGeometryColumn() or 'wkb_geometry'
+
+    transform = None
+    wgs84 = QgsCoordinateReferenceSystem('EPSG:4326')
+    if sourceCrs.isValid() and sourceCrs != wgs84:
+        sourceSrs = osr.SpatialReference()
+        sourceSrs.ImportFromWkt(sourceCrs.toWkt())
+        sourceSrs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        targetSrs = osr.SpatialReference()
+        targetSrs.ImportFromEPSG(4326)
+        targetSrs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        transform = osr.CoordinateTransformation(sourceSrs, targetSrs)
+
+    stream = layer.GetArrowStreamAsNumPy(options=[
+        'INCLUDE_FID=NO',
+        'GEOMETRY_ENCODING=WKB',
+        f'MAX_FEATURES_IN_BATCH={ARROW_BATCH_SIZE}',
+    ])
+    if stream is None:
+        raise RuntimeError(f'Could not read layer {layer.GetName()} of {path} as ArrowStream')
+    for batch in stream:
+        if geometryColumn not in batch:
+            raise RuntimeError(f'Geometry column {geometryColumn} not found in layer {layer.GetName()} of {path}')
+        try:
+            xs, ys = _decode_points(batch[geometryColumn])
+        except (TypeError, ValueError) as e:
+            raise RuntimeError(f'Could not decode the points of layer {layer.GetName()} of {path}: {e}') from e
+        if len(xs) == 0:
+            continue
+        if transform is not None:
+            transformed = np.asarray(transform.TransformPoints(np.column_stack((xs, ys))))
+            xs, ys = transformed[:, 0], transformed[:, 1]
+        yield xs.tolist(), ys.tolist()
@@ -0,0 +1,157 @@
+"""
+Mergeable sketches with bounded memory, for aggregating categorical attributes per H3 cell.
+
+`HyperLogLog` estimates the number of distinct values, `SpaceSaving` the most frequent values. Both can be
+merged, so partial sketches built over chunks of the input, or in separate processes, combine into the
+sketch of the whole input. Values are hashed with a fixed hash function, not Python's `hash()`, which is
+randomized per process.
+"""
+import hashlib
+import math
+from array import array
+from typing import Hashable, List, Optional, Tuple
+
+# Precision of the distinct counts: 2^10 registers of one byte, ~3.2% standard error
+HLL_PRECISION = 10
+
+# Below this many distinct hashes, HyperLogLog sketches keep the exact hashes instead of registers
+HLL_SPARSE_SIZE = 32
+
+
+def hash64(value) -> int:
+    """
+    Returns a 64 bit hash of a value, stable across processes and sessions.
+    """
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct count sketch.
+
+    Starts sparse, holding up to `HLL_SPARSE_SIZE` exact 64 bit hashes, which gives exact counts for cells with
+    few distinct values. Beyond that, switches to 2^precision one byte registers.
+    """
+    __slots__ = ('precision', 'sparse', 'registers')
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.sparse = array('Q')
+        self.registers = None
+
+    def add(self, value):
+        self.addHash(hash64(value))
+
+    def addHash(self, h: int):
+        if self.registers is None:
+            if h in self.sparse:
+                return
+            self.sparse.append(h)
+            if len(self.sparse) > HLL_SPARSE_SIZE:
+                self._densify()
+            return
+        self._addRegister(h)
+
+    def _addRegister(self, h):
+        valueBits = 64 - self.precision
+        index = h >> valueBits
+        # rank: position of the first 1 bit in the remaining bits
+        rank = valueBits - (h & ((1 << valueBits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def _densify(self):
+        self.registers = bytearray(1 << self.precision)
+        for h in self.sparse:
+            self._addRegister(h)
+        self.sparse = None
+
+    def merge(self, other: 'HyperLogLog'):
+        """
+        Adds the values of another sketch of the same precision to this one.
+        """
+        if other.registers is None:
+            for h in other.sparse:
+                self.addHash(h)
+            return
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """
+        Returns the estimated number of distinct values added.
+        """
+        if self.registers is None:
+            return len(self.sparse)
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # small range correction: linear counting
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """
+    Space-Saving sketch of the most frequent values, tracking at most `capacity` values.
+
+    Counts of the tracked values are upper bounds, overestimating by at most the count of the least frequent
+    tracked value. With a capacity of a few times the number of values of interest, the top values and their
+    order are exact for skewed distributions.
+    """
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = dict()
+
+    def add(self, value: Hashable, count: int = 1):
+        counts = self.counts
+        if value in counts:
+            counts[value] += count
+        elif len(counts) < self.capacity:
+            counts[value] = count
+        else:
+            # replace the least frequent value, inheriting its count as error
+            minValue = min(counts, key=counts.get)
+            minCount = counts.pop(minValue)
+            counts[value] = minCount + count
+
+    def merge(self, other: 'SpaceSaving'):
+        """
+        Adds the values of another sketch to this one, keeping the `capacity` most frequent values.
+        """
+        # values missing from a full sketch may have occurred up to its minimum count
+        selfMin = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        otherMin = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+
+        merged = dict()
+        for value in self.counts.keys() | other.counts.keys():
+            merged[value] = self.counts.get(value, selfMin) + other.counts.get(value, otherMin)
+        self.counts = dict(sorted(merged.items(), key=lambda item: item[1], reverse=True)[:self.capacity])
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        """
+        Returns the n most frequent values with their counts, most frequent first.
+        """
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def top_attributes(sketch: Optional[SpaceSaving], n: int) -> list:
+    """
+    Returns the n most frequent values of a sketch as flat (value as string, count) attribute values, most
+    frequent first. Ranks without value, and all ranks without sketch, are None rather than NULL, which the
+    FlatGeobuf and GeoParquet writers do not take.
+    """
+    top = sketch.top(n) if sketch is not None else []
+    values = []
+    for rank in range(n):
+        if rank < len(top):
+            values.extend([str(top[rank][0]), top[rank][1]])
+        else:
+            values.extend([None, None])
+    return values
@@ -0,0 +1,170 @@
+"""
+Background grid creation.
+
+`CreateGridTask` creates the H3 grid inside the polygons of a layer in a QgsTask, without blocking the
+QGIS interface. The polygons are cut into tiles of a bounded number of cells; the cells of each completed
+tile are added right away to an in-progress memory layer, so partial results show on the map canvas.
+"""
+import math
+import time
+from typing import Iterator, List
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import (
+    Qgis,
+    QgsCoordinateReferenceSystem,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsGeometry,
+    QgsMessageLog,
+    QgsProject,
+    QgsRectangle,
+    QgsTask,
+    QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
+    QgsWkbTypes,
+)
+
+from .engine import COVERAGE_CENTER, cell_to_geometry, polygon_to_cells_coverage
+from .h3_adapter import get_h3api
+from .utilities import yield_small_singleparts
+
+# Approximate number of cells per tile
+TILE_CELLS = 10000
+
+
+def tile_rectangles(rect: QgsRectangle, resolution: int) -> List[QgsRectangle]:
+    """
+    Returns the tiles covering a WGS84 rectangle, each holding about `TILE_CELLS` cells at the resolution.
+    """
+    tileSize = math.sqrt(TILE_CELLS * get_h3api().average_area_km2(resolution)) / 111.32
+    columns = max(math.ceil(rect.width() / tileSize), 1)
+    rows = max(math.ceil(rect.height() / tileSize), 1)
+    tileWidth = rect.width() / columns
+    tileHeight = rect.height() / rows
+    return [
+        QgsRectangle(
+            rect.xMinimum() + column * tileWidth,
+            rect.yMinimum() + row * tileHeight,
+            rect.xMinimum() + (column + 1) * tileWidth,
+            rect.yMinimum() + (row + 1) * tileHeight,
+        )
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def polygon_parts(geom: QgsGeometry) -> Iterator[QgsGeometry]:
+    """
+    Yields the singlepart polygons of a geometry, e.g. of the result of an intersection.
+    """
+    if geom.isEmpty():
+        return
+    parts = geom.asGeometryCollection() if geom.isMultipart() or geom.wkbType() == QgsWkbTypes.GeometryCollection else [geom]
+    for part in parts:
+        if part.type() == QgsWkbTypes.PolygonGeometry and not part.isEmpty():
+            yield part
+
+
+class CreateGridTask(QgsTask):
+    """
+    Task creating the H3 grid inside the polygons of a layer, streaming the cells to an output memory layer.
+
+    Cells are generated tile by tile in the task's thread. Each tile's cells are sent to the main thread with
+    the `cellsReady` signal, where they are added to the output layer. Cells are considered to be inside a
+    polygon if their centroid is, like in the 'Create H3 grid inside polygons' algorithm.
+    """
+    cellsReady = pyqtSignal(list)
+
+    def __init__(self, sourceLayer: QgsVectorLayer, outputLayer: QgsVectorLayer, resolution: int, messageBar=None):
+        super().__init__(f'Creating H3 grid (resolution {resolution})', QgsTask.CanCancel)
+        # Feature sources can be read safely from the task's thread, unlike the layer itself
+        self.source = QgsVectorLayerFeatureSource(sourceLayer)
+        self.featureRequest = QgsFeatureRequest().setDestinationCrs(
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsProject.instance().transformContext()
+        ).setSubsetOfAttributes([])
+        self.outputLayerId = outputLayer.id()
+        self.outputLayerName = outputLayer.name()
+        self.fields = outputLayer.fields()
+        self.resolution = resolution
+        self.messageBar = messageBar
+        self.cellCount = 0
+        self.elapsed = 0.0
+        self.exception = None
+
+        self.cellsReady.connect(self.addCells)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            geometries = list(yield_small_singleparts(self.source.getFeatures(self.featureRequest)))
+            tiles = [(geom, tile) for geom in geometries for tile in tile_rectangles(geom.boundingBox(), self.resolution)]
+
+            seen = set()
+            for i, (geom, tile) in enumerate(tiles):
+                # Stop if the task has been canceled
+                if self.isCanceled():
+                    return False
+
+                tileGeom = QgsGeometry.fromRect(tile)
+                if not geom.intersects(tileGeom):
+                    continue
+
+                cells = set()
+                for part in polygon_parts(geom.intersection(tileGeom)):
+                    cells.update(polygon_to_cells_coverage(part, self.resolution, COVERAGE_CENTER))
+                cells -= seen
+                seen.update(cells)
+
+                if cells:
+                    features = []
+                    for cell in cells:
+                        feature = QgsFeature(self.fields)
+                        feature.setGeometry(cell_to_geometry(cell))
+                        feature.setAttributes([cell])
+                        features.append(feature)
+                    self.cellsReady.emit(features)
+                    self.cellCount += len(features)
+
+                self.setProgress(100.0 * (i + 1) / len(tiles))
+        except Exception as e:
+            self.exception = e
+            return False
+        finally:
+            self.elapsed = time.perf_counter() - start
+        return True
+
+    def addCells(self, features: List[QgsFeature]):
+        """
+        Adds the cells of a completed tile to the output layer. Runs in the main thread.
+        """
+        layer = QgsProject.instance().mapLayer(self.outputLayerId)
+        if layer is None:
+            # output layer removed by the user, nothing left to create the grid for
+            self.cancel()
+            return
+        layer.dataProvider().addFeatures(features)
+        layer.updateExtents()
+        layer.triggerRepaint()
+
+    def throughput(self) -> str:
+        cellsPerSecond = self.cellCount / self.elapsed if self.elapsed > 0 else 0
+        return f'{self.cellCount:,} cells in {self.elapsed:,.1f} s ({cellsPerSecond:,.0f} cells/s)'
+
+    def finished(self, result):
+        layer = QgsProject.instance().mapLayer(self.outputLayerId)
+        if result:
+            message, level = f'H3 grid created: {self.throughput()}.', Qgis.Success
+            if layer is not None:
+                layer.setName(self.outputLayerName.replace(' (in progress)', ''))
+        elif self.exception is not None:
+            message, level = f'H3 grid creation failed: {self.exception}', Qgis.Critical
+        else:
+            message, level = f'H3 grid creation canceled: {self.throughput()}.', Qgis.Warning
+            if layer is not None:
+                layer.setName(self.outputLayerName.replace(' (in progress)', ' (canceled)'))
+
+        QgsMessageLog.logMessage(message, 'H3 Toolkit', level)
+        if self.messageBar is not None:
+            self.messageBar.pushMessage('H3 Toolkit', message, level=level, duration=10)
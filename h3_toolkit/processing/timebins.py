@@ -0,0 +1,33 @@
+"""
+Packing of (H3 cell, time bin) pairs into single integer keys, for counting points per grid cell and time bin.
+
+The key holds the uint64 H3 index in its high bits and the time bin number, offset to be non-negative, in its
+low `TIME_BIN_BITS` bits. One int per key keeps the counts compact, compared to a tuple per key.
+"""
+from typing import Tuple
+
+# Bits of the time bin number in the packed keys
+TIME_BIN_BITS = 40
+TIME_BIN_OFFSET = 1 << (TIME_BIN_BITS - 1)
+
+# Range of time bin numbers which can be packed, bins before and after the epoch
+MIN_TIME_BIN = -TIME_BIN_OFFSET
+MAX_TIME_BIN = TIME_BIN_OFFSET - 1
+
+
+def pack_cell_time_bin(cellInt: int, timeBin: int) -> int:
+    """
+    Returns the key of a uint64 H3 index and a time bin number.
+    Raises ValueError for time bins out of the `MIN_TIME_BIN` to `MAX_TIME_BIN` range, which would overflow
+    into the bits of the H3 index.
+    """
+    if not MIN_TIME_BIN <= timeBin <= MAX_TIME_BIN:
+        raise ValueError(f'Time bin {timeBin} out of the range {MIN_TIME_BIN} to {MAX_TIME_BIN}')
+    return (cellInt << TIME_BIN_BITS) | (timeBin + TIME_BIN_OFFSET)
+
+
+def unpack_cell_time_bin(key: int) -> Tuple[int, int]:
+    """
+    Returns the uint64 H3 index and the time bin number of a key of `pack_cell_time_bin`.
+    """
+    return key >> TIME_BIN_BITS, (key & ((1 << TIME_BIN_BITS) - 1)) - TIME_BIN_OFFSET
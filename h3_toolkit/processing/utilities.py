@@ -5,7 +5,8 @@ from qgis.core import (
     QgsPointXY,
     QgsFeatureIterator
 )
-import h3
+
+from .h3_adapter import get_h3api
 
 
 def yield_small_singleparts(feature_iterator: QgsFeatureIterator) -> Iterator[QgsGeometry]:
@@ -47,4 +48,4 @@ def yield_singleparts(feature_iterator: QgsFeatureIterator) -> Iterator[QgsGeome
 
 
 def getVersionH3Bindings():
-    return h3.versions()
+    return get_h3api().versions()
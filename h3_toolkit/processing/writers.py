@@ -0,0 +1,381 @@
+"""
+Direct-to-file writers for H3 cells.
+
+When the output of an algorithm is a FlatGeobuf or GeoParquet file, cells are written straight through
+GDAL/OGR, bypassing the construction of a QgsFeature per cell. Polygon WKB is packed directly from the
+cell boundary coordinates. If GDAL supports the Arrow batch API (GDAL >= 3.8) and pyarrow is installed,
+whole batches of cells are written as columnar record batches, otherwise through OGR features in
+transactions.
+
+Building the WKB is bound by h3's `cell_to_boundary`: with h3 4.5, about 270k boundaries and 220k WKB
+polygons per second on one core. Attribute values are converted to the Python types OGR and pyarrow accept,
+see `_value_converter`.
+"""
+import os
+import struct
+from datetime import date, datetime, time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from qgis.PyQt.QtCore import QDate, QDateTime, QTime, QVariant
+from qgis.core import (
+    NULL,
+    QgsCoordinateReferenceSystem,
+    QgsFields,
+    QgsProcessingAlgorithm,
+    QgsProcessingContext,
+    QgsProcessingException,
+    QgsProcessingFeedback,
+    QgsProcessingOutputLayerDefinition,
+    QgsWkbTypes,
+)
+
+from .engine import cell_rows, write_rows
+from .h3_adapter import get_h3api
+
+# Output file extensions written directly, with their OGR driver
+FAST_WRITER_DRIVERS = {
+    '.fgb': 'FlatGeobuf',
+    '.parquet': 'Parquet',
+}
+
+# Number of cells written per batch / transaction
+BATCH_SIZE = 65536
+
+
+def fast_writer_driver(destination: str) -> Optional[str]:
+    """
+    Returns the name of the OGR driver to write the destination with directly,
+    or None if the destination is not a FlatGeobuf / GeoParquet file or the driver is not available.
+    """
+    if not destination:
+        return None
+    driverName = FAST_WRITER_DRIVERS.get(os.path.splitext(destination)[1].lower())
+    if driverName is None:
+        return None
+    try:
+        from osgeo import ogr
+    except ImportError:
+        return None
+    return driverName if ogr.GetDriverByName(driverName) is not None else None
+
+
+# Packers of the coordinates of closed cell boundaries, by number of points
+_coordinateStructs = dict()
+
+
+def cell_to_wkb(cell: str, cell_to_boundary=None) -> bytes:
+    """
+    Returns the boundary of an H3 cell as little endian WKB polygon.
+    """
+    if cell_to_boundary is None:
+        cell_to_boundary = get_h3api().cell_to_boundary
+    coords = cell_to_boundary(cell)
+    pointCount = len(coords) + 1
+    packer = _coordinateStructs.get(pointCount)
+    if packer is None:
+        # byte order, geometry type (polygon), number of rings, number of points, coordinates
+        packer = _coordinateStructs[pointCount] = struct.Struct(f'<BIII{2 * pointCount}d')
+    xy = []
+    for lat, lon in coords:
+        xy.append(lon)
+        xy.append(lat)
+    # close the ring
+    xy.append(coords[0][1])
+    xy.append(coords[0][0])
+    return packer.pack(1, 3, 1, pointCount, *xy)
+
+
+def _is_null(value) -> bool:
+    return value is None or value == NULL
+
+
+def python_value(value):
+    """
+    Returns an attribute value as a value OGR and pyarrow accept: NULL as None,
+    Qt date and time types as Python ones, other values as is.
+    """
+    if _is_null(value):
+        return None
+    if isinstance(value, QDateTime):
+        return value.toPyDateTime() if value.isValid() else None
+    if isinstance(value, QDate):
+        return value.toPyDate() if value.isValid() else None
+    if isinstance(value, QTime):
+        return value.toPyTime() if value.isValid() else None
+    return value
+
+
+def _value_converter(field) -> Callable:
+    """
+    Returns the function converting the attribute values of a field for OGR and pyarrow, see `python_value`.
+    Values of string fields are converted to strings, e.g. category values of any type.
+    """
+    if field.type() == QVariant.String:
+        return lambda value: None if _is_null(value) else str(value)
+    if field.type() == QVariant.Bool:
+        return lambda value: None if _is_null(value) else bool(value)
+    return python_value
+
+
+def _ogr_field_defn(field):
+    from osgeo import ogr
+
+    fieldType = field.type()
+    if fieldType == QVariant.Double:
+        return ogr.FieldDefn(field.name(), ogr.OFTReal)
+    if fieldType in (QVariant.Int, QVariant.UInt):
+        return ogr.FieldDefn(field.name(), ogr.OFTInteger)
+    if fieldType in (QVariant.LongLong, QVariant.ULongLong):
+        return ogr.FieldDefn(field.name(), ogr.OFTInteger64)
+    if fieldType == QVariant.Bool:
+        fieldDefn = ogr.FieldDefn(field.name(), ogr.OFTInteger)
+        fieldDefn.SetSubType(ogr.OFSTBoolean)
+        return fieldDefn
+    if fieldType == QVariant.DateTime:
+        return ogr.FieldDefn(field.name(), ogr.OFTDateTime)
+    if fieldType == QVariant.Date:
+        return ogr.FieldDefn(field.name(), ogr.OFTDate)
+    if fieldType == QVariant.Time:
+        return ogr.FieldDefn(field.name(), ogr.OFTTime)
+    return ogr.FieldDefn(field.name(), ogr.OFTString)
+
+
+def _arrow_field_type(field):
+    import pyarrow
+
+    fieldType = field.type()
+    if fieldType == QVariant.Double:
+        return pyarrow.float64()
+    if fieldType in (QVariant.Int, QVariant.UInt):
+        return pyarrow.int32()
+    if fieldType in (QVariant.LongLong, QVariant.ULongLong):
+        return pyarrow.int64()
+    if fieldType == QVariant.Bool:
+        return pyarrow.bool_()
+    if fieldType == QVariant.DateTime:
+        return pyarrow.timestamp('ms')
+    if fieldType == QVariant.Date:
+        return pyarrow.date32()
+    if fieldType == QVariant.Time:
+        return pyarrow.time32('ms')
+    return pyarrow.string()
+
+
+def _set_ogr_field(feature, i: int, value):
+    """
+    Sets a field of an OGR feature to a value converted by `_value_converter`.
+    """
+    if value is None:
+        feature.SetFieldNull(i)
+    elif isinstance(value, datetime):
+        # UTC timestamps, time zone flag 100
+        feature.SetField(i, value.year, value.month, value.day, value.hour, value.minute, value.second, 100)
+    elif isinstance(value, date):
+        feature.SetField(i, value.year, value.month, value.day, 0, 0, 0, 0)
+    elif isinstance(value, time):
+        feature.SetField(i, 0, 0, 0, value.hour, value.minute, value.second, 0)
+    elif isinstance(value, bool):
+        feature.SetField(i, int(value))
+    else:
+        feature.SetField(i, value)
+
+
+def _batches(cells, batchSize):
+    batch = []
+    for cell in cells:
+        batch.append(cell)
+        if len(batch) >= batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _create_file_layer(destination: str, driverName: str, fields: QgsFields):
+    """
+    Creates a new file with the given OGR driver, replacing any existing one, holding a WGS84 polygon layer
+    with the fields. Returns the OGR data source and layer; the file is written when the data source is released.
+    """
+    from osgeo import ogr, osr
+
+    driver = ogr.GetDriverByName(driverName)
+    if os.path.exists(destination):
+        driver.DeleteDataSource(destination)
+    dataSource = driver.CreateDataSource(destination)
+    if dataSource is None:
+        raise QgsProcessingException(f'Could not create {destination}')
+
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    layer = dataSource.CreateLayer(os.path.splitext(os.path.basename(destination))[0], srs, ogr.wkbPolygon)
+    for field in fields:
+        layer.CreateField(_ogr_field_defn(field))
+    return dataSource, layer
+
+
+def write_cells_to_file(
+        destination: str,
+        driverName: str,
+        fields: QgsFields,
+        cells: Iterable[str],
+        cellCount: int,
+        feedback: QgsProcessingFeedback,
+        attributes: Dict[str, list] = None) -> bool:
+    """
+    Writes the cells to a new file with the given OGR driver, as WGS84 polygons.
+
+    The first field of `fields` receives the H3 index. If `attributes` is given, it maps each cell to the
+    values of the remaining fields. Reports progress based on `cellCount`.
+    Returns False if the user canceled, True otherwise.
+    """
+    return write_rows_to_file(destination, driverName, fields, cell_rows(cells, attributes), cellCount, feedback)
+
+
+def write_rows_to_file(
+        destination: str,
+        driverName: str,
+        fields: QgsFields,
+        rows: Iterable[Tuple[str, list]],
+        rowCount: int,
+        feedback: QgsProcessingFeedback) -> bool:
+    """
+    Like `write_cells_to_file`, for (cell, attribute values) rows, where a cell may appear in several rows.
+    """
+    from osgeo import ogr
+
+    dataSource, layer = _create_file_layer(destination, driverName, fields)
+    converters = [_value_converter(fields.at(i)) for i in range(1, fields.count())]
+
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+    useArrow = pyarrow is not None and hasattr(layer, 'WritePyArrow')
+
+    cell_to_boundary = get_h3api().cell_to_boundary
+    progressPerHex = 100.0 / rowCount if rowCount > 0 else 0
+    written = 0
+    completed = True
+
+    for batch in _batches(rows, BATCH_SIZE):
+        wkbs = [cell_to_wkb(cell, cell_to_boundary) for cell, _ in batch]
+
+        if useArrow:
+            columns = [pyarrow.array([cell for cell, _ in batch], type=pyarrow.string())]
+            for i, convert in enumerate(converters):
+                columns.append(pyarrow.array([convert(values[i]) for _, values in batch], type=_arrow_field_type(fields.at(i + 1))))
+            columns.append(pyarrow.array(wkbs, type=pyarrow.binary()))
+            schema = pyarrow.schema(
+                [pyarrow.field(field.name(), _arrow_field_type(field)) for field in fields]
+                + [pyarrow.field('geometry', pyarrow.binary(), metadata={b'ARROW:extension:name': b'ogc.wkb'})]
+            )
+            layer.WritePyArrow(pyarrow.RecordBatch.from_arrays(columns, schema=schema))
+        else:
+            layerDefn = layer.GetLayerDefn()
+            layer.StartTransaction()
+            for (cell, values), wkb in zip(batch, wkbs):
+                feature = ogr.Feature(layerDefn)
+                feature.SetField(0, cell)
+                for i, (convert, value) in enumerate(zip(converters, values), start=1):
+                    _set_ogr_field(feature, i, convert(value))
+                feature.SetGeometryDirectly(ogr.CreateGeometryFromWkb(wkb))
+                layer.CreateFeature(feature)
+            layer.CommitTransaction()
+
+        written += len(batch)
+        feedback.setProgress(int(written * progressPerHex))
+
+        # Stop if cancel button has been clicked
+        if feedback.isCanceled():
+            completed = False
+            break
+
+    # closing the data source flushes it to disk
+    del layer, dataSource
+    return completed
+
+
+def add_output_to_load_on_completion(parameters, outputName: str, destination: str, context: QgsProcessingContext):
+    """
+    Registers a directly written output file to be loaded as a layer when the algorithm completes,
+    like the processing framework does for feature sinks.
+    """
+    definition = parameters.get(outputName)
+    if isinstance(definition, QgsProcessingOutputLayerDefinition) and definition.destinationProject is not None:
+        layerName = definition.destinationName or os.path.splitext(os.path.basename(destination))[0]
+        details = QgsProcessingContext.LayerDetails(layerName, definition.destinationProject, outputName)
+        context.addLayerToLoadOnCompletion(destination, details)
+
+
+def remove_output_to_load_on_completion(destination: str, context: QgsProcessingContext):
+    """
+    Unregisters an output file registered with `add_output_to_load_on_completion`.
+    """
+    layers = context.layersToLoadOnCompletion()
+    if destination in layers:
+        del layers[destination]
+        context.setLayersToLoadOnCompletion(layers)
+
+
+class CellOutput:
+    """
+    Output of H3 cell polygons for an algorithm's feature sink parameter.
+
+    Writes FlatGeobuf and GeoParquet destinations directly with `write_cells_to_file`,
+    any other destination through a regular feature sink.
+
+    Like a feature sink, a direct output file is created empty with its fields on construction and loaded on
+    completion, so algorithms stopping before writing any cell still return an existing layer. A file whose
+    writing was canceled is left partial and not loaded.
+    """
+
+    def __init__(self, algorithm: QgsProcessingAlgorithm, parameters, outputName: str, context: QgsProcessingContext, fields: QgsFields):
+        self.parameters = parameters
+        self.outputName = outputName
+        self.context = context
+        self.fields = fields
+        self.sink = None
+
+        destination = algorithm.parameterAsOutputLayer(parameters, outputName, context)
+        self.driverName = fast_writer_driver(destination)
+        if self.driverName is not None:
+            self.destination = destination
+            # closing the data source writes the empty file
+            dataSource, layer = _create_file_layer(destination, self.driverName, fields)
+            del layer, dataSource
+            add_output_to_load_on_completion(parameters, outputName, destination, context)
+            return
+
+        # create sink
+        (self.sink, self.destination) = algorithm.parameterAsSink(
+            parameters,
+            outputName,
+            context,
+            fields,
+            QgsWkbTypes.Polygon,
+            QgsCoordinateReferenceSystem('EPSG:4326')
+        )
+        # Raise error if sink not created
+        if self.sink is None:
+            raise QgsProcessingException(algorithm.invalidSinkError(parameters, outputName))
+
+    def write(self, cells: Iterable[str], cellCount: int, feedback: QgsProcessingFeedback, attributes: Dict[str, list] = None) -> bool:
+        """
+        Writes the cells, see `write_cells` for the arguments. Returns False if the user canceled, True otherwise.
+        """
+        return self.writeRows(cell_rows(cells, attributes), cellCount, feedback)
+
+    def writeRows(self, rows: Iterable[Tuple[str, list]], rowCount: int, feedback: QgsProcessingFeedback) -> bool:
+        """
+        Writes (cell, attribute values) rows, see `write_rows` for the arguments.
+        Returns False if the user canceled, True otherwise.
+        """
+        if self.sink is not None:
+            return write_rows(self.sink, self.fields, rows, rowCount, feedback)
+
+        feedback.pushInfo(f'Writing directly to {self.driverName} file.')
+        completed = write_rows_to_file(self.destination, self.driverName, self.fields, rows, rowCount, feedback)
+        if not completed:
+            remove_output_to_load_on_completion(self.destination, self.context)
+        return completed
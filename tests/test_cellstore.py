@@ -0,0 +1,79 @@
+"""
+Tests of the out-of-core cell set. Run from the repository root with `python -m pytest`.
+"""
+import os
+import random
+
+import pytest
+
+pytest.importorskip('h3')
+
+from h3_toolkit.processing import cellstore  # noqa: E402
+from h3_toolkit.processing.cellstore import SpillingCellSet  # noqa: E402
+from h3_toolkit.processing.h3_adapter import get_h3api  # noqa: E402
+
+
+def grid_cells():
+    h3api = get_h3api()
+    return h3api.cell_to_children(h3api.latlng_to_cell(50.0, 10.0, 3), 6)
+
+
+def test_spilled_runs_are_merged_sorted_and_deduplicated(tmp_path):
+    cells = grid_cells()
+    random.seed(1)
+    # every cell twice, in random order, across many small runs
+    updates = cells + cells
+    random.shuffle(updates)
+
+    cellSet = SpillingCellSet(maxCellsInMemory=50, tempDir=str(tmp_path))
+    try:
+        for i in range(0, len(updates), 20):
+            cellSet.update(updates[i:i + 20])
+        assert cellSet.spilled
+        assert len(cellSet) >= len(cells)
+
+        h3api = get_h3api()
+        expected = sorted(map(h3api.cell_to_int, cells))
+        assert list(cellSet.iterInts()) == expected
+        assert list(cellSet) == [h3api.int_to_cell(value) for value in expected]
+    finally:
+        cellSet.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_merge_fan_in_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(cellstore, 'MAX_MERGE_RUNS', 3)
+    cells = grid_cells()
+    h3api = get_h3api()
+
+    cellSet = SpillingCellSet(maxCellsInMemory=10, tempDir=str(tmp_path))
+    try:
+        for i in range(0, len(cells), 10):
+            # overlapping updates: duplicates across runs
+            cellSet.update(cells[max(i - 5, 0):i + 10])
+        assert len(os.listdir(str(tmp_path))) > 3
+        lengthBeforeMerge = len(cellSet)
+
+        # count the runs open at the same time
+        openRuns = [0]
+        maxOpenRuns = [0]
+        iterRun = cellSet._iterRun
+
+        def countingIterRun(path):
+            openRuns[0] += 1
+            maxOpenRuns[0] = max(maxOpenRuns[0], openRuns[0])
+            try:
+                yield from iterRun(path)
+            finally:
+                openRuns[0] -= 1
+
+        monkeypatch.setattr(cellSet, '_iterRun', countingIterRun)
+
+        values = list(cellSet.iterInts())
+        assert maxOpenRuns[0] <= 3
+        assert len(os.listdir(str(tmp_path))) <= 3
+        assert values == sorted(set(map(h3api.cell_to_int, cells)))
+        # duplicates across the merged runs are gone, only those with the in-memory cells are counted
+        assert len(cells) <= len(cellSet) < lengthBeforeMerge
+    finally:
+        cellSet.close()
@@ -0,0 +1,29 @@
+"""
+Tests of the h3 adapter against the installed h3 library. Run from the repository root with `python -m pytest`.
+"""
+from array import array
+
+import pytest
+
+h3 = pytest.importorskip('h3')
+
+from h3_toolkit.processing.h3_adapter import get_h3api  # noqa: E402
+
+
+def test_compact_cells_int_matches_h3():
+    h3api = get_h3api()
+    parent = h3api.latlng_to_cell(50.0, 10.0, 5)
+    # all children of a cell compact to their parent, a lone cell next to them stays as is
+    cells = h3api.cell_to_children(parent, 7)
+    lone = next(iter(h3api.grid_disk(h3api.latlng_to_cell(51.0, 11.0, 7), 0)))
+    cells.append(lone)
+
+    compacted = h3api.compact_cells_int(array('Q', map(h3api.cell_to_int, cells)))
+
+    assert isinstance(compacted, array)
+    assert compacted.typecode == 'Q'
+    assert sorted(map(h3api.int_to_cell, compacted)) == sorted([parent, lone])
+
+
+def test_compact_cells_int_empty():
+    assert len(get_h3api().compact_cells_int(array('Q'))) == 0
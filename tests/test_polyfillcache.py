@@ -0,0 +1,48 @@
+"""
+Tests of the polyfill result cache. Run from the repository root with `python -m pytest`.
+"""
+import os
+from array import array
+
+from h3_toolkit.processing.polyfillcache import PolyfillCache
+
+
+def cells(count, start=0):
+    return array('Q', range(start, start + count))
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = PolyfillCache(maxCells=10)
+    cache.put('a', cells(4))
+    cache.put('b', cells(4))
+    assert cache.get('a') == cells(4)
+    cache.put('c', cells(4))
+
+    assert cache.get('b') is None
+    assert cache.get('a') == cells(4)
+    assert cache.get('c') == cells(4)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_results_larger_than_the_cache_are_not_kept():
+    cache = PolyfillCache(maxCells=10)
+    cache.put('a', cells(4))
+    assert cache.accepts(10)
+    assert not cache.accepts(11)
+
+    cache.put('large', cells(11))
+    assert cache.get('large') is None
+    # smaller results are not evicted for it
+    assert cache.get('a') == cells(4)
+
+
+def test_results_are_stored_on_disk(tmp_path):
+    cacheDir = str(tmp_path / 'cache')
+    cache = PolyfillCache(maxCells=10, cacheDir=cacheDir)
+    # any size is stored on disk
+    assert cache.accepts(11)
+    cache.put('large', cells(11, start=1 << 60))
+    assert len(os.listdir(cacheDir)) == 1
+
+    assert PolyfillCache(maxCells=10, cacheDir=cacheDir).get('large') == cells(11, start=1 << 60)
+    assert PolyfillCache(maxCells=10, cacheDir=cacheDir).get('other') is None
@@ -0,0 +1,115 @@
+"""
+Tests of the distinct count and top values sketches. Run from the repository root with `python -m pytest`.
+"""
+import math
+import random
+
+from h3_toolkit.processing.sketches import (
+    HLL_PRECISION,
+    HLL_SPARSE_SIZE,
+    HyperLogLog,
+    SpaceSaving,
+    top_attributes,
+)
+
+# Relative standard error of HyperLogLog distinct counts
+HLL_STANDARD_ERROR = 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+
+def zipf_values(count, distinct, seed=0):
+    """
+    Returns `count` values drawn from `distinct` values with Zipf-like frequencies, value i being the
+    (i + 1)th most frequent.
+    """
+    rng = random.Random(seed)
+    return rng.choices(range(distinct), weights=[1 / (i + 1) for i in range(distinct)], k=count)
+
+
+def test_hll_counts_few_values_exactly():
+    sketch = HyperLogLog()
+    for value in list(range(HLL_SPARSE_SIZE)) * 3:
+        sketch.add(value)
+    assert sketch.registers is None
+    assert sketch.count() == HLL_SPARSE_SIZE
+
+
+def test_hll_error_is_within_standard_error():
+    errors = []
+    for run in range(5):
+        sketch = HyperLogLog()
+        for i in range(100000):
+            sketch.add(f'{run}-{i}')
+        error = sketch.count() / 100000 - 1
+        # each estimate within 3 standard errors
+        assert abs(error) < 3 * HLL_STANDARD_ERROR
+        errors.append(error)
+    # no bias: the mean of the estimates within 3 standard errors of the mean
+    assert abs(sum(errors) / len(errors)) < 3 * HLL_STANDARD_ERROR / math.sqrt(len(errors))
+
+
+def test_hll_small_range_error():
+    for distinct in (100, 1000, 5000):
+        sketch = HyperLogLog()
+        for i in range(distinct):
+            sketch.add(i)
+        assert abs(sketch.count() / distinct - 1) < 3 * HLL_STANDARD_ERROR
+
+
+def test_hll_merge_equals_single_sketch():
+    whole = HyperLogLog()
+    parts = [HyperLogLog() for _ in range(3)]
+    for i in range(20000):
+        whole.add(i)
+        # overlapping parts, one of them staying sparse
+        parts[i % 2].add(i)
+        if i < HLL_SPARSE_SIZE:
+            parts[2].add(i)
+
+    merged = HyperLogLog()
+    for part in parts:
+        merged.merge(part)
+    assert parts[2].registers is None
+    assert merged.registers == whole.registers
+    assert merged.count() == whole.count()
+
+
+def test_space_saving_top_values_and_order():
+    values = zipf_values(100000, 1000)
+    sketch = SpaceSaving(capacity=30)
+    for value in values:
+        sketch.add(value)
+
+    top = sketch.top(5)
+    assert [value for value, count in top] == [0, 1, 2, 3, 4]
+    counts = [count for value, count in top]
+    assert counts == sorted(counts, reverse=True)
+    # counts are upper bounds, overestimating by at most the minimum tracked count
+    minCount = min(sketch.counts.values())
+    for value, count in top:
+        assert values.count(value) <= count <= values.count(value) + minCount
+
+
+def test_space_saving_merge_keeps_top_values():
+    values = zipf_values(100000, 1000, seed=1)
+    sketches = [SpaceSaving(capacity=30) for _ in range(4)]
+    for i, value in enumerate(values):
+        sketches[i % 4].add(value)
+
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    assert len(merged.counts) <= 30
+    assert [value for value, count in merged.top(5)] == [0, 1, 2, 3, 4]
+    for value, count in merged.top(5):
+        assert count >= values.count(value)
+
+
+def test_top_attributes_pads_missing_ranks_with_none():
+    sketch = SpaceSaving(capacity=9)
+    for value in ['b', 'a', 'b', 7, 'b', 7]:
+        sketch.add(value)
+
+    assert top_attributes(sketch, 2) == ['b', 3, '7', 2]
+    assert top_attributes(sketch, 4) == ['b', 3, '7', 2, 'a', 1, None, None]
+    assert top_attributes(None, 2) == [None, None, None, None]
+    assert top_attributes(sketch, 0) == []
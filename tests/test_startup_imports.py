@@ -0,0 +1,90 @@
+"""
+Tests that loading the plugin keeps h3 and the parallel processing modules out of the QGIS start up.
+
+QGIS is replaced by permissive stub modules, and the plugin is imported in a fresh interpreter the way QGIS
+loads it: the package, the plugin class, the processing provider with its algorithms and the grid layer
+provider.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Any name of the stub modules is a class accepting any arguments, whose attributes are stub classes too.
+# Methods of stub instances do nothing.
+STUB_MODULE = textwrap.dedent('''
+    class _StubMeta(type):
+        def __getattr__(cls, name):
+            if name.startswith('__'):
+                raise AttributeError(name)
+            return _stub(name)
+
+        def __or__(cls, other):
+            return cls
+
+        __ror__ = __or__
+
+
+    def _noop(*args, **kwargs):
+        return None
+
+
+    def _instance_getattr(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _noop
+
+
+    def _stub(name):
+        return _StubMeta(name, (), {'__init__': _noop, '__getattr__': _instance_getattr})
+
+
+    def __getattr__(name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _stub(name)
+''')
+
+STUB_MODULES = ['qgis', 'qgis/core', 'qgis/gui', 'qgis/PyQt', 'qgis/PyQt/QtCore', 'qgis/PyQt/QtGui', 'qgis/PyQt/QtWidgets']
+
+IMPORT_PLUGIN = textwrap.dedent('''
+    import sys
+
+    import h3_toolkit
+    from h3_toolkit.plugin import H3Toolkit  # noqa: F401
+    from h3_toolkit.processing.provider import H3Provider
+
+    H3Provider('').loadAlgorithms()
+    import h3_toolkit.gridlayer.provider  # noqa: F401
+
+    print(' '.join(sorted(sys.modules)))
+''')
+
+
+def write_qgis_stubs(directory):
+    for name in STUB_MODULES:
+        path = os.path.join(directory, name)
+        if name in ('qgis', 'qgis/PyQt'):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, '__init__')
+        with open(f'{path}.py', 'w') as f:
+            f.write(STUB_MODULE)
+
+
+def test_plugin_start_up_does_not_import_h3_or_multiprocessing(tmp_path):
+    write_qgis_stubs(str(tmp_path))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path), REPO_ROOT]))
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_PLUGIN],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    modules = set(result.stdout.split())
+
+    assert 'h3_toolkit.processing.algorithms' in modules
+    for name in ('h3', 'multiprocessing', 'concurrent.futures', 'numpy', 'pyarrow', 'osgeo'):
+        assert name not in modules, f'{name} is imported at plugin start up'
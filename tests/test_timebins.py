@@ -0,0 +1,40 @@
+"""
+Tests of the packing of (cell, time bin) keys. Run from the repository root with `python -m pytest`.
+"""
+import pytest
+
+h3 = pytest.importorskip('h3')
+
+from h3_toolkit.processing.h3_adapter import get_h3api  # noqa: E402
+from h3_toolkit.processing.timebins import (  # noqa: E402
+    MAX_TIME_BIN,
+    MIN_TIME_BIN,
+    pack_cell_time_bin,
+    unpack_cell_time_bin,
+)
+
+
+def test_pack_unpack_round_trip():
+    h3api = get_h3api()
+    cellInts = [
+        h3api.cell_to_int(h3api.latlng_to_cell(lat, lng, resolution))
+        for lat, lng in ((50.0, 10.0), (-89.9, 179.9), (0.0, 0.0))
+        for resolution in (0, 8, 15)
+    ]
+    for cellInt in cellInts:
+        for timeBin in (MIN_TIME_BIN, -1, 0, 1, 1700000000 // 60, MAX_TIME_BIN):
+            assert unpack_cell_time_bin(pack_cell_time_bin(cellInt, timeBin)) == (cellInt, timeBin)
+
+
+def test_keys_order_by_cell_then_time_bin():
+    h3api = get_h3api()
+    cellInts = sorted(h3api.cell_to_int(cell) for cell in h3api.grid_disk(h3api.latlng_to_cell(50.0, 10.0, 9), 1))
+    keys = [pack_cell_time_bin(cellInt, timeBin) for cellInt in cellInts for timeBin in (MIN_TIME_BIN, 0, MAX_TIME_BIN)]
+    assert keys == sorted(set(keys))
+
+
+@pytest.mark.parametrize('timeBin', [MIN_TIME_BIN - 1, MAX_TIME_BIN + 1, 1 << 40, 1 << 63])
+def test_out_of_range_time_bins_are_rejected(timeBin):
+    cellInt = get_h3api().cell_to_int(get_h3api().latlng_to_cell(50.0, 10.0, 9))
+    with pytest.raises(ValueError):
+        pack_cell_time_bin(cellInt, timeBin)